@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark de démarrage des serveurs MCP mcp-excel et mcp-ppt
+
+Lance chaque serveur en sous-processus (stdio), effectue la poignée de main
+MCP puis mesure le temps jusqu'à :
+  - la réponse à initialize ;
+  - la réponse à tools/list ;
+  - la réponse à un premier outil léger (test_simple / server_stats) ;
+  - la réponse au premier outil lourd (pandas / python-pptx).
+
+Chaque serveur est mesuré en mode différé (PRELOAD=none, défaut) et en mode
+eager (bibliothèques importées avant de servir, comportement historique).
+
+Usage :
+    python benchmarks/bench_startup.py [--runs 5] [--server excel|ppt|all]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SERVERS = {
+    "excel": {
+        "script": ROOT / "mcp-excel" / "main.py",
+        "preload_env": "AI_SHEETS_PRELOAD",
+        "first_call": ("test_simple", {"message": "ping"}),
+        "heavy_call": ("write_excel", {"file_path": os.path.join(tempfile.gettempdir(), "bench_startup.xlsx"), "data": [{"a": 1, "b": "x"}]})
+    },
+    "ppt": {
+        "script": ROOT / "mcp-ppt" / "main.py",
+        "preload_env": "PPT_CREATOR_PRELOAD",
+        "first_call": ("server_stats", {}),
+        "heavy_call": ("create_presentation", {"title": "Bench", "filename": "bench"})
+    }
+}
+
+class StdioClient:
+    """Client JSON-RPC minimal sur l'entrée/sortie standard d'un serveur"""
+
+    def __init__(self, script: Path, env: Dict[str, str]):
+        self.proc = subprocess.Popen(
+            [sys.executable, str(script)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            cwd=tempfile.gettempdir()
+        )
+        self.next_id = 1
+
+    def send(self, method: str, params: Dict[str, Any], notify: bool = False) -> Any:
+        message: Dict[str, Any] = {"jsonrpc": "2.0", "method": method, "params": params}
+        if not notify:
+            message["id"] = self.next_id
+            self.next_id += 1
+        self.proc.stdin.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.proc.stdin.flush()
+        if notify:
+            return None
+        while True:
+            line = self.proc.stdout.readline()
+            if not line:
+                raise RuntimeError(f"Le serveur s'est arrêté pendant {method}")
+            response = json.loads(line)
+            if response.get("id") == message["id"]:
+                if "error" in response:
+                    raise RuntimeError(f"{method}: {response['error']}")
+                return response["result"]
+
+    def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        return self.send("tools/call", {"name": name, "arguments": arguments})
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+def measure(server: Dict[str, Any], preload: str) -> Dict[str, float]:
+    """Un démarrage complet ; temps en ms depuis le lancement du processus"""
+    env = dict(os.environ)
+    env[server["preload_env"]] = preload
+    started = time.perf_counter()
+    client = StdioClient(server["script"], env)
+    timings = {}
+    try:
+        client.send("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "bench-startup", "version": "1.0.0"}
+        })
+        timings["initialize"] = (time.perf_counter() - started) * 1000
+        client.send("notifications/initialized", {}, notify=True)
+
+        client.send("tools/list", {})
+        timings["tools_list"] = (time.perf_counter() - started) * 1000
+
+        client.call_tool(*server["first_call"])
+        timings["first_call"] = (time.perf_counter() - started) * 1000
+
+        client.call_tool(*server["heavy_call"])
+        timings["heavy_call"] = (time.perf_counter() - started) * 1000
+    finally:
+        client.close()
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Démarrages mesurés par configuration")
+    parser.add_argument("--server", choices=["excel", "ppt", "all"], default="all")
+    args = parser.parse_args()
+
+    names = list(SERVERS) if args.server == "all" else [args.server]
+    print(f"{'serveur':<8} {'mode':<6} {'initialize':>11} {'tools/list':>11} {'1er outil':>11} {'outil lourd':>12}  (médianes en ms, {args.runs} runs)")
+    for name in names:
+        server = SERVERS[name]
+        for preload in ("eager", "none"):
+            runs: List[Dict[str, float]] = [measure(server, preload) for _ in range(args.runs)]
+            median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(
+                f"{name:<8} {preload:<6} {median['initialize']:>11.1f} {median['tools_list']:>11.1f} "
+                f"{median['first_call']:>11.1f} {median['heavy_call']:>12.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
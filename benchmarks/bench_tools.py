@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Benchmark des outils des serveurs MCP mcp-excel et mcp-ppt
+
+Appelle les outils en processus, soit directement (handle_call_tool), soit
+via un client MCP connecté en mémoire au serveur (sérialisation JSON-RPC
+comprise). Chaque configuration (scénario, taille, mode) tourne dans un
+sous-processus neuf pour que la mémoire mesurée lui soit propre.
+
+Scénarios :
+  excel  add_sheet, save_workbook, write_excel et read_excel (xlsx et csv)
+         de 1k à 1M lignes
+  ppt    build_presentation de 10 à 500 diapositives, texte seul ou images
+
+Mesures : latence médiane, débit (lignes ou diapositives par seconde) et
+RSS maximal du processus. Les résultats peuvent être enregistrés comme
+référence JSON (--save) puis comparés à une exécution ultérieure
+(--compare) : le code de retour vaut 1 si une latence régresse au-delà du
+seuil.
+
+Usage :
+    python benchmarks/bench_tools.py [--server excel|ppt|all] [--mode direct|client|all]
+        [--rows 1000,10000,100000] [--slides 10,50,200] [--runs 3] [--full]
+        [--save baseline.json] [--compare baseline.json] [--threshold 0.2]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SERVER_SCRIPTS = {
+    "excel": ROOT / "mcp-excel" / "main.py",
+    "ppt": ROOT / "mcp-ppt" / "main.py"
+}
+
+# Environnement des sous-processus : pas de cache de lecture (lectures à
+# froid), pas de sauvegarde automatique pendant la mesure, logs discrets
+CHILD_ENV = {
+    "AI_SHEETS_READ_CACHE_BYTES": "0",
+    "AI_SHEETS_SAVE_DEBOUNCE": "3600",
+    "AI_SHEETS_SAVE_MAX_DELAY": "3600",
+    "AI_SHEETS_LOG_LEVEL": "ERROR",
+    "PPT_CREATOR_LOG_LEVEL": "ERROR"
+}
+
+Call = Callable[[str, Dict[str, Any]], Awaitable[str]]
+
+# Données de test déterministes
+
+REGIONS = ["Nord", "Sud", "Est", "Ouest", "Centre"]
+PRODUCTS = [f"Produit {i:02d}" for i in range(50)]
+
+def make_rows(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Table de ventes typique : identifiants, catégories, montants, dates"""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "date": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "region": rng.choice(REGIONS),
+            "produit": rng.choice(PRODUCTS),
+            "quantite": rng.randint(1, 100),
+            "prix": round(rng.uniform(1, 500), 2),
+            "client": f"C{rng.randrange(10 ** 6):06d}"
+        }
+        for i in range(count)
+    ]
+
+def make_image(path: Path) -> None:
+    """Photo synthétique 2400x1800 (dégradés) assez lourde pour le pipeline d'images"""
+    from PIL import Image
+    size = (2400, 1800)
+    channels = [
+        Image.linear_gradient("L").resize(size),
+        Image.radial_gradient("L").resize(size),
+        Image.linear_gradient("L").rotate(90).resize(size)
+    ]
+    Image.merge("RGB", channels).save(path, "JPEG", quality=95)
+
+# Scénarios : chacun retourne (appels de préparation, appel mesuré) pour une
+# exécution ; la préparation n'est pas chronométrée
+
+Step = Tuple[str, Dict[str, Any]]
+Scenario = Callable[[int, Path, int], Tuple[List[Step], Step]]
+
+def excel_add_sheet(size: int, tmp: Path, run: int) -> Tuple[List[Step], Step]:
+    setup = [("create_workbook", {"filename": f"bench{run}", "output_path": str(tmp)})]
+    return setup, ("add_sheet", {"filename": f"bench{run}", "sheet_name": "Ventes", "data": make_rows(size)})
+
+def excel_save_workbook(size: int, tmp: Path, run: int) -> Tuple[List[Step], Step]:
+    setup = [
+        ("create_workbook", {"filename": f"bench{run}", "output_path": str(tmp)}),
+        ("add_sheet", {"filename": f"bench{run}", "sheet_name": "Ventes", "data": make_rows(size)})
+    ]
+    return setup, ("save_workbook", {"filename": f"bench{run}", "output_path": str(tmp)})
+
+def excel_write(ext: str) -> Scenario:
+    def scenario(size: int, tmp: Path, run: int) -> Tuple[List[Step], Step]:
+        return [], ("write_excel", {"file_path": str(tmp / f"write{run}.{ext}"), "data": make_rows(size)})
+    return scenario
+
+def excel_read(ext: str) -> Scenario:
+    def scenario(size: int, tmp: Path, run: int) -> Tuple[List[Step], Step]:
+        file_path = str(tmp / f"read{run}.{ext}")
+        setup = [("write_excel", {"file_path": file_path, "data": make_rows(size)})]
+        return setup, ("read_excel", {"file_path": file_path, "max_rows": size})
+    return scenario
+
+def ppt_build(images: bool) -> Scenario:
+    def scenario(size: int, tmp: Path, run: int) -> Tuple[List[Step], Step]:
+        image_path = tmp / "photo.jpg"
+        if images and not image_path.exists():
+            make_image(image_path)
+        slides = []
+        for i in range(size):
+            if images and i % 2:
+                slides.append({"type": "image", "title": f"Image {i}", "image_path": str(image_path), "caption": "Légende"})
+            elif i % 5 == 0:
+                slides.append({"type": "title", "title": f"Section {i}", "subtitle": "Sous-titre"})
+            else:
+                slides.append({"type": "content", "title": f"Diapositive {i}", "content": [f"Point {j}" for j in range(5)]})
+        return [], ("build_presentation", {"filename": f"bench{run}", "slides": slides, "output_path": str(tmp)})
+    return scenario
+
+SCENARIOS: Dict[str, Tuple[str, str, Scenario]] = {
+    # nom: (serveur, unité, scénario)
+    "add_sheet": ("excel", "rows", excel_add_sheet),
+    "save_workbook": ("excel", "rows", excel_save_workbook),
+    "write_excel.xlsx": ("excel", "rows", excel_write("xlsx")),
+    "write_excel.csv": ("excel", "rows", excel_write("csv")),
+    "read_excel.xlsx": ("excel", "rows", excel_read("xlsx")),
+    "read_excel.csv": ("excel", "rows", excel_read("csv")),
+    "build_presentation.text": ("ppt", "slides", ppt_build(images=False)),
+    "build_presentation.images": ("ppt", "slides", ppt_build(images=True))
+}
+
+# Exécution dans le sous-processus
+
+def load_server(name: str) -> Any:
+    """Importe le main.py d'un serveur sous un nom de module distinct"""
+    spec = importlib.util.spec_from_file_location(f"bench_{name}_main", SERVER_SCRIPTS[name])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets ailleurs
+    return rss / (1024 * 1024) if platform.system() == "Darwin" else rss / 1024
+
+def check(name: str, text: str) -> str:
+    if text.startswith("❌"):
+        raise RuntimeError(f"{name}: {text}")
+    return text
+
+async def run_scenario(scenario_name: str, size: int, mode: str, runs: int) -> Dict[str, Any]:
+    server_name, _, scenario = SCENARIOS[scenario_name]
+    module = load_server(server_name)
+    # Le coût des imports différés relève de bench_startup.py
+    module.preload_modules()
+
+    async def measure(call: Call) -> List[float]:
+        timings = []
+        with tempfile.TemporaryDirectory(prefix="bench-tools-") as tmp:
+            for run in range(runs):
+                setup, (tool, arguments) = scenario(size, Path(tmp), run)
+                for step_tool, step_arguments in setup:
+                    await call(step_tool, step_arguments)
+                started = time.perf_counter()
+                await call(tool, arguments)
+                timings.append(time.perf_counter() - started)
+        return timings
+
+    if mode == "direct":
+        async def call(tool: str, arguments: Dict[str, Any]) -> str:
+            return check(tool, (await module.handle_call_tool(tool, arguments))[0].text)
+        timings = await measure(call)
+    else:
+        from mcp.shared.memory import create_connected_server_and_client_session
+        async with create_connected_server_and_client_session(module.server) as session:
+            async def call(tool: str, arguments: Dict[str, Any]) -> str:
+                result = await session.call_tool(tool, arguments)
+                return check(tool, result.content[0].text)
+            timings = await measure(call)
+
+    shutdown = getattr(module, "shutdown_executor", None)
+    if shutdown is not None:
+        shutdown()
+    return {"timings": timings, "max_rss_mb": max_rss_mb()}
+
+# Orchestration
+
+def run_child(scenario_name: str, size: int, mode: str, runs: int) -> Dict[str, Any]:
+    env = dict(os.environ)
+    env.update(CHILD_ENV)
+    with tempfile.TemporaryDirectory(prefix="bench-tools-cache-") as cache_dir:
+        env["PPT_CREATOR_IMAGE_CACHE_DIR"] = cache_dir
+        completed = subprocess.run(
+            [sys.executable, __file__, "--child", json.dumps([scenario_name, size, mode, runs])],
+            capture_output=True, text=True, env=env
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{scenario_name} ({size}, {mode}) :\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def summarize(scenario_name: str, size: int, mode: str, raw: Dict[str, Any]) -> Dict[str, Any]:
+    unit = SCENARIOS[scenario_name][1]
+    median = statistics.median(raw["timings"])
+    return {
+        "scenario": scenario_name,
+        "size": size,
+        "unit": unit,
+        "mode": mode,
+        "median_ms": round(median * 1000, 2),
+        "min_ms": round(min(raw["timings"]) * 1000, 2),
+        "throughput": round(size / median, 1) if median else None,
+        "max_rss_mb": round(raw["max_rss_mb"], 1)
+    }
+
+def result_key(result: Dict[str, Any]) -> str:
+    return f"{result['scenario']}/{result['size']}/{result['mode']}"
+
+def print_header(runs: int, baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    header = f"{'scénario':<27} {'taille':>8} {'mode':<7} {'médiane ms':>11} {'débit /s':>11} {'RSS max Mo':>11}"
+    if baseline is not None:
+        header += f" {'réf. ms':>10} {'écart':>8}"
+    print(f"{header}  ({runs} runs)")
+
+def print_row(result: Dict[str, Any], baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    line = (
+        f"{result['scenario']:<27} {result['size']:>8} {result['mode']:<7} "
+        f"{result['median_ms']:>11.1f} {result['throughput'] or 0:>11.0f} {result['max_rss_mb']:>11.1f}"
+    )
+    reference = (baseline or {}).get(result_key(result))
+    if reference is not None:
+        delta = result["median_ms"] / reference["median_ms"] - 1 if reference["median_ms"] else 0.0
+        line += f" {reference['median_ms']:>10.1f} {delta:>+8.1%}"
+    print(line, flush=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=["excel", "ppt", "all"], default="all")
+    parser.add_argument("--mode", choices=["direct", "client", "all"], default="all",
+                        help="Appel direct de handle_call_tool ou via un client MCP en mémoire")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Limiter à certains scénarios (répétable)")
+    parser.add_argument("--rows", default="1000,10000,100000", help="Tailles des feuilles (lignes)")
+    parser.add_argument("--slides", default="10,50,200", help="Tailles des présentations (diapositives)")
+    parser.add_argument("--full", action="store_true", help="Ajoute 1M lignes et 500 diapositives")
+    parser.add_argument("--runs", type=int, default=3, help="Exécutions mesurées par configuration")
+    parser.add_argument("--save", help="Enregistrer les résultats comme référence JSON")
+    parser.add_argument("--compare", help="Comparer à une référence JSON")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Régression tolérée sur la médiane avant échec (défaut 0.2 = +20%%)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        scenario_name, size, mode, runs = json.loads(args.child)
+        print(json.dumps(asyncio.run(run_scenario(scenario_name, size, mode, runs))))
+        return
+
+    sizes = {
+        "rows": [int(s) for s in args.rows.split(",")] + ([1_000_000] if args.full else []),
+        "slides": [int(s) for s in args.slides.split(",")] + ([500] if args.full else [])
+    }
+    servers = ["excel", "ppt"] if args.server == "all" else [args.server]
+    modes = ["direct", "client"] if args.mode == "all" else [args.mode]
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {result_key(r): r for r in json.load(f)["results"]}
+
+    results = []
+    print_header(args.runs, baseline)
+    for scenario_name, (server_name, unit, _) in SCENARIOS.items():
+        if server_name not in servers or (args.scenario and scenario_name not in args.scenario):
+            continue
+        for size in sizes[unit]:
+            for mode in modes:
+                raw = run_child(scenario_name, size, mode, args.runs)
+                results.append(summarize(scenario_name, size, mode, raw))
+                print_row(results[-1], baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "runs": args.runs,
+                "results": results
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nRéférence enregistrée : {args.save}")
+
+    if baseline is not None:
+        regressions = [
+            r for r in results
+            if result_key(r) in baseline and baseline[result_key(r)]["median_ms"]
+            and r["median_ms"] > baseline[result_key(r)]["median_ms"] * (1 + args.threshold)
+        ]
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de {args.threshold:.0%} :")
+            for r in regressions:
+                print(f"  {result_key(r)} : {baseline[result_key(r)]['median_ms']:.1f} -> {r['median_ms']:.1f} ms")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
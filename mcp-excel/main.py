@@ -4,50 +4,2549 @@ Excel AI-Sheets MCP Server
 Serveur MCP pour manipuler des fichiers Excel avec pandas et openpyxl
 """
 
+from __future__ import annotations
+
 import asyncio
+import base64
+import bisect
+import datetime
+import functools
+import glob
+import importlib
+import importlib.util
+import io
+import itertools
 import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
 import sys
-from typing import Any, Dict, List, Optional
+import tempfile
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from xml.sax.saxutils import escape as xml_escape
 from pathlib import Path
-import pandas as pd
-import numpy as np
 
 # MCP SDK imports
 from mcp.server.models import InitializationOptions
 from mcp.server import NotificationOptions, Server
 from mcp.server.stdio import stdio_server
-from mcp.types import Resource, Tool, TextContent, ImageContent, EmbeddedResource
+from mcp.types import Resource, Tool, TextContent, ImageContent, EmbeddedResource, BlobResourceContents
 
 # Initialisation du serveur MCP
 server = Server("AI-Sheets")
 
-# Stockage des classeurs en mémoire (similaire au serveur PowerPoint)
-workbooks: Dict[str, Dict[str, pd.DataFrame]] = {}
+# Transport : "stdio" (défaut, un processus par client) ou "sse" (serveur
+# persistant HTTP/SSE multi-sessions, sur AI_SHEETS_HOST:AI_SHEETS_PORT ou
+# sur le socket Unix AI_SHEETS_SOCKET s'il est défini).
+TRANSPORT = os.environ.get("AI_SHEETS_TRANSPORT", "stdio").lower()
+SSE_HOST = os.environ.get("AI_SHEETS_HOST", "127.0.0.1")
+SSE_PORT = int(os.environ.get("AI_SHEETS_PORT", "8765"))
+SSE_SOCKET = os.environ.get("AI_SHEETS_SOCKET")
+
+# Imports différés : pandas et numpy ne sont chargés qu'au premier outil qui
+# en a besoin, pour que la poignée de main stdio, list_tools et test_simple
+# répondent sans attendre. AI_SHEETS_PRELOAD = "none" (défaut en stdio),
+# "background" (chargement en tâche de fond après le démarrage, défaut en
+# sse) ou "eager" (chargement avant de servir).
+PRELOAD_MODE = os.environ.get("AI_SHEETS_PRELOAD", "background" if TRANSPORT == "sse" else "none").lower()
+
+class LazyModule:
+    """Module importé au premier accès à l'un de ses attributs"""
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+    
+    def load(self) -> Any:
+        """Importe le module (une seule fois) et le retourne"""
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            logger.info("Module %s chargé en %.1f ms", self._name, (time.perf_counter() - started) * 1000)
+        return self._module
+    
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self.load(), attr)
+        # Les accès suivants ne repassent plus par __getattr__
+        setattr(self, attr, value)
+        return value
+
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+
+def preload_modules() -> None:
+    """Importe les bibliothèques lourdes (mode préchargement)"""
+    for module in (np, pd):
+        module.load()
+
+# Journalisation sur stderr (stdout est réservé au canal MCP stdio).
+# Niveau réglable par AI_SHEETS_LOG_LEVEL ; les arguments volumineux ne
+# sont résumés que si le message est effectivement émis.
+LOG_LEVEL = os.environ.get("AI_SHEETS_LOG_LEVEL", "WARNING").upper()
+LOG_PAYLOAD_CHARS = int(os.environ.get("AI_SHEETS_LOG_PAYLOAD_CHARS", "200"))
+
+# Identifiant de corrélation de l'appel d'outil en cours
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Espace de noms de la session en cours (mode sse) : les classeurs d'une
+# session sont stockés sous "<espace>/<nom>" et invisibles des autres.
+# None en stdio, où les noms restent inchangés.
+namespace_var: ContextVar[Optional[str]] = ContextVar("namespace", default=None)
+NAMESPACE_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+def scoped(name: str) -> str:
+    """Clé interne d'un classeur pour la session en cours"""
+    namespace = namespace_var.get()
+    return name if namespace is None else f"{namespace}/{name}"
+
+def unscoped(key: str) -> Optional[str]:
+    """Nom visible d'une clé interne, ou None si elle appartient à une autre session"""
+    namespace = namespace_var.get()
+    if namespace is None:
+        return key
+    prefix = f"{namespace}/"
+    return key[len(prefix):] if key.startswith(prefix) else None
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+def _setup_logger() -> logging.Logger:
+    log = logging.getLogger("ai_sheets")
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(message)s"))
+        handler.addFilter(_RequestIdFilter())
+        log.addHandler(handler)
+        log.propagate = False
+    log.setLevel(LOG_LEVEL)
+    return log
+
+logger = _setup_logger()
+
+class PayloadSummary:
+    """Résumé tronqué d'un argument, calculé seulement à l'émission du log"""
+    
+    def __init__(self, value: Any, limit: int = LOG_PAYLOAD_CHARS):
+        self.value = value
+        self.limit = limit
+    
+    @classmethod
+    def _summarize(cls, value: Any, depth: int = 0) -> str:
+        if isinstance(value, dict):
+            if depth >= 2:
+                return f"{{…{len(value)} clés}}"
+            items = list(value.items())
+            inner = ", ".join(f"{k!r}: {cls._summarize(v, depth + 1)}" for k, v in items[:8])
+            more = f", …+{len(items) - 8}" if len(items) > 8 else ""
+            return f"{{{inner}{more}}}"
+        if isinstance(value, list):
+            if not value:
+                return "[]"
+            first = cls._summarize(value[0], depth + 1) if depth < 2 else "…"
+            return f"[{first}, …] (len={len(value)})" if len(value) > 1 else f"[{first}]"
+        text = repr(value)
+        return text if len(text) <= 60 else f"{text[:57]}…"
+    
+    def __str__(self) -> str:
+        text = self._summarize(self.value)
+        return text if len(text) <= self.limit else f"{text[:self.limit]}…"
+
+# Schéma du paramètre "data" : lignes JSON ou format colonnaire (plus compact
+# et construit directement en tableaux NumPy)
+DATA_SCHEMA = {
+    "anyOf": [
+        {
+            "type": "array",
+            "description": "Tableau d'objets JSON représentant les données",
+            "items": {
+                "type": "object",
+                "description": "Un objet JSON avec propriétés = colonnes"
+            }
+        },
+        {
+            "type": "object",
+            "description": "Format colonnaire : noms de colonnes une seule fois puis un tableau de valeurs par colonne",
+            "properties": {
+                "columns": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Noms des colonnes"
+                },
+                "values": {
+                    "type": "array",
+                    "items": {"type": "array"},
+                    "description": "Un tableau de valeurs par colonne, dans l'ordre de 'columns'"
+                },
+                "dtypes": {
+                    "type": "object",
+                    "description": "Types déclarés par colonne (optionnel) : int64, float64, bool, datetime, category, string, Int64..."
+                }
+            },
+            "required": ["columns", "values"]
+        }
+    ]
+}
+
+# Stockage des classeurs en mémoire (similaire au serveur PowerPoint), avec
+# un plafond mémoire : les classeurs les moins récemment utilisés sont
+# déversés sur disque (Parquet, ou pickle si la feuille n'est pas
+# représentable en Parquet) et rechargés à la demande.
+WORKBOOKS_MAX_BYTES = int(os.environ.get("AI_SHEETS_MAX_MEMORY_BYTES", str(1024 * 1024 * 1024)))
+SPILL_DIR = os.environ.get("AI_SHEETS_SPILL_DIR")
+
+def dataframe_nbytes(df: pd.DataFrame) -> int:
+    """Mémoire occupée par un DataFrame (chaînes comprises)"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def spill_sheets(directory: str, sheets: Dict[str, pd.DataFrame]) -> int:
+    """Écrit les feuilles d'un classeur sur disque ; retourne la taille écrite"""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    manifest = []
+    for i, (sheet_name, df) in enumerate(sheets.items()):
+        try:
+            file_name = f"{i}.parquet"
+            df.to_parquet(path / file_name, index=True)
+        except Exception:
+            # Colonnes non textuelles, types mixtes ou pyarrow absent
+            file_name = f"{i}.pkl"
+            df.to_pickle(path / file_name)
+        manifest.append({"sheet": sheet_name, "file": file_name})
+    (path / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    return sum(f.stat().st_size for f in path.iterdir())
+
+def load_spilled_sheets(directory: str) -> Dict[str, pd.DataFrame]:
+    """Recharge les feuilles déversées par spill_sheets"""
+    path = Path(directory)
+    sheets = {}
+    for entry in json.loads((path / "manifest.json").read_text(encoding="utf-8")):
+        file_path = path / entry["file"]
+        if file_path.suffix == ".parquet":
+            sheets[entry["sheet"]] = pd.read_parquet(file_path)
+        else:
+            sheets[entry["sheet"]] = pd.read_pickle(file_path)
+    return sheets
+
+class WorkbookStore(MutableMapping):
+    """Classeurs en mémoire avec plafond mémoire et déversement LRU sur disque"""
+    
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self._spill_root = spill_dir
+        self._resident: "OrderedDict[str, Dict[str, pd.DataFrame]]" = OrderedDict()
+        # Taille de chaque feuille résidente
+        self._sheet_bytes: Dict[str, Dict[str, int]] = {}
+        # Classeurs déversés : nom -> (répertoire, octets en mémoire, octets sur disque)
+        self._spilled: Dict[str, Tuple[str, int, int]] = {}
+        self._versions: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.spills = 0
+        self.reloads = 0
+        # Octets économisés par le compactage des feuilles (cumul)
+        self.compacted_bytes_saved = 0
+        # Lignes ajoutées en fin de feuille, pas encore concaténées :
+        # nom -> feuille -> blocs de lignes (voir append_rows)
+        self._pending: Dict[str, Dict[str, List[pd.DataFrame]]] = {}
+        self._pending_rows: Dict[str, Dict[str, int]] = {}
+    
+    @property
+    def spill_root(self) -> str:
+        if self._spill_root is None:
+            self._spill_root = tempfile.mkdtemp(prefix="ai-sheets-spill-")
+        return self._spill_root
+    
+    @property
+    def spilled_count(self) -> int:
+        return len(self._spilled)
+    
+    @property
+    def resident_bytes(self) -> int:
+        return sum(sum(sizes.values()) for sizes in self._sheet_bytes.values())
+    
+    def _lock(self, name: str) -> asyncio.Lock:
+        return self._locks.setdefault(name, asyncio.Lock())
+    
+    def _drop_spill(self, name: str) -> None:
+        spilled = self._spilled.pop(name, None)
+        if spilled is not None:
+            shutil.rmtree(spilled[0], ignore_errors=True)
+    
+    def _drop_pending(self, name: str, sheet_name: Optional[str] = None) -> None:
+        if sheet_name is None:
+            self._pending.pop(name, None)
+            self._pending_rows.pop(name, None)
+        else:
+            self._pending.get(name, {}).pop(sheet_name, None)
+            self._pending_rows.get(name, {}).pop(sheet_name, None)
+    
+    def _consolidate(self, name: str) -> None:
+        """Concatène les lignes en attente aux feuilles d'un classeur"""
+        pending = self._pending.pop(name, None)
+        self._pending_rows.pop(name, None)
+        if not pending:
+            return
+        sheets = self._resident[name]
+        for sheet_name, chunks in pending.items():
+            sheets[sheet_name] = concat_rows(sheets[sheet_name], chunks)
+            self._sheet_bytes[name][sheet_name] = dataframe_nbytes(sheets[sheet_name])
+    
+    def _restore(self, name: str, sheets: Dict[str, pd.DataFrame]) -> None:
+        self._resident[name] = sheets
+        self._sheet_bytes[name] = {s: dataframe_nbytes(df) for s, df in sheets.items()}
+        self._versions[name] = self._versions.get(name, 0) + 1
+    
+    # Interface de dictionnaire
+    
+    def __contains__(self, name: object) -> bool:
+        return name in self._resident or name in self._spilled
+    
+    def __getitem__(self, name: str) -> Dict[str, pd.DataFrame]:
+        if name in self._spilled:
+            # Rechargement synchrone : les outils passent normalement par ensure_loaded
+            self._restore(name, load_spilled_sheets(self._spilled[name][0]))
+            self._drop_spill(name)
+            self.reloads += 1
+        self._consolidate(name)
+        sheets = self._resident[name]
+        self._resident.move_to_end(name)
+        return sheets
+    
+    def __setitem__(self, name: str, sheets: Dict[str, pd.DataFrame]) -> None:
+        self._drop_spill(name)
+        self._drop_pending(name)
+        self._restore(name, dict(sheets))
+        self._resident.move_to_end(name)
+    
+    def __delitem__(self, name: str) -> None:
+        if name not in self:
+            raise KeyError(name)
+        self._drop_spill(name)
+        self._drop_pending(name)
+        self._resident.pop(name, None)
+        self._sheet_bytes.pop(name, None)
+        self._versions.pop(name, None)
+        # Verrou tenu (déversement ou rechargement en cours) : conservé pour
+        # que les attentes en cours restent sérialisées sur le même verrou
+        lock = self._locks.get(name)
+        if lock is not None and not lock.locked():
+            del self._locks[name]
+    
+    def __iter__(self):
+        return iter(list(self._resident) + list(self._spilled))
+    
+    def __len__(self) -> int:
+        return len(self._resident) + len(self._spilled)
+    
+    # Opérations propres au stockage
+    
+    def set_sheet(self, name: str, sheet_name: str, df: pd.DataFrame) -> None:
+        """Ajoute ou remplace une feuille et met à jour la mémoire comptabilisée"""
+        self._drop_pending(name, sheet_name)
+        self[name][sheet_name] = df
+        self._sheet_bytes[name][sheet_name] = dataframe_nbytes(df)
+        self._versions[name] += 1
+    
+    def sheet_names(self, name: str) -> List[str]:
+        """Noms des feuilles d'un classeur résident"""
+        return list(self._resident[name])
+    
+    def has_sheet(self, name: str, sheet_name: str) -> bool:
+        """Indique si un classeur résident contient la feuille (sans concaténer)"""
+        return sheet_name in self._resident[name]
+    
+    def row_count(self, name: str, sheet_name: str) -> int:
+        """Nombre de lignes d'une feuille résidente, lignes en attente comprises"""
+        pending = self._pending_rows.get(name, {}).get(sheet_name, 0)
+        return len(self._resident[name][sheet_name]) + pending
+    
+    def append_rows(self, name: str, sheet_name: str, rows: pd.DataFrame) -> int:
+        """Ajoute des lignes en fin de feuille sans reconstruire le DataFrame.
+        Les blocs sont concaténés en une fois au prochain accès à la feuille
+        (coût amorti) ; retourne le nombre total de lignes."""
+        if not self.has_sheet(name, sheet_name):
+            raise KeyError(sheet_name)
+        self._pending.setdefault(name, {}).setdefault(sheet_name, []).append(rows)
+        counts = self._pending_rows.setdefault(name, {})
+        counts[sheet_name] = counts.get(sheet_name, 0) + len(rows)
+        self._sheet_bytes[name][sheet_name] += dataframe_nbytes(rows)
+        self._versions[name] += 1
+        self._resident.move_to_end(name)
+        return self.row_count(name, sheet_name)
+    
+    async def ensure_loaded(self, name: str) -> None:
+        """Recharge un classeur déversé sans bloquer la boucle asyncio"""
+        if name not in self._spilled:
+            return
+        async with self._lock(name):
+            if name in self._spilled:
+                sheets = await asyncio.to_thread(load_spilled_sheets, self._spilled[name][0])
+                self._restore(name, sheets)
+                self._drop_spill(name)
+                self.reloads += 1
+        # Le classeur rechargé peut faire dépasser le plafond
+        await self.enforce_budget(keep=name)
+    
+    async def enforce_budget(self, keep: Optional[str] = None) -> None:
+        """Déverse les classeurs les moins récemment utilisés au-delà du plafond"""
+        while self.resident_bytes > self.max_bytes:
+            victim = next((n for n in self._resident if n != keep and not self._lock(n).locked()), None)
+            if victim is None:
+                return
+            async with self._lock(victim):
+                if victim not in self._resident:
+                    continue
+                self._consolidate(victim)
+                version = self._versions[victim]
+                sheets = dict(self._resident[victim])
+                directory = os.path.join(self.spill_root, uuid.uuid4().hex)
+                disk_bytes = await asyncio.to_thread(spill_sheets, directory, sheets)
+                
+                if self._versions.get(victim) != version or victim not in self._resident:
+                    # Modifié pendant l'écriture : la copie sur disque est périmée
+                    shutil.rmtree(directory, ignore_errors=True)
+                    continue
+                memory_bytes = sum(self._sheet_bytes.pop(victim).values())
+                del self._resident[victim]
+                self._spilled[victim] = (directory, memory_bytes, disk_bytes)
+                self.spills += 1
+    
+    def usage(self) -> Dict[str, Any]:
+        """Mémoire utilisée par classeur (résident ou déversé)"""
+        report = {}
+        for name, sheets in self._resident.items():
+            report[name] = {
+                "state": "resident",
+                "memory_bytes": sum(self._sheet_bytes[name].values()),
+                "sheets": {s: {"rows": self.row_count(name, s), "bytes": self._sheet_bytes[name][s]} for s in sheets}
+            }
+        for name, (_, memory_bytes, disk_bytes) in self._spilled.items():
+            report[name] = {
+                "state": "spilled",
+                "memory_bytes": memory_bytes,
+                "disk_bytes": disk_bytes
+            }
+        return {
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+            "spills": self.spills,
+            "reloads": self.reloads,
+            "compacted_bytes_saved": self.compacted_bytes_saved,
+            "workbooks": report
+        }
+    
+    def cleanup(self) -> None:
+        """Supprime les fichiers déversés (arrêt du serveur)"""
+        for name in list(self._spilled):
+            self._drop_spill(name)
+        if self._spill_root is not None and SPILL_DIR is None:
+            shutil.rmtree(self._spill_root, ignore_errors=True)
+
+workbooks = WorkbookStore(WORKBOOKS_MAX_BYTES, SPILL_DIR)
 workbook_paths: Dict[str, str] = {}
 
-def auto_save_workbook(filename: str) -> str:
-    """Sauvegarde automatique d'un classeur"""
-    if filename not in workbooks:
-        return "❌ Classeur non trouvé"
+# Exécution hors de la boucle asyncio : toutes les I/O fichier et le travail
+# pandas passent par ce pool pour que les appels d'outils se chevauchent.
+# AI_SHEETS_EXECUTOR = "thread" (défaut) ou "process"
+EXECUTOR_KIND = os.environ.get("AI_SHEETS_EXECUTOR", "thread").lower()
+EXECUTOR_WORKERS = int(os.environ.get("AI_SHEETS_WORKERS", "0")) or None
+
+_executor: Optional[Executor] = None
+
+def new_process_pool(max_workers: Optional[int]) -> ProcessPoolExecutor:
+    """Crée un pool de processus sans fork : le serveur tourne des threads
+    (pool, boucle asyncio) et un fork peut hériter d'un verrou tenu par l'un
+    d'eux. Les workers démarrent via forkserver, ou spawn à défaut."""
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(method)
+    )
+
+def get_executor() -> Executor:
+    """Retourne le pool d'exécution (créé à la première utilisation)"""
+    global _executor
+    if _executor is None:
+        if EXECUTOR_KIND == "process":
+            _executor = new_process_pool(EXECUTOR_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=EXECUTOR_WORKERS,
+                thread_name_prefix="ai-sheets"
+            )
+    return _executor
+
+def shutdown_executor() -> None:
+    """Arrête les pools d'exécution en attendant les tâches en cours"""
+    global _executor, _ingest_executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _ingest_executor is not None:
+        _ingest_executor.shutdown(wait=True)
+        _ingest_executor = None
+
+# Lecture de nombreux fichiers (merge_files) : l'analyse xlsx/csv est liée
+# au CPU et tient le GIL, elle passe donc par un pool de processus dédié.
+# AI_SHEETS_INGEST_EXECUTOR = "process" (défaut) ou "thread" (pool principal)
+INGEST_EXECUTOR_KIND = os.environ.get("AI_SHEETS_INGEST_EXECUTOR", "process").lower()
+INGEST_WORKERS = int(os.environ.get("AI_SHEETS_INGEST_WORKERS", "0")) or None
+
+_ingest_executor: Optional[Executor] = None
+
+def get_ingest_executor() -> Executor:
+    """Retourne le pool de lecture des fichiers (créé à la première utilisation)"""
+    global _ingest_executor
+    if EXECUTOR_KIND == "process" or INGEST_EXECUTOR_KIND == "thread":
+        return get_executor()
+    if _ingest_executor is None:
+        _ingest_executor = new_process_pool(INGEST_WORKERS)
+    return _ingest_executor
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Exécute une fonction bloquante dans le pool sans bloquer la boucle asyncio"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+# Fonctions de travail exécutées dans le pool. Elles ne touchent pas à l'état
+# global du serveur pour rester utilisables avec un pool de processus.
+
+# Alias de types acceptés dans "dtypes" pour le format colonnaire
+_DTYPE_ALIASES = {
+    "int": "int64",
+    "integer": "int64",
+    "float": "float64",
+    "number": "float64",
+    "bool": "bool",
+    "boolean": "bool",
+    "str": "object",
+    "datetime": "datetime64[ns]",
+    "date": "datetime64[ns]"
+}
+
+def _build_column(values: List[Any], dtype: Optional[str]) -> Any:
+    """Convertit une colonne JSON en tableau typé (NumPy ou extension pandas)"""
+    if dtype is None:
+        return values
+    resolved = pd.api.types.pandas_dtype(_DTYPE_ALIASES.get(dtype.lower(), dtype))
+    if resolved == np.dtype(bool):
+        # np.asarray convertirait None en False : booléen nullable si des
+        # valeurs manquent (et refus des valeurs non booléennes)
+        array = pd.array(values, dtype="boolean")
+        return array if array.isna().any() else array.to_numpy(dtype=bool)
+    if isinstance(resolved, np.dtype):
+        return np.asarray(values, dtype=resolved)
+    # Types pandas (category, string, Int64 nullable, ...)
+    return pd.array(values, dtype=resolved)
+
+def build_columnar_dataframe(data: Dict[str, Any]) -> pd.DataFrame:
+    """Construit un DataFrame à partir du format colonnaire
+    {"columns": [...], "values": [[col1...], [col2...]], "dtypes": {...}}"""
+    columns = data.get("columns")
+    values = data.get("values")
+    dtypes = data.get("dtypes") or {}
     
+    if not isinstance(columns, list) or not isinstance(values, list):
+        raise ValueError("le format colonnaire requiert 'columns' et 'values' (listes)")
+    if len(columns) != len(values):
+        raise ValueError(f"{len(columns)} colonnes mais {len(values)} tableaux de valeurs")
+    if isinstance(dtypes, list):
+        dtypes = dict(zip(columns, dtypes))
+    unknown = set(dtypes) - set(columns)
+    if unknown:
+        raise ValueError(f"types déclarés pour des colonnes inconnues: {sorted(unknown)}")
+    lengths = {len(col) for col in values}
+    if len(lengths) > 1:
+        raise ValueError(f"les colonnes n'ont pas toutes la même longueur: {sorted(lengths)}")
+    
+    arrays = {}
+    for column, col_values in zip(columns, values):
+        try:
+            arrays[column] = _build_column(col_values, dtypes.get(column))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"colonne '{column}' ({dtypes.get(column)}): {e}")
+    return pd.DataFrame(arrays, columns=columns, copy=False)
+
+def build_dataframe(data: Any) -> pd.DataFrame:
+    """Construit un DataFrame à partir d'une liste d'objets JSON ou du format colonnaire"""
+    if isinstance(data, dict):
+        return build_columnar_dataframe(data)
+    return pd.DataFrame(data)
+
+# Compactage optionnel des feuilles en mémoire (add_sheet "compact", ou
+# AI_SHEETS_COMPACT=1 par défaut) : entiers et flottants réduits au plus
+# petit type sans perte, chaînes peu variées en catégories, autres chaînes
+# en chaînes Arrow si pyarrow est installé. Une conversion n'est retenue que
+# si elle réduit effectivement la mémoire de la colonne.
+COMPACT_DEFAULT = os.environ.get("AI_SHEETS_COMPACT", "0").lower() in ("1", "true", "yes", "on")
+COMPACT_CATEGORY_RATIO = float(os.environ.get("AI_SHEETS_CATEGORY_RATIO", "0.5"))
+
+def _pyarrow_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+def _compact_column(series: pd.Series, category_ratio: float, arrow_strings: bool) -> Optional[pd.Series]:
+    """Version compacte d'une colonne, ou None si aucune conversion ne s'applique"""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return None
+    if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+        unsigned = len(series) > 0 and series.min() >= 0
+        return pd.to_numeric(series, downcast="unsigned" if unsigned else "integer")
+    if pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+        candidate = pd.to_numeric(series, downcast="float")
+        # float32 seulement si toutes les valeurs survivent à l'aller-retour
+        lossless = (candidate.astype(dtype) == series) | series.isna()
+        return candidate if lossless.all() else None
+    # Chaînes : type object (pandas < 3) ou StringDtype (inférence par défaut de pandas 3)
+    python_strings = dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "string"
+    if python_strings or isinstance(dtype, pd.StringDtype):
+        if series.nunique(dropna=True) <= category_ratio * len(series):
+            return series.astype("category")
+        if arrow_strings and getattr(dtype, "storage", None) != "pyarrow":
+            return series.astype("string[pyarrow]")
+    return None
+
+def compact_dataframe(df: pd.DataFrame, category_ratio: float = COMPACT_CATEGORY_RATIO) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Réduit la mémoire d'un DataFrame ; retourne (DataFrame compact, rapport)"""
+    arrow_strings = _pyarrow_available()
+    bytes_before = dataframe_nbytes(df)
+    columns = {}
+    converted = {}
+    for i, column in enumerate(df.columns):
+        series = df.iloc[:, i]
+        candidate = _compact_column(series, category_ratio, arrow_strings)
+        if candidate is None or candidate.dtype == series.dtype:
+            continue
+        if candidate.memory_usage(index=False, deep=True) < series.memory_usage(index=False, deep=True):
+            converted[i] = candidate
+            columns[str(column)] = f"{series.dtype} -> {candidate.dtype}"
+
+    if converted:
+        df = pd.concat(
+            [converted.get(i, df.iloc[:, i]) for i in range(len(df.columns))],
+            axis=1, copy=False
+        )
+    bytes_after = dataframe_nbytes(df)
+    return df, {
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after,
+        "columns": columns
+    }
+
+def concat_rows(df: pd.DataFrame, chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatène des blocs de lignes à une feuille. Les colonnes catégorielles
+    (feuilles compactées) gardent leur type, catégories complétées."""
+    frames = [df, *chunks]
+    for i, column in enumerate(df.columns):
+        dtype = df.iloc[:, i].dtype
+        if not isinstance(dtype, pd.CategoricalDtype):
+            continue
+        categories = dtype.categories
+        for chunk in chunks:
+            if column in chunk.columns:
+                values = pd.Index(chunk[column].dropna().unique())
+                categories = categories.append(values.difference(categories))
+        merged = pd.CategoricalDtype(categories)
+        for j, frame in enumerate(frames):
+            if column in frame.columns and frame[column].dtype != merged:
+                frame = frame.copy(deep=False)
+                frame[column] = frame[column].astype(merged)
+                frames[j] = frame
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+_CELL_PATTERN = re.compile(r"([A-Za-z]{1,3})([0-9]+)")
+
+def parse_cell(cell: str) -> Tuple[int, int]:
+    """Convertit une référence A1 en (ligne de données, colonne), base 0 ;
+    la ligne 1 de la feuille est celle des en-têtes"""
+    match = _CELL_PATTERN.fullmatch(cell.strip())
+    if not match:
+        raise ValueError(f"référence de cellule invalide: '{cell}'")
+    column = 0
+    for letter in match.group(1).upper():
+        column = column * 26 + ord(letter) - 64
+    row = int(match.group(2))
+    if row < 2:
+        raise ValueError("la ligne 1 contient les en-têtes ; les données commencent en ligne 2")
+    return row - 2, column - 1
+
+def update_cells(df: pd.DataFrame, row: int, column: int, values: List[List[Any]]) -> pd.DataFrame:
+    """Retourne la feuille avec un bloc de valeurs écrit à partir de (row, column).
+    Seules les colonnes touchées sont copiées : la feuille d'origine, que la
+    sauvegarde différée peut être en train de rendre, n'est jamais modifiée.
+    Une colonne ne change de type que si les valeurs ne tiennent pas dans le sien."""
+    width = len(values[0]) if values else 0
+    if not width or any(not isinstance(v, list) or len(v) != width for v in values):
+        raise ValueError("'values' doit être un tableau non vide de lignes de même longueur")
+    if row < 0 or column < 0 or row + len(values) > len(df) or column + width > len(df.columns):
+        raise ValueError(
+            f"plage hors de la feuille ({len(df)} lignes, {len(df.columns)} colonnes) ; "
+            f"utilisez append_rows pour ajouter des lignes"
+        )
+
+    stop = row + len(values)
+    updated = df.copy(deep=False)
+    for j in range(width):
+        position = column + j
+        col_values = [v[j] for v in values]
+        series = df.iloc[:, position].copy()
+        try:
+            series.iloc[row:stop] = col_values
+        except (TypeError, ValueError):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                new = pd.Index([v for v in col_values if v is not None]).unique().difference(series.cat.categories)
+                series = series.cat.add_categories(new)
+            else:
+                series = series.astype(object)
+            series.iloc[row:stop] = col_values
+        updated.isetitem(position, series)
+    return updated
+
+# Formats colonnaires (pyarrow) pour les tables intermédiaires qui n'ont pas
+# besoin d'être ouvertes dans Excel : pas de zip ni de XML, lecture projetée
+# en mémoire (memory map) et limitée aux colonnes demandées.
+COLUMNAR_EXTENSIONS = ('.parquet', '.feather', '.arrow', '.ipc')
+TABLE_EXTENSIONS = ('.xlsx', '.xls', '.csv') + COLUMNAR_EXTENSIONS
+# .xls (Excel 97-2003) est lu mais jamais écrit : les moteurs produisent du .xlsx
+WRITE_EXTENSIONS = tuple(ext for ext in TABLE_EXTENSIONS if ext != '.xls')
+PARQUET_COMPRESSION = os.environ.get("AI_SHEETS_PARQUET_COMPRESSION", "snappy")
+# Feather / Arrow IPC : "uncompressed" permet une lecture sans copie
+ARROW_COMPRESSION = os.environ.get("AI_SHEETS_ARROW_COMPRESSION", "lz4")
+ARROW_BATCH_ROWS = 65_536
+
+def _require_pyarrow() -> None:
+    if not _pyarrow_available():
+        raise ValueError("pyarrow est requis pour les formats .parquet, .feather et .arrow (pip install pyarrow)")
+
+def _missing_columns(available: List[str], columns: List[str]) -> None:
+    missing = [c for c in columns if c not in available]
+    if missing:
+        raise ValueError(
+            f"colonne inconnue : {', '.join(repr(c) for c in missing)} "
+            f"(disponibles : {', '.join(map(str, available[:50]))}{', ...' if len(available) > 50 else ''})"
+        )
+
+def normalize_headers(header: Any) -> List[str]:
+    """En-têtes d'une feuille nommés par le même analyseur que read_excel
+    ('Unnamed: i' pour une cellule vide, doublons suffixés a.1, a.2), puis
+    convertis en texte. Toutes les lectures (pandas, .xlsx ligne à ligne,
+    cache) produisent ainsi les mêmes noms."""
+    from pandas.io.common import dedup_names
+    from pandas.io.parsers import TextParser
+    cells = []
+    for c in header:
+        if c is None or (isinstance(c, float) and c != c):
+            c = ""
+        elif isinstance(c, float) and c.is_integer():
+            # Comme le lecteur openpyxl de pandas : 2024.0 -> 2024
+            c = int(c)
+        cells.append(c)
+    if not cells:
+        return []
+    names = [str(c) for c in TextParser([cells], header=0).read().columns]
+    if len(set(names)) < len(names):
+        # Libellés distincts devenus identiques en texte (1 et "1")
+        names = list(dedup_names(names, False))
+    return names
+
+def _column_positions(names: List[str], columns: List[str]) -> List[int]:
+    """Positions (triées, sans doublon) des colonnes demandées dans l'en-tête"""
+    _missing_columns(names, columns)
+    return sorted({names.index(c) for c in columns})
+
+def read_pandas_table(read: Callable[..., pd.DataFrame], columns: Optional[List[str]], **kwargs: Any) -> pd.DataFrame:
+    """Lecture pandas (read_excel / read_csv) aux en-têtes normalisés ; avec
+    columns, seules ces colonnes sont analysées (usecols par position)"""
+    if columns is None:
+        df = read(**kwargs)
+        df.columns = normalize_headers(df.columns)
+        return df
+    header = normalize_headers(read(**{**kwargs, "nrows": 0}).columns)
+    positions = _column_positions(header, columns)
+    df = read(**kwargs, usecols=positions)
+    df.columns = [header[p] for p in positions]
+    return df[columns]
+
+def select_columns(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    """Projection d'une feuille déjà lue sur les colonnes demandées"""
+    if columns is None:
+        return df
+    _missing_columns(list(df.columns), columns)
+    return df[columns]
+
+def open_arrow_file(file_path: str, columns: Optional[List[str]] = None) -> Tuple[Any, Any, Iterator[Any]]:
+    """Ouvre un fichier colonnaire ; retourne (source à fermer, schéma projeté, lots)"""
+    _require_pyarrow()
+    import pyarrow as pa
+    if Path(file_path).suffix.lower() == '.parquet':
+        import pyarrow.parquet as pq
+        source = pq.ParquetFile(file_path, memory_map=True)
+        schema = source.schema_arrow
+        batches = source.iter_batches(batch_size=ARROW_BATCH_ROWS, columns=columns)
+    else:
+        source = pa.memory_map(file_path)
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            # Format flux (stream) plutôt que fichier
+            source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            batches = iter(reader)
+        schema = reader.schema
+        if columns is not None:
+            batches = (batch.select(columns) for batch in batches)
+    if columns is not None:
+        _missing_columns(schema.names, columns)
+        schema = pa.schema([schema.field(c) for c in columns])
+    return source, schema.remove_metadata(), batches
+
+def take_arrow_rows(batches: Iterator[Any], pending: Any, count: int) -> Tuple[List[Any], Any]:
+    """Prend count lignes dans les lots ; retourne (tranches, reste du lot entamé)"""
+    taken = []
+    while count > 0:
+        if pending is None:
+            pending = next(batches, None)
+            if pending is None:
+                break
+        piece = pending.slice(0, count)
+        taken.append(piece)
+        count -= len(piece)
+        pending = pending.slice(len(piece)) if len(piece) < len(pending) else None
+    return taken, pending
+
+def arrow_to_pandas(schema: Any, batches: List[Any]) -> pd.DataFrame:
+    import pyarrow as pa
+    return pa.Table.from_batches([b.replace_schema_metadata() for b in batches], schema=schema).to_pandas()
+
+def read_columnar_file(file_path: str, max_rows: Optional[int], columns: Optional[List[str]]) -> pd.DataFrame:
+    """Lit un fichier Parquet / Feather / Arrow, limité aux colonnes et lignes demandées"""
+    if max_rows is None and Path(file_path).suffix.lower() == '.parquet':
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        if columns is not None:
+            _missing_columns(pq.read_schema(file_path).names, columns)
+        return pq.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+    source, schema, batches = open_arrow_file(file_path, columns)
     try:
-        file_path = workbook_paths.get(filename)
-        if not file_path:
-            # Chemin par défaut
-            file_path = f"/Users/usuario1/Documents/{filename}.xlsx"
-            workbook_paths[filename] = file_path
+        if max_rows is None:
+            return arrow_to_pandas(schema, list(batches))
+        taken, _ = take_arrow_rows(batches, None, max_rows)
+        return arrow_to_pandas(schema, taken)
+    finally:
+        source.close()
+
+def _arrow_table(df: pd.DataFrame) -> Any:
+    """Table Arrow d'un DataFrame ; les colonnes de types mixtes sont écrites en texte"""
+    import pyarrow as pa
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    df = df.copy(deep=False)
+    for position in range(df.shape[1]):
+        series = df.iloc[:, position]
+        if series.dtype != object:
+            continue
+        try:
+            pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df.isetitem(position, series.map(lambda v: v if v is None or (isinstance(v, float) and v != v) else str(v)))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def write_columnar_file(file_path: str, df: pd.DataFrame) -> None:
+    """Écrit un DataFrame en Parquet ou en Feather / Arrow IPC"""
+    _require_pyarrow()
+    table = _arrow_table(df)
+    if Path(file_path).suffix.lower() == '.parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, file_path, compression=PARQUET_COMPRESSION)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, file_path, compression=ARROW_COMPRESSION)
+
+def table_writer_engine(file_path: str, requested: Optional[str], df: pd.DataFrame, sheet_name: str) -> str:
+    """Moteur d'écriture effectif d'un fichier table"""
+    if Path(file_path).suffix.lower() in COLUMNAR_EXTENSIONS:
+        return "pyarrow"
+    return resolve_writer_engine(requested, {sheet_name: df}, "openpyxl")
+
+def write_table_file(file_path: str, df: pd.DataFrame, sheet_name: str, engine: str = "openpyxl") -> None:
+    """Écrit un DataFrame dans un fichier selon son extension"""
+    file_ext = Path(file_path).suffix.lower()
+    check_xlsx_output(file_path)
+    if file_ext not in TABLE_EXTENSIONS:
+        raise ValueError(f"Format de fichier non supporté : '{file_ext}' ({', '.join(WRITE_EXTENSIONS)})")
+    
+    # Créer le répertoire si nécessaire
+    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    
+    if file_ext == '.xlsx':
+        write_sheets_file(file_path, {sheet_name: df}, engine)
+    elif file_ext == '.csv':
+        df.to_csv(file_path, index=False)
+    else:
+        write_columnar_file(file_path, df)
+
+def read_table_file(file_path: str, sheet_name: Any, max_rows: Optional[int], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Lit un fichier Excel, CSV ou colonnaire selon son extension"""
+    file_ext = Path(file_path).suffix.lower()
+    
+    if file_ext in COLUMNAR_EXTENSIONS:
+        return read_columnar_file(file_path, max_rows, columns)
+    if file_ext == '.xlsx' and columns is not None:
+        # Projection : lecture seule ligne à ligne, sans construire les autres colonnes
+        return read_table_filtered(file_path, sheet_name, max_rows, columns, [])[0]
+    if file_ext in ['.xlsx', '.xls']:
+        return read_pandas_table(functools.partial(pd.read_excel, file_path, sheet_name=sheet_name), columns, nrows=max_rows)
+    elif file_ext == '.csv':
+        return read_pandas_table(functools.partial(pd.read_csv, file_path), columns, nrows=max_rows)
+    raise ValueError("Format de fichier non supporté")
+
+# Cache des feuilles déjà analysées par read_excel, indexé par
+# (chemin, mtime, taille, feuille) et borné par un budget mémoire en octets.
+READ_CACHE_MAX_BYTES = int(os.environ.get("AI_SHEETS_READ_CACHE_BYTES", str(256 * 1024 * 1024)))
+PROFILE_CACHE_ENTRIES = 256
+
+class ParsedSheetCache:
+    """Cache LRU de DataFrames analysés, invalidé quand le fichier change"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # clé -> (DataFrame, nombre de lignes demandées ou None si complet, taille)
+        self._entries: "OrderedDict[Tuple[str, int, int, Any], Tuple[pd.DataFrame, Optional[int], int]]" = OrderedDict()
+        # Profils calculés par describe_sheet, invalidés avec le fichier :
+        # (clé de feuille, paramètres) -> profil
+        self._profiles: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = OrderedDict()
+    
+    @staticmethod
+    def file_key(file_path: str) -> Tuple[str, int, int]:
+        """Identité d'un fichier : chemin réel, mtime et taille"""
+        real_path = os.path.realpath(file_path)
+        st = os.stat(real_path)
+        return real_path, st.st_mtime_ns, st.st_size
+    
+    def get(self, file_path: str, sheet_name: Any, max_rows: Optional[int]) -> Optional[pd.DataFrame]:
+        """Retourne la feuille si elle est en cache avec au moins max_rows lignes
+        (max_rows=None : feuille complète)"""
+        key = (*self.file_key(file_path), sheet_name)
+        entry = self._entries.get(key)
+        if entry is None or (entry[1] is not None and (max_rows is None or entry[1] < max_rows)):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0] if max_rows is None else entry[0].head(max_rows)
+    
+    def put(self, file_path: str, sheet_name: Any, df: pd.DataFrame, max_rows: Optional[int]) -> None:
+        """Ajoute une feuille analysée en évinçant les entrées les plus anciennes"""
+        real_path, mtime, size = self.file_key(file_path)
+        # Les anciennes versions du fichier ne serviront plus
+        self.invalidate(file_path, keep=(mtime, size))
         
-        # Créer le répertoire si nécessaire
-        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        key = (real_path, mtime, size, sheet_name)
+        # Moins de lignes que demandé : la feuille est complète
+        nrows = None if max_rows is None or len(df) < max_rows else max_rows
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
         
-        # Sauvegarder toutes les feuilles du classeur
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            for sheet_name, df in workbooks[filename].items():
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[2]
+        self._entries[key] = (df, nrows, nbytes)
+        self.current_bytes += nbytes
         
-        return f"�� Sauvegarde automatique: {file_path}"
+        while self.current_bytes > self.max_bytes:
+            _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_bytes
+            self.evictions += 1
+    
+    def get_profile(self, file_path: str, sheet_name: Any, params: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+        """Profil déjà calculé pour cette version du fichier"""
+        key = (*self.file_key(file_path), sheet_name, params)
+        profile = self._profiles.get(key)
+        if profile is not None:
+            self._profiles.move_to_end(key)
+        return profile
+    
+    def put_profile(self, file_path: str, sheet_name: Any, params: Tuple[Any, ...], profile: Dict[str, Any]) -> None:
+        """Mémorise un profil (quelques Ko) ; LRU borné à PROFILE_CACHE_ENTRIES"""
+        real_path, mtime, size = self.file_key(file_path)
+        self.invalidate(file_path, keep=(mtime, size))
+        self._profiles[(real_path, mtime, size, sheet_name, params)] = profile
+        while len(self._profiles) > PROFILE_CACHE_ENTRIES:
+            self._profiles.popitem(last=False)
+    
+    def invalidate(self, file_path: str, keep: Optional[Tuple[int, int]] = None) -> None:
+        """Supprime les entrées d'un fichier (sauf la version keep=(mtime, taille))"""
+        real_path = os.path.realpath(file_path)
+        for key in [k for k in self._entries if k[0] == real_path]:
+            if keep is not None and key[1:3] == keep:
+                continue
+            _, _, nbytes = self._entries.pop(key)
+            self.current_bytes -= nbytes
+            self.invalidations += 1
+        for key in [k for k in self._profiles if k[0] == real_path]:
+            if keep is None or key[1:3] != keep:
+                del self._profiles[key]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache"""
+        return {
+            "entries": len(self._entries),
+            "profiles": len(self._profiles),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+read_cache = ParsedSheetCache(READ_CACHE_MAX_BYTES)
+
+async def read_table_cached(file_path: str, sheet_name: Any, max_rows: Optional[int], columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, bool]:
+    """Lit une feuille via le cache ; retourne (DataFrame, vrai si servi depuis le cache)"""
+    df = read_cache.get(file_path, sheet_name, max_rows)
+    if df is not None:
+        return select_columns(df, columns), True
+    if columns is not None:
+        # Lecture projetée : seules les colonnes demandées sont analysées,
+        # le résultat partiel n'est pas mis en cache
+        return await run_blocking(read_table_file, file_path, sheet_name, max_rows, columns), False
+    df = await run_blocking(read_table_file, file_path, sheet_name, max_rows)
+    read_cache.put(file_path, sheet_name, df, max_rows)
+    return select_columns(df, columns), False
+
+# Fusion de fichiers (merge_files) : chaque fichier est analysé dans le pool
+# de lecture, les schémas sont alignés par nom de colonne (union ou
+# intersection) puis les lignes concaténées en une seule feuille.
+MERGE_MAX_FILES = int(os.environ.get("AI_SHEETS_MERGE_MAX_FILES", "1000"))
+
+def resolve_merge_paths(paths: Optional[List[str]], pattern: Optional[str]) -> List[str]:
+    """Fichiers à fusionner : motif glob (trié, ** récursif) puis chemins explicites"""
+    files = []
+    if pattern:
+        files.extend(
+            path for path in sorted(glob.glob(os.path.expanduser(pattern), recursive=True))
+            if Path(path).suffix.lower() in TABLE_EXTENSIONS and Path(path).is_file()
+        )
+    files.extend(paths or [])
+    return list(dict.fromkeys(files))
+
+def ingest_file(file_path: str, sheet_name: Any) -> Tuple[Optional[pd.DataFrame], float, Optional[str]]:
+    """Analyse un fichier dans le pool ; retourne (DataFrame ou None, durée, erreur)"""
+    started = time.perf_counter()
+    try:
+        if not Path(file_path).exists():
+            raise FileNotFoundError("fichier introuvable")
+        df = read_table_file(file_path, sheet_name, None)
+        # Les exports mensuels diffèrent souvent par des espaces autour des en-têtes
+        df.columns = [str(c).strip() for c in df.columns]
+        return df, time.perf_counter() - started, None
     except Exception as e:
-        return f"❌ Erreur sauvegarde automatique: {str(e)}"
+        return None, time.perf_counter() - started, str(e)
+
+def merge_frames(frames: List[Tuple[str, pd.DataFrame]], join: str, source_column: Optional[str]) -> pd.DataFrame:
+    """Concatène des feuilles en alignant leurs colonnes par nom"""
+    aligned = []
+    for file_path, df in frames:
+        if source_column:
+            df = df.copy(deep=False)
+            df.insert(0, source_column, Path(file_path).name, allow_duplicates=True)
+        aligned.append(df)
+    return pd.concat(aligned, ignore_index=True, sort=False, join=join)
+
+# Parties XML d'un fichier .xlsx : chaque feuille est rendue une seule fois
+# après modification puis réutilisée telle quelle lors des sauvegardes
+# suivantes ; seul le conteneur zip est reconstruit.
+
+_XLSX_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_XLSX_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_XLSX_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Index des styles de cellule définis dans _XLSX_STYLES
+_STYLE_HEADER = 1
+_STYLE_DATETIME = 2
+
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<styleSheet xmlns="{_XLSX_NS}">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+@functools.lru_cache(maxsize=None)
+def _excel_epoch() -> Any:
+    """Origine des numéros de série Excel (pd.Timestamp, créé au premier usage)"""
+    return pd.Timestamp("1899-12-30")
+
+def _column_letter(index: int) -> str:
+    """Convertit un index de colonne (0 = A) en lettres Excel"""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def _string_cell(ref: str, value: Any, style: int = 0) -> str:
+    """Cellule texte en chaîne inline (pas de table de chaînes partagée)"""
+    text = xml_escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    style_attr = f' s="{style}"' if style else ""
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t{space}>{text}</t></is></c>'
+
+def _excel_serial(value: Any) -> Optional[float]:
+    """Convertit une date en numéro de série Excel"""
+    ts = pd.Timestamp(value)
+    if ts is pd.NaT:
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return float((ts - _excel_epoch()) / pd.Timedelta(days=1))
+
+def _value_cell(ref: str, value: Any) -> str:
+    """Cellule pour une valeur Python quelconque (colonnes de type object)"""
+    if isinstance(value, np.generic) and not isinstance(value, np.datetime64):
+        # Scalaires NumPy : repr() donnerait "np.int64(3)" avec NumPy 2
+        value = value.item()
+    if value is None or (isinstance(value, float) and not np.isfinite(value)):
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, int):
+        return f'<c r="{ref}"><v>{int(value)}</v></c>'
+    if isinstance(value, float):
+        return f'<c r="{ref}"><v>{float(value)!r}</v></c>'
+    if isinstance(value, (datetime.datetime, datetime.date, np.datetime64)):
+        serial = _excel_serial(value)
+        return "" if serial is None else f'<c r="{ref}" s="{_STYLE_DATETIME}"><v>{serial!r}</v></c>'
+    if value is pd.NA or value is pd.NaT:
+        return ""
+    return _string_cell(ref, value)
+
+def _column_cells(letter: str, series: pd.Series, first_row: int = 2) -> List[str]:
+    """Rend toutes les cellules d'une colonne (lignes first_row..)"""
+    rows = range(first_row, len(series) + first_row)
+    if pd.api.types.is_bool_dtype(series.dtype) and not series.hasnans:
+        return [f'<c r="{letter}{r}" t="b"><v>{int(v)}</v></c>' for r, v in zip(rows, series.tolist())]
+    if pd.api.types.is_integer_dtype(series.dtype) and not series.hasnans:
+        return [f'<c r="{letter}{r}"><v>{v}</v></c>' for r, v in zip(rows, series.tolist())]
+    if pd.api.types.is_float_dtype(series.dtype):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        finite = np.isfinite(values)
+        return [
+            f'<c r="{letter}{r}"><v>{v!r}</v></c>' if ok else ""
+            for r, v, ok in zip(rows, values.tolist(), finite.tolist())
+        ]
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        if getattr(series.dtype, "tz", None) is not None:
+            series = series.dt.tz_localize(None)
+        serials = ((series - _excel_epoch()) / pd.Timedelta(days=1)).tolist()
+        return [
+            "" if pd.isna(v) else f'<c r="{letter}{r}" s="{_STYLE_DATETIME}"><v>{v!r}</v></c>'
+            for r, v in zip(rows, serials)
+        ]
+    return [_value_cell(f"{letter}{r}", v) for r, v in zip(rows, series.tolist())]
+
+_SHEET_PART_END = b'</sheetData></worksheet>'
+
+def _dimension(letters: List[str], rows: int) -> str:
+    last_cell = f"{letters[-1]}{rows + 1}" if letters else "A1"
+    return f'<dimension ref="A1:{last_cell}"/>'
+
+def _render_rows(df: pd.DataFrame, letters: List[str], first_row: int) -> str:
+    columns = [_column_cells(letter, df.iloc[:, i], first_row) for i, letter in enumerate(letters)]
+    return "".join(
+        f'<row r="{r}">{"".join(cells)}</row>'
+        for r, cells in enumerate(zip(*columns), start=first_row)
+    )
+
+def render_sheet_part(df: pd.DataFrame) -> bytes:
+    """Rend une feuille en XML SpreadsheetML (en-tête en gras, sans index)"""
+    letters = [_column_letter(i) for i in range(len(df.columns))]
+    header = "".join(
+        _string_cell(f"{letter}1", name, _STYLE_HEADER)
+        for letter, name in zip(letters, df.columns)
+    )
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+        f'<worksheet xmlns="{_XLSX_NS}">{_dimension(letters, len(df))}<sheetData>',
+        f'<row r="1">{header}</row>',
+        _render_rows(df, letters, 2)
+    ]
+    return "".join(parts).encode("utf-8") + _SHEET_PART_END
+
+def extend_sheet_part(part: bytes, tail: pd.DataFrame, rendered_rows: int) -> bytes:
+    """Complète le rendu d'une feuille (rendered_rows lignes de données) avec
+    les lignes ajoutées en fin de feuille, sans re-rendre les précédentes"""
+    letters = [_column_letter(i) for i in range(len(tail.columns))]
+    old_dimension = _dimension(letters, rendered_rows).encode("utf-8")
+    start = part.index(old_dimension)
+    rows = _render_rows(tail, letters, rendered_rows + 2).encode("utf-8")
+    return b"".join([
+        part[:start],
+        _dimension(letters, rendered_rows + len(tail)).encode("utf-8"),
+        part[start + len(old_dimension):-len(_SHEET_PART_END)],
+        rows,
+        _SHEET_PART_END
+    ])
+
+# Règles d'Excel pour les noms de feuilles : un nom invalide produit un
+# classeur que ni Excel ni openpyxl ne savent ouvrir
+SHEET_NAME_MAX_LENGTH = 31
+_SHEET_NAME_FORBIDDEN = '[]:*?/\\'
+
+def check_sheet_name(sheet_name: Any, existing: List[str] = ()) -> None:
+    """Vérifie un nom de feuille (longueur, caractères, unicité sans casse)"""
+    if not isinstance(sheet_name, str) or not sheet_name.strip():
+        raise ValueError("Le nom de feuille ne peut pas être vide")
+    if len(sheet_name) > SHEET_NAME_MAX_LENGTH:
+        raise ValueError(
+            f"Nom de feuille trop long ({len(sheet_name)} caractères, maximum {SHEET_NAME_MAX_LENGTH}) : '{sheet_name}'"
+        )
+    forbidden = [c for c in _SHEET_NAME_FORBIDDEN if c in sheet_name]
+    if forbidden or any(ord(c) < 32 for c in sheet_name):
+        raise ValueError(
+            f"Nom de feuille invalide '{sheet_name}' : caractères interdits {' '.join(forbidden) or '(contrôle)'}"
+        )
+    if sheet_name.startswith("'") or sheet_name.endswith("'"):
+        raise ValueError(f"Nom de feuille invalide '{sheet_name}' : apostrophe en début ou en fin")
+    if sheet_name.casefold() == "history":
+        raise ValueError("Le nom de feuille 'History' est réservé par Excel")
+    for other in existing:
+        if other != sheet_name and other.casefold() == sheet_name.casefold():
+            raise ValueError(f"Nom de feuille '{sheet_name}' déjà utilisé (la casse est ignorée) : '{other}'")
+
+def _write_workbook_zip(target: Any, sheet_parts: List[Tuple[str, bytes]]) -> None:
+    """Écrit le conteneur .xlsx dans target (chemin ou tampon binaire)"""
+    if not sheet_parts:
+        raise ValueError("Le classeur ne contient aucune feuille")
+    names = [name for name, _ in sheet_parts]
+    for i, name in enumerate(names):
+        if name in names[:i]:
+            raise ValueError(f"Nom de feuille en double : '{name}'")
+        check_sheet_name(name, names[:i])
+    
+    sheets_xml = "".join(
+        f'<sheet name="{xml_escape(name, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+        for i, (name, _) in enumerate(sheet_parts, start=1)
+    )
+    sheet_rels = "".join(
+        f'<Relationship Id="rId{i}" Type="{_XLSX_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, len(sheet_parts) + 1)
+    )
+    styles_id = len(sheet_parts) + 1
+    sheet_types = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, len(sheet_parts) + 1)
+    )
+    xml_header = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr("[Content_Types].xml", (
+            f'{xml_header}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{sheet_types}</Types>'
+        ))
+        zf.writestr("_rels/.rels", (
+            f'{xml_header}<Relationships xmlns="{_XLSX_PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_XLSX_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        zf.writestr("xl/workbook.xml", (
+            f'{xml_header}<workbook xmlns="{_XLSX_NS}" xmlns:r="{_XLSX_REL_NS}">'
+            f'<sheets>{sheets_xml}</sheets></workbook>'
+        ))
+        zf.writestr("xl/_rels/workbook.xml.rels", (
+            f'{xml_header}<Relationships xmlns="{_XLSX_PKG_REL_NS}">{sheet_rels}'
+            f'<Relationship Id="rId{styles_id}" Type="{_XLSX_REL_NS}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        ))
+        zf.writestr("xl/styles.xml", _XLSX_STYLES)
+        for i, (_, part) in enumerate(sheet_parts, start=1):
+            zf.writestr(f"xl/worksheets/sheet{i}.xml", part)
+
+def check_xlsx_output(file_path: str) -> None:
+    """Refuse d'écrire un conteneur .xlsx sous un nom .xls (illisible par les lecteurs .xls)"""
+    if Path(file_path).suffix.lower() == '.xls':
+        raise ValueError(
+            f"Écriture au format .xls (Excel 97-2003) non prise en charge : '{file_path}' ; utilisez l'extension .xlsx"
+        )
+
+def write_workbook_parts(file_path: str, sheet_parts: List[Tuple[str, bytes]]) -> None:
+    """Assemble le conteneur .xlsx à partir des feuilles déjà rendues"""
+    check_xlsx_output(file_path)
+    # Écriture dans un fichier temporaire puis remplacement atomique
+    path = Path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+    _write_workbook_zip(tmp_path, sheet_parts)
+    os.replace(tmp_path, path)
+
+XLSX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def serialize_workbook_parts(sheet_parts: List[Tuple[str, bytes]]) -> bytes:
+    """Assemble le conteneur .xlsx en mémoire à partir des feuilles déjà rendues"""
+    buffer = io.BytesIO()
+    _write_workbook_zip(buffer, sheet_parts)
+    return buffer.getvalue()
+
+# Moteurs d'écriture .xlsx, configurables par serveur (AI_SHEETS_WRITER_ENGINE)
+# ou par appel (paramètre "engine") :
+# - incremental : feuilles rendues en XML et mises en cache (classeurs en mémoire)
+# - openpyxl : pandas.ExcelWriter, graphe complet des cellules en mémoire
+# - xlsxwriter : écriture en flux ligne par ligne (constant_memory)
+# - auto : xlsxwriter au-delà de AI_SHEETS_STREAMING_CELLS cellules, sinon
+#   le moteur par défaut de l'outil
+WRITER_ENGINES = ["auto", "incremental", "openpyxl", "xlsxwriter"]
+WRITER_ENGINE = os.environ.get("AI_SHEETS_WRITER_ENGINE", "auto").lower()
+STREAMING_CELLS_THRESHOLD = int(os.environ.get("AI_SHEETS_STREAMING_CELLS", "1000000"))
+_STREAMING_CHUNK_ROWS = 10_000
+
+# Schéma du paramètre "engine" des outils d'écriture
+ENGINE_SCHEMA = {
+    "type": "string",
+    "enum": WRITER_ENGINES,
+    "description": "Moteur d'écriture .xlsx (optionnel) : xlsxwriter écrit en flux à mémoire constante"
+}
+
+def _xlsxwriter_available() -> bool:
+    return importlib.util.find_spec("xlsxwriter") is not None
+
+def resolve_writer_engine(requested: Optional[str], sheets: Dict[str, pd.DataFrame], default: str) -> str:
+    """Choisit le moteur effectif. Le moteur configuré (AI_SHEETS_WRITER_ENGINE)
+    se replie sur openpyxl si nécessaire ; un moteur demandé explicitement
+    par l'outil est respecté ou refusé avec une erreur."""
+    engine = (requested or WRITER_ENGINE).lower()
+    if engine not in WRITER_ENGINES:
+        raise ValueError(f"Moteur d'écriture inconnu: {engine} ({', '.join(WRITER_ENGINES)})")
+    explicit = requested is not None and engine != "auto"
+    
+    # Colonnes multi-niveaux : seul le rendu pandas/openpyxl les gère
+    if any(isinstance(df.columns, pd.MultiIndex) for df in sheets.values()):
+        if explicit and engine != "openpyxl":
+            raise ValueError(f"Le moteur '{engine}' ne gère pas les colonnes multi-niveaux, utilisez openpyxl")
+        return "openpyxl"
+    if engine == "auto":
+        cells = sum(df.size for df in sheets.values())
+        if cells >= STREAMING_CELLS_THRESHOLD and _xlsxwriter_available():
+            return "xlsxwriter"
+        return default
+    if engine == "xlsxwriter" and not _xlsxwriter_available():
+        if explicit:
+            raise ValueError("Moteur 'xlsxwriter' demandé mais le paquet xlsxwriter n'est pas installé (pip install xlsxwriter)")
+        return "openpyxl"
+    return engine
+
+def _write_xlsxwriter_streaming(target: Any, sheets: Dict[str, pd.DataFrame]) -> None:
+    """Écrit les feuilles ligne par ligne avec xlsxwriter en mémoire constante
+    (target : chemin ou tampon binaire)"""
+    import xlsxwriter
+    
+    workbook = xlsxwriter.Workbook(target, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+        "remove_timezone": True,
+        "nan_inf_to_errors": True,
+        "strings_to_formulas": False,
+        "strings_to_urls": False
+    })
+    try:
+        header_format = workbook.add_format({"bold": True})
+        for sheet_name, df in sheets.items():
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, [str(c) for c in df.columns], header_format)
+            
+            # constant_memory impose d'écrire les lignes dans l'ordre ;
+            # la conversion se fait par blocs pour borner la mémoire
+            for start in range(0, len(df), _STREAMING_CHUNK_ROWS):
+                chunk = df.iloc[start:start + _STREAMING_CHUNK_ROWS]
+                chunk = chunk.astype(object).where(chunk.notna(), None)
+                for row_index, row in enumerate(chunk.itertuples(index=False, name=None), start=start + 1):
+                    worksheet.write_row(row_index, 0, row)
+    finally:
+        workbook.close()
+
+def write_sheets_file(file_path: str, sheets: Dict[str, pd.DataFrame], engine: str) -> None:
+    """Écrit des feuilles dans un fichier .xlsx avec le moteur donné (déjà résolu)"""
+    check_xlsx_output(file_path)
+    if engine == "incremental":
+        write_workbook_parts(file_path, [(name, render_sheet_part(df)) for name, df in sheets.items()])
+        return
+    
+    # Écriture dans un fichier temporaire puis remplacement atomique
+    path = Path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+    _write_sheets(str(tmp_path), sheets, engine)
+    os.replace(tmp_path, path)
+
+def serialize_sheets(sheets: Dict[str, pd.DataFrame], engine: str) -> bytes:
+    """Sérialise des feuilles en .xlsx en mémoire avec le moteur donné (déjà résolu)"""
+    if engine == "incremental":
+        return serialize_workbook_parts([(name, render_sheet_part(df)) for name, df in sheets.items()])
+    buffer = io.BytesIO()
+    _write_sheets(buffer, sheets, engine)
+    return buffer.getvalue()
+
+def _write_sheets(target: Any, sheets: Dict[str, pd.DataFrame], engine: str) -> None:
+    """Écrit des feuilles avec xlsxwriter ou openpyxl dans target (chemin ou tampon)"""
+    if engine == "xlsxwriter":
+        _write_xlsxwriter_streaming(target, sheets)
+    else:
+        with pd.ExcelWriter(target, engine='openpyxl') as writer:
+            for sheet_name, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+# Sauvegarde automatique différée (write-behind) : les modifications sont
+# regroupées pendant une fenêtre de debounce puis écrites en arrière-plan.
+SAVE_DEBOUNCE_SECONDS = float(os.environ.get("AI_SHEETS_SAVE_DEBOUNCE", "1.0"))
+SAVE_MAX_DELAY_SECONDS = float(os.environ.get("AI_SHEETS_SAVE_MAX_DELAY", "10.0"))
+
+class SaveScheduler:
+    """Planificateur de sauvegardes avec suivi des feuilles modifiées"""
+    
+    def __init__(self, debounce: float, max_delay: float):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        # Feuilles à re-rendre par classeur
+        self._dirty: Dict[str, Set[str]] = {}
+        # XML des feuilles déjà rendues par classeur
+        self._parts: Dict[str, Dict[str, bytes]] = {}
+        # Feuilles modifiées mais déjà re-rendues par serialize : le disque
+        # reste à écrire, le rendu en cache est à jour
+        self._fresh: Dict[str, Set[str]] = {}
+        # Forme (lignes, colonnes) de chaque rendu en cache, et feuilles
+        # seulement allongées (append_rows) depuis ce rendu : il suffit alors
+        # de rendre les nouvelles lignes
+        self._shapes: Dict[str, Dict[str, Tuple[int, Tuple[Any, ...]]]] = {}
+        self._appended: Dict[str, Set[str]] = {}
+        self._first_dirty: Dict[str, float] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.last_errors: Dict[str, str] = {}
+    
+    def mark_dirty(self, filename: str, sheet_name: str, appended: bool = False) -> None:
+        """Marque une feuille comme modifiée et (re)programme la sauvegarde.
+        appended : la modification se limite à des lignes ajoutées en fin de feuille."""
+        dirty = self._dirty.setdefault(filename, set())
+        fresh = self._fresh.setdefault(filename, set())
+        appended_only = self._appended.setdefault(filename, set())
+        if appended and (sheet_name not in dirty or sheet_name in fresh or sheet_name in appended_only):
+            appended_only.add(sheet_name)
+        else:
+            appended_only.discard(sheet_name)
+        dirty.add(sheet_name)
+        fresh.discard(sheet_name)
+        loop = asyncio.get_running_loop()
+        first = self._first_dirty.setdefault(filename, loop.time())
+        
+        # Coalescence : on repousse la sauvegarde tant que les modifications
+        # continuent, sans dépasser le délai maximal depuis la première
+        delay = min(self.debounce, max(0.0, first + self.max_delay - loop.time()))
+        task = self._tasks.get(filename)
+        if task is not None and not task.done():
+            task.cancel()
+        self._tasks[filename] = asyncio.create_task(self._delayed_flush(filename, delay))
+    
+    def forget(self, filename: str) -> None:
+        """Oublie l'état de sauvegarde d'un classeur (recréé ou supprimé)"""
+        task = self._tasks.pop(filename, None)
+        if task is not None and not task.done():
+            task.cancel()
+        self._dirty.pop(filename, None)
+        self._parts.pop(filename, None)
+        self._fresh.pop(filename, None)
+        self._shapes.pop(filename, None)
+        self._appended.pop(filename, None)
+        self._first_dirty.pop(filename, None)
+        self.last_errors.pop(filename, None)
+        lock = self._locks.get(filename)
+        if lock is not None and not lock.locked():
+            del self._locks[filename]
+    
+    def is_dirty(self, filename: str) -> bool:
+        """Indique si des modifications sont en attente d'écriture"""
+        return bool(self._dirty.get(filename))
+    
+    async def _render(self, filename: str, sheets: Dict[str, pd.DataFrame], names: List[str]) -> None:
+        """Rend les feuilles names dans le cache ; une feuille seulement
+        allongée depuis son dernier rendu est complétée au lieu d'être re-rendue"""
+        parts = self._parts.setdefault(filename, {})
+        shapes = self._shapes.setdefault(filename, {})
+        appended_only = self._appended.setdefault(filename, set())
+        jobs = []
+        new_shapes = {}
+        for name in names:
+            df = sheets[name]
+            shape = (len(df), tuple(df.columns))
+            previous = shapes.get(name)
+            if name in appended_only and name in parts and previous is not None \
+                    and previous[1] == shape[1] and previous[0] <= shape[0] and shape[1]:
+                jobs.append(run_blocking(extend_sheet_part, parts[name], df.iloc[previous[0]:], previous[0]))
+            else:
+                jobs.append(run_blocking(render_sheet_part, df))
+            new_shapes[name] = shape
+            # Les ajouts survenant pendant le rendu seront marqués de nouveau
+            appended_only.discard(name)
+        rendered = await asyncio.gather(*jobs)
+        parts.update(zip(names, rendered))
+        shapes.update(new_shapes)
+    
+    async def _delayed_flush(self, filename: str, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        # Une fois l'écriture lancée, la tâche ne doit plus être annulée
+        if self._tasks.get(filename) is asyncio.current_task():
+            del self._tasks[filename]
+        try:
+            await self.flush(filename)
+        except Exception:
+            # Erreur déjà enregistrée dans last_errors
+            pass
+    
+    async def flush(self, filename: str, engine: Optional[str] = None) -> Tuple[str, str]:
+        """Écrit immédiatement le classeur ; retourne (chemin, moteur utilisé).
+        Avec le moteur incrémental, seules les feuilles modifiées sont re-rendues."""
+        task = self._tasks.pop(filename, None)
+        if task is not None and not task.done():
+            task.cancel()
+        
+        lock = self._locks.setdefault(filename, asyncio.Lock())
+        async with lock:
+            await workbooks.ensure_loaded(filename)
+            sheets = dict(workbooks[filename])
+            file_path = workbook_paths.get(filename) or f"/Users/usuario1/Documents/{filename}.xlsx"
+            workbook_paths[filename] = file_path
+            
+            dirty = self._dirty.pop(filename, set())
+            fresh = self._fresh.pop(filename, set())
+            self._first_dirty.pop(filename, None)
+            parts = self._parts.setdefault(filename, {})
+            
+            try:
+                # Feuilles supprimées ou jamais rendues
+                for sheet_name in list(parts):
+                    if sheet_name not in sheets:
+                        del parts[sheet_name]
+                
+                used_engine = resolve_writer_engine(engine, sheets, "incremental")
+                if used_engine != "incremental":
+                    # Écriture complète : le rendu en cache des feuilles modifiées est périmé
+                    for sheet_name in dirty:
+                        parts.pop(sheet_name, None)
+                        self._shapes.get(filename, {}).pop(sheet_name, None)
+                    await run_blocking(write_sheets_file, file_path, sheets, used_engine)
+                    read_cache.invalidate(file_path)
+                    self.last_errors.pop(filename, None)
+                    return file_path, used_engine
+                
+                to_render = [name for name in sheets if (name in dirty and name not in fresh) or name not in parts]
+                await self._render(filename, sheets, to_render)
+                
+                await run_blocking(
+                    write_workbook_parts,
+                    file_path,
+                    [(name, parts[name]) for name in sheets]
+                )
+                read_cache.invalidate(file_path)
+            except Exception as e:
+                # On remet les feuilles en attente pour la prochaine tentative
+                self._dirty.setdefault(filename, set()).update(dirty)
+                self.last_errors[filename] = str(e)
+                raise
+            
+            self.last_errors.pop(filename, None)
+            return file_path, used_engine
+    
+    async def serialize(self, filename: str, engine: Optional[str] = None) -> Tuple[bytes, str]:
+        """Sérialise le classeur en mémoire sans toucher au disque ; retourne
+        (contenu .xlsx, moteur utilisé). La sauvegarde différée reste programmée."""
+        lock = self._locks.setdefault(filename, asyncio.Lock())
+        async with lock:
+            await workbooks.ensure_loaded(filename)
+            sheets = dict(workbooks[filename])
+            used_engine = resolve_writer_engine(engine, sheets, "incremental")
+            if used_engine != "incremental":
+                data = await run_blocking(serialize_sheets, sheets, used_engine)
+                return data, used_engine
+            
+            parts = self._parts.setdefault(filename, {})
+            for sheet_name in list(parts):
+                if sheet_name not in sheets:
+                    del parts[sheet_name]
+            
+            # Le rendu sert aussi à la prochaine écriture sur disque
+            dirty = self._dirty.get(filename, set())
+            fresh = self._fresh.setdefault(filename, set())
+            to_render = [name for name in sheets if (name in dirty and name not in fresh) or name not in parts]
+            # Marquées avant le rendu : une modification pendant le rendu
+            # les retire de fresh via mark_dirty
+            fresh.update(dirty.intersection(to_render))
+            try:
+                await self._render(filename, sheets, to_render)
+            except Exception:
+                fresh.difference_update(to_render)
+                raise
+            
+            data = await run_blocking(
+                serialize_workbook_parts,
+                [(name, parts[name]) for name in sheets]
+            )
+            return data, used_engine
+    
+    async def flush_all(self) -> None:
+        """Écrit tous les classeurs ayant des modifications en attente"""
+        for filename in list(self._dirty):
+            if filename in workbooks and self.is_dirty(filename):
+                try:
+                    await self.flush(filename)
+                except Exception as e:
+                    logger.error("Erreur sauvegarde de '%s': %s", filename, e)
+
+save_scheduler = SaveScheduler(SAVE_DEBOUNCE_SECONDS, SAVE_MAX_DELAY_SECONDS)
+
+def auto_save_workbook(filename: str, sheet_name: str, appended: bool = False) -> str:
+    """Sauvegarde automatique d'un classeur (différée, hors du chemin de la requête)"""
+    if filename not in workbooks:
+        return "❌ Classeur non trouvé"
+    
+    file_path = workbook_paths.get(filename)
+    if not file_path:
+        # Chemin par défaut
+        file_path = f"/Users/usuario1/Documents/{filename}.xlsx"
+        workbook_paths[filename] = file_path
+    
+    save_scheduler.mark_dirty(filename, sheet_name, appended)
+    
+    message = f"💾 Sauvegarde automatique programmée: {file_path}"
+    if filename in save_scheduler.last_errors:
+        message += f"\n⚠️ Dernière sauvegarde en échec: {save_scheduler.last_errors[filename]}"
+    return message
+
+# Lecture paginée : le fichier est ouvert une seule fois (openpyxl en mode
+# read-only ou read_csv itératif) et le lecteur reste ouvert entre deux pages.
+# Le curseur rendu à l'agent est opaque et permet de rouvrir le fichier à la
+# bonne position si le lecteur a été fermé entre-temps.
+PAGE_READERS_MAX = int(os.environ.get("AI_SHEETS_PAGE_READERS", "16"))
+PAGE_READER_TTL_SECONDS = float(os.environ.get("AI_SHEETS_PAGE_READER_TTL", "600"))
+PAGE_SIZE_MAX = int(os.environ.get("AI_SHEETS_PAGE_SIZE_MAX", "10000"))
+
+def _json_safe_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convertit un DataFrame en liste d'objets JSON (NaN -> null)"""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+class PageReader:
+    """Lecteur séquentiel d'une feuille, positionné sur une ligne de données"""
+    
+    def __init__(self, file_path: str, sheet_name: Any):
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.offset = 0
+        self.columns: List[str] = []
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self._workbook = None
+        self._rows = None
+        self._csv = None
+        self._arrow = None
+        self._arrow_schema = None
+        self._batches = None
+        self._pending = None
+        self._open()
+    
+    def _open(self) -> None:
+        file_ext = Path(self.file_path).suffix.lower()
+        if file_ext == '.csv':
+            self._csv = pd.read_csv(self.file_path, iterator=True)
+        elif file_ext in COLUMNAR_EXTENSIONS:
+            self._arrow, self._arrow_schema, self._batches = open_arrow_file(self.file_path)
+            self.columns = [str(c) for c in self._arrow_schema.names]
+        elif file_ext == '.xlsx':
+            from openpyxl import load_workbook
+            self._workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+            if isinstance(self.sheet_name, int):
+                sheet = self._workbook.worksheets[self.sheet_name]
+            else:
+                sheet = self._workbook[self.sheet_name]
+            self._rows = sheet.iter_rows(values_only=True)
+            header = next(self._rows, None) or ()
+            self.columns = normalize_headers(header)
+        elif file_ext != '.xls':
+            raise ValueError("Format de fichier non supporté")
+    
+    def skip(self, count: int) -> None:
+        """Avance de count lignes sans les convertir"""
+        while count > 0:
+            step = min(count, 10_000)
+            if self._rows is not None:
+                for _ in itertools.islice(self._rows, step):
+                    pass
+            elif self._batches is not None:
+                _, self._pending = take_arrow_rows(self._batches, self._pending, step)
+            elif self._csv is not None:
+                try:
+                    self.columns = [str(c) for c in self._csv.get_chunk(step).columns]
+                except StopIteration:
+                    pass
+            count -= step
+            self.offset += step
+    
+    def read_page(self, page_size: int) -> pd.DataFrame:
+        """Lit les page_size lignes suivantes"""
+        if self._rows is not None:
+            rows = list(itertools.islice(self._rows, page_size))
+            width = len(self.columns)
+            df = pd.DataFrame(
+                [row[:width] + (None,) * (width - len(row)) for row in rows],
+                columns=self.columns
+            )
+        elif self._batches is not None:
+            taken, self._pending = take_arrow_rows(self._batches, self._pending, page_size)
+            df = arrow_to_pandas(self._arrow_schema, taken)
+        elif self._csv is not None:
+            try:
+                df = self._csv.get_chunk(page_size)
+            except StopIteration:
+                df = pd.DataFrame(columns=self.columns)
+            self.columns = [str(c) for c in df.columns] or self.columns
+        else:
+            # .xls : pas de lecture en flux possible, on relit la tranche demandée
+            df = pd.read_excel(
+                self.file_path,
+                sheet_name=self.sheet_name,
+                skiprows=range(1, self.offset + 1),
+                nrows=page_size
+            )
+            self.columns = [str(c) for c in df.columns]
+        self.offset += len(df)
+        return df
+    
+    def close(self) -> None:
+        if self._workbook is not None:
+            self._workbook.close()
+        if self._csv is not None:
+            self._csv.close()
+        if self._arrow is not None:
+            self._arrow.close()
+        self._workbook = self._rows = self._csv = None
+        self._arrow = self._batches = self._pending = None
+
+class PageReaderRegistry:
+    """Lecteurs ouverts, indexés par identifiant de curseur (LRU + expiration)"""
+    
+    def __init__(self, max_readers: int, ttl: float):
+        self.max_readers = max_readers
+        self.ttl = ttl
+        self._readers: "OrderedDict[str, PageReader]" = OrderedDict()
+    
+    @staticmethod
+    def encode_cursor(reader_id: str, reader: PageReader) -> str:
+        payload = json.dumps({
+            "id": reader_id,
+            "path": reader.file_path,
+            "sheet": reader.sheet_name,
+            "offset": reader.offset
+        })
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Dict[str, Any]:
+        try:
+            return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except Exception:
+            raise ValueError("Curseur invalide")
+    
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for reader_id, reader in list(self._readers.items()):
+            if now - reader.last_used > self.ttl and not reader.lock.locked():
+                self.close(reader_id)
+        while len(self._readers) > self.max_readers:
+            reader_id = next(iter(self._readers))
+            self.close(reader_id)
+    
+    def __len__(self) -> int:
+        return len(self._readers)
+    
+    def close(self, reader_id: str) -> None:
+        reader = self._readers.pop(reader_id, None)
+        if reader is not None:
+            reader.close()
+    
+    def close_all(self) -> None:
+        for reader_id in list(self._readers):
+            self.close(reader_id)
+    
+    async def acquire(self, file_path: Optional[str], sheet_name: Any,
+                      cursor: Optional[str]) -> Tuple[str, PageReader]:
+        """Retourne le lecteur positionné sur le curseur (rouvert si nécessaire)"""
+        if cursor:
+            state = self.decode_cursor(cursor)
+            reader_id, file_path = state["id"], state["path"]
+            sheet_name, offset = state["sheet"], state["offset"]
+        else:
+            reader_id, offset = uuid.uuid4().hex, 0
+        
+        reader = self._readers.get(reader_id)
+        if reader is None or reader.offset != offset:
+            # Lecteur expiré ou curseur rejoué : on repart du début du fichier
+            if reader is not None:
+                self.close(reader_id)
+            reader = await asyncio.to_thread(PageReader, file_path, sheet_name)
+            if offset:
+                await asyncio.to_thread(reader.skip, offset)
+            self._readers[reader_id] = reader
+        
+        self._readers.move_to_end(reader_id)
+        reader.last_used = time.monotonic()
+        self._evict()
+        return reader_id, reader
+
+page_readers = PageReaderRegistry(PAGE_READERS_MAX, PAGE_READER_TTL_SECONDS)
+
+# Requêtes côté serveur : filtre, regroupement, agrégation, tri et top-k
+# vectorisés avec pandas ; seul le résultat est renvoyé à l'agent.
+QUERY_MAX_ROWS = 1000
+
+_FILTER_OPS: Dict[str, Callable[[pd.Series, Any], pd.Series]] = {
+    "==": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    "in": lambda s, v: s.isin(v if isinstance(v, list) else [v]),
+    "not_in": lambda s, v: ~s.isin(v if isinstance(v, list) else [v]),
+    "contains": lambda s, v: s.astype("string").str.contains(str(v), case=False, regex=False).fillna(False).astype(bool),
+    "startswith": lambda s, v: s.astype("string").str.startswith(str(v)).fillna(False).astype(bool),
+    "is_null": lambda s, v: s.isna(),
+    "not_null": lambda s, v: s.notna()
+}
+
+FILTERS_SCHEMA = {
+    "type": "array",
+    "description": "Conditions combinées par ET",
+    "items": {
+        "type": "object",
+        "properties": {
+            "column": {"type": "string"},
+            "op": {
+                "type": "string",
+                "enum": list(_FILTER_OPS)
+            },
+            "value": {"description": "Valeur de comparaison (liste pour in/not_in)"}
+        },
+        "required": ["column", "op"]
+    }
+}
+
+_AGG_FUNCS = ["sum", "mean", "median", "min", "max", "count", "nunique", "std", "var", "first", "last", "size"]
+
+def _check_columns(df: pd.DataFrame, columns: List[Any]) -> None:
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"colonnes inconnues {missing} (disponibles: {[str(c) for c in df.columns]})")
+
+def _filter_mask(df: pd.DataFrame, filters: List[Dict[str, Any]]) -> Optional[pd.Series]:
+    """Combine les filtres (ET logique) en un masque booléen"""
+    mask = None
+    for condition in filters:
+        column, op = condition.get("column"), condition.get("op", "==")
+        _check_columns(df, [column])
+        if op not in _FILTER_OPS:
+            raise ValueError(f"opérateur inconnu '{op}' ({', '.join(_FILTER_OPS)})")
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) and op in (">", ">=", "<", "<="):
+            # Catégories non ordonnées (feuilles compactées) : comparer les valeurs
+            series = series.astype(series.cat.categories.dtype)
+        current = _FILTER_OPS[op](series, condition.get("value"))
+        mask = current if mask is None else mask & current
+    return mask
+
+def _sort_keys(sort_by: List[Any]) -> Tuple[List[Any], List[bool]]:
+    """Normalise le tri : "col", "-col" (décroissant) ou {"column", "ascending"}"""
+    columns, ascending = [], []
+    for key in sort_by:
+        if isinstance(key, dict):
+            columns.append(key["column"])
+            ascending.append(bool(key.get("ascending", True)))
+        elif isinstance(key, str) and key.startswith("-"):
+            columns.append(key[1:])
+            ascending.append(False)
+        else:
+            columns.append(key)
+            ascending.append(True)
+    return columns, ascending
+
+def _aggregate_series(series: pd.Series, func: str) -> Any:
+    """Agrégation d'une colonne entière (sans regroupement), avec la même
+    sémantique que groupby pour size, first et last"""
+    if func == "size":
+        return len(series)
+    if func in ("first", "last"):
+        # Series.agg ne connaît pas first/last ; groupby ignore les valeurs manquantes
+        values = series.dropna()
+        if values.empty:
+            return None
+        return values.iloc[0] if func == "first" else values.iloc[-1]
+    return series.agg(func)
+
+def run_query(df: pd.DataFrame, spec: Dict[str, Any]) -> Tuple[pd.DataFrame, int]:
+    """Exécute une requête sur un DataFrame ; retourne (résultat, lignes retenues)"""
+    filters = spec.get("filters") or []
+    group_by = spec.get("group_by") or []
+    aggregations = spec.get("aggregations") or []
+    columns = spec.get("columns") or []
+    sort_by = spec.get("sort_by") or []
+    limit = spec.get("limit")
+    limit = 100 if limit is None else int(limit)
+    if limit < 1:
+        raise ValueError(f"'limit' doit être ≥ 1 (reçu: {limit})")
+    limit = min(limit, QUERY_MAX_ROWS)
+    
+    mask = _filter_mask(df, filters)
+    if mask is not None:
+        df = df[mask]
+    matched = len(df)
+    
+    if aggregations:
+        named = {}
+        for agg in aggregations:
+            func = agg.get("func", "sum")
+            if func not in _AGG_FUNCS:
+                raise ValueError(f"agrégation inconnue '{func}' ({', '.join(_AGG_FUNCS)})")
+            column = agg.get("column") or (group_by[0] if group_by else df.columns[0])
+            _check_columns(df, [column])
+            named[agg.get("as") or f"{func}_{column}"] = (column, func)
+        
+        _check_columns(df, group_by)
+        if group_by:
+            df = df.groupby(group_by, dropna=False, observed=True, sort=False).agg(**named).reset_index()
+        else:
+            df = pd.DataFrame({
+                alias: [_aggregate_series(df[column], func)]
+                for alias, (column, func) in named.items()
+            })
+    elif columns:
+        _check_columns(df, columns)
+        df = df[columns]
+    
+    if sort_by:
+        keys, ascending = _sort_keys(sort_by)
+        _check_columns(df, keys)
+        # Top-k sur une seule colonne numérique : sélection partielle sans tri complet
+        if len(keys) == 1 and pd.api.types.is_numeric_dtype(df[keys[0]]) \
+                and not pd.api.types.is_bool_dtype(df[keys[0]]):
+            df = df.nsmallest(limit, keys[0]) if ascending[0] else df.nlargest(limit, keys[0])
+        else:
+            df = df.sort_values(keys, ascending=ascending, kind="stable")
+    
+    return df.head(limit), matched
+
+# Lecture filtrée (read_excel avec filters) : colonnes et conditions sont
+# poussées jusqu'au lecteur. Seules les colonnes utiles sont analysées, le
+# fichier est parcouru par blocs (CSV par morceaux, .xlsx en lecture seule,
+# lots Arrow) et la lecture s'arrête dès que max_rows lignes correspondent.
+FILTER_CHUNK_ROWS = int(os.environ.get("AI_SHEETS_FILTER_CHUNK_ROWS", "50000"))
+# .xlsx : l'analyse XML ligne à ligne domine, des blocs courts arrêtent la
+# lecture au plus près de max_rows
+XLSX_FILTER_CHUNK_ROWS = 5_000
+
+# Opérateurs traduits en filtres Parquet (groupes de lignes ignorés d'après
+# leurs statistiques) ; les autres n'ont pas la même sémantique des valeurs nulles
+_ARROW_FILTER_OPS = {"==": "==", ">": ">", ">=": ">=", "<": "<", "<=": "<=", "in": "in"}
+
+def normalize_filters(filters: Any) -> List[Dict[str, Any]]:
+    """Accepte une condition seule ou une liste de conditions"""
+    if not filters:
+        return []
+    return [filters] if isinstance(filters, dict) else list(filters)
+
+def filter_columns(columns: Optional[List[str]], filters: List[Dict[str, Any]]) -> Optional[List[str]]:
+    """Colonnes à lire : projection demandée plus colonnes des conditions"""
+    if columns is None:
+        return None
+    return list(dict.fromkeys([*columns, *(condition.get("column") for condition in filters)]))
+
+def collect_matches(chunks: Iterator[pd.DataFrame], filters: List[Dict[str, Any]], columns: Optional[List[str]],
+                    max_rows: Optional[int]) -> Tuple[pd.DataFrame, int]:
+    """Filtre des blocs successifs jusqu'à max_rows lignes ; retourne (résultat, lignes parcourues)"""
+    parts = []
+    template = None
+    matched = scanned = 0
+    for chunk in chunks:
+        scanned += len(chunk)
+        mask = _filter_mask(chunk, filters)
+        if mask is not None:
+            chunk = chunk[mask]
+        if columns is not None:
+            chunk = chunk[columns]
+        if template is None:
+            template = chunk.iloc[:0]
+        if len(chunk):
+            parts.append(chunk)
+            matched += len(chunk)
+        if max_rows is not None and matched >= max_rows:
+            break
+    if not parts:
+        return (template if template is not None else pd.DataFrame(columns=columns)), scanned
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+    return (df if max_rows is None else df.head(max_rows)), scanned
+
+def _xlsx_chunks(file_path: str, sheet_name: Any, usecols: Optional[List[str]]) -> Iterator[pd.DataFrame]:
+    """Blocs d'une feuille .xlsx lue en mode read-only, limités aux colonnes utiles"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        names = normalize_headers(header)
+        positions = list(range(len(names))) if usecols is None else _column_positions(names, usecols)
+        selected = [names[i] for i in positions]
+        while True:
+            block = list(itertools.islice(rows, XLSX_FILTER_CHUNK_ROWS))
+            if not block:
+                break
+            yield pd.DataFrame(
+                [[row[i] if i < len(row) else None for i in positions] for row in block],
+                columns=selected
+            )
+    finally:
+        workbook.close()
+
+def _csv_chunks(file_path: str, usecols: Optional[List[str]]) -> Iterator[pd.DataFrame]:
+    """Morceaux d'un CSV limités aux colonnes utiles, en-têtes normalisés"""
+    names = normalize_headers(pd.read_csv(file_path, nrows=0).columns)
+    positions = None if usecols is None else _column_positions(names, usecols)
+    selected = names if positions is None else [names[i] for i in positions]
+    with pd.read_csv(file_path, usecols=positions, chunksize=FILTER_CHUNK_ROWS) as reader:
+        for chunk in reader:
+            chunk.columns = selected
+            yield chunk
+
+def _arrow_chunks(file_path: str, usecols: Optional[List[str]]) -> Iterator[pd.DataFrame]:
+    """Lots d'un fichier colonnaire convertis un à un"""
+    source, schema, batches = open_arrow_file(file_path, usecols)
+    try:
+        for batch in batches:
+            yield arrow_to_pandas(schema, [batch])
+    finally:
+        source.close()
+
+def _parquet_filters(filters: List[Dict[str, Any]]) -> Optional[List[Tuple[str, str, Any]]]:
+    """Conditions exprimées en filtres pyarrow, ou None si l'une n'est pas traduisible"""
+    translated = []
+    for condition in filters:
+        op = _ARROW_FILTER_OPS.get(condition.get("op", "=="))
+        value = condition.get("value")
+        if op is None or value is None:
+            return None
+        if op == "in" and not isinstance(value, list):
+            value = [value]
+        translated.append((condition.get("column"), op, value))
+    return translated
+
+def read_table_filtered(file_path: str, sheet_name: Any, max_rows: Optional[int], columns: Optional[List[str]],
+                        filters: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, int]:
+    """Lit uniquement les lignes qui satisfont les conditions ; retourne (résultat, lignes parcourues)"""
+    file_ext = Path(file_path).suffix.lower()
+    usecols = filter_columns(columns, filters)
+    
+    if file_ext == '.parquet' and max_rows is None:
+        arrow_filters = _parquet_filters(filters)
+        if arrow_filters is not None:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            try:
+                table = pq.read_table(file_path, columns=usecols, filters=arrow_filters, memory_map=True)
+                df = table.to_pandas()
+                return select_columns(df, columns), pq.ParquetFile(file_path).metadata.num_rows
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError, TypeError):
+                # Valeur de type incompatible avec la colonne : filtrage pandas
+                pass
+    
+    if file_ext in COLUMNAR_EXTENSIONS:
+        chunks = _arrow_chunks(file_path, usecols)
+    elif file_ext == '.csv':
+        chunks = _csv_chunks(file_path, usecols)
+    elif file_ext == '.xlsx':
+        chunks = _xlsx_chunks(file_path, sheet_name, usecols)
+    elif file_ext == '.xls':
+        chunks = (df for df in [read_pandas_table(functools.partial(pd.read_excel, file_path, sheet_name=sheet_name), usecols)])
+    else:
+        raise ValueError("Format de fichier non supporté")
+    try:
+        return collect_matches(chunks, filters, columns, max_rows)
+    finally:
+        chunks.close()
+
+# Profil de feuille (describe_sheet) : type, valeurs manquantes, bornes,
+# cardinalité et valeurs fréquentes de chaque colonne, par passes
+# vectorisées. Au-delà de DESCRIBE_STREAM_BYTES, un fichier absent du cache
+# de lecture est parcouru par blocs : comptes et bornes restent exacts, la
+# cardinalité est estimée (esquisse KMV des hachages) et les valeurs
+# fréquentes viennent d'un échantillon réservoir.
+DESCRIBE_STREAM_BYTES = int(os.environ.get("AI_SHEETS_DESCRIBE_STREAM_BYTES", str(32 * 1024 * 1024)))
+DESCRIBE_SAMPLE_ROWS = int(os.environ.get("AI_SHEETS_DESCRIBE_SAMPLE_ROWS", "10000"))
+DESCRIBE_CHUNK_ROWS = 50_000
+_KMV_SIZE = 1024
+
+def _json_scalar(value: Any) -> Any:
+    """Convertit une valeur pandas/NumPy en valeur JSON native"""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+def _hashable(series: pd.Series) -> pd.Series:
+    """Colonne object contenant des listes ou dictionnaires : comparée sous forme de texte"""
+    if series.dtype == object:
+        try:
+            pd.util.hash_pandas_object(series.head(1000), index=False)
+        except TypeError:
+            return series.astype(str)
+    return series
+
+class ColumnProfile:
+    """Statistiques d'une colonne cumulées sur des blocs successifs"""
+
+    def __init__(self, sketch: bool = True):
+        self.sketch = sketch
+        self.dtypes: List[str] = []
+        self.count = 0
+        self.nulls = 0
+        self.minimum: Any = None
+        self.maximum: Any = None
+        self._comparable = True
+        # Moyenne et variance par fusion de blocs (Chan et al.)
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min_length: Optional[int] = None
+        self.max_length: Optional[int] = None
+        # Les _KMV_SIZE plus petits hachages distincts vus
+        self.kmv = np.empty(0, dtype=np.uint64)
+
+    def update(self, series: pd.Series) -> None:
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        self.count += len(values)
+        if not len(values):
+            return
+        dtype = str(values.dtype)
+        if dtype not in self.dtypes:
+            self.dtypes.append(dtype)
+
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            array = values.to_numpy(dtype=float)
+            n, mean = len(array), float(array.mean())
+            m2 = float(((array - mean) ** 2).sum())
+            total = self.numeric_count + n
+            delta = mean - self.mean
+            self.mean += delta * n / total
+            self.m2 += m2 + delta * delta * self.numeric_count * n / total
+            self.numeric_count = total
+        elif not pd.api.types.is_bool_dtype(values.dtype) and not pd.api.types.is_datetime64_any_dtype(values.dtype):
+            lengths = values.astype(str).str.len()
+            low, high = int(lengths.min()), int(lengths.max())
+            self.min_length = low if self.min_length is None else min(self.min_length, low)
+            self.max_length = high if self.max_length is None else max(self.max_length, high)
+
+        if self._comparable:
+            # min/max sur des listes ou dictionnaires : TypeError, colonne non comparable
+            try:
+                low, high = values.min(), values.max()
+                self.minimum = low if self.minimum is None else min(self.minimum, low)
+                self.maximum = high if self.maximum is None else max(self.maximum, high)
+            except TypeError:
+                # Types non comparables (colonne mixte)
+                self._comparable = False
+                self.minimum = self.maximum = None
+
+        if not self.sketch:
+            return
+        try:
+            hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        except TypeError:
+            hashes = pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy()
+        if len(self.kmv) == _KMV_SIZE:
+            hashes = hashes[hashes < self.kmv[-1]]
+        self.kmv = np.union1d(self.kmv, hashes)[:_KMV_SIZE]
+
+    def distinct(self) -> Tuple[int, bool]:
+        """(nombre de valeurs distinctes, estimé ou non)"""
+        if len(self.kmv) < _KMV_SIZE:
+            return len(self.kmv), False
+        return int(round((_KMV_SIZE - 1) * 2.0 ** 64 / float(self.kmv[-1]))), True
+
+    def to_dict(self, name: str, rows: int) -> Dict[str, Any]:
+        distinct, estimated = self.distinct()
+        report = {
+            "name": name,
+            "dtype": self.dtypes[0] if len(self.dtypes) == 1 else ("mixed: " + ", ".join(self.dtypes) if self.dtypes else "empty"),
+            "non_null": self.count,
+            "nulls": self.nulls,
+            "null_pct": round(100 * self.nulls / rows, 2) if rows else 0.0,
+            "distinct": min(distinct, self.count),
+            "distinct_estimated": estimated
+        }
+        if self.minimum is not None:
+            report["min"] = _json_scalar(self.minimum)
+            report["max"] = _json_scalar(self.maximum)
+        if self.numeric_count:
+            report["mean"] = _json_scalar(self.mean)
+            report["std"] = _json_scalar(float(np.sqrt(self.m2 / (self.numeric_count - 1)))) if self.numeric_count > 1 else None
+        if self.min_length is not None:
+            report["min_length"] = self.min_length
+            report["max_length"] = self.max_length
+        return report
+
+class SheetProfiler:
+    """Profil d'une feuille lue par blocs, avec échantillon réservoir des lignes"""
+
+    def __init__(self, sample_rows: int = DESCRIBE_SAMPLE_ROWS, seed: int = 0):
+        self.rows = 0
+        self.sample_rows = sample_rows
+        self.columns: List[Tuple[str, ColumnProfile]] = []
+        self._rng = np.random.default_rng(seed)
+        self._sample: Optional[pd.DataFrame] = None
+        self._keys = np.empty(0)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        for i, column in enumerate(chunk.columns):
+            if i == len(self.columns):
+                # Profil exact (sans échantillon) : la cardinalité sera comptée directement
+                self.columns.append((str(column), ColumnProfile(sketch=bool(self.sample_rows))))
+            self.columns[i][1].update(chunk.iloc[:, i])
+        if not self.sample_rows:
+            return
+
+        # Réservoir : une clé aléatoire par ligne, on garde les plus petites
+        keys = self._rng.random(len(chunk))
+        if len(self._keys) >= self.sample_rows:
+            keep = keys < self._keys.max()
+            chunk, keys = chunk[keep], keys[keep]
+        sample = chunk if self._sample is None else pd.concat([self._sample, chunk], ignore_index=True)
+        keys = np.concatenate([self._keys, keys])
+        if len(keys) > self.sample_rows:
+            selected = np.argpartition(keys, self.sample_rows)[:self.sample_rows]
+            sample, keys = sample.iloc[selected].reset_index(drop=True), keys[selected]
+        self._sample, self._keys = sample, keys
+
+    def finish(self, top: int, exact: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """Profil final ; exact = la feuille complète (comptes exacts des valeurs)"""
+        source = exact if exact is not None else self._sample
+        scale = 1.0 if exact is not None or source is None or not len(source) else self.rows / len(source)
+        columns = []
+        for i, (name, profile) in enumerate(self.columns):
+            report = profile.to_dict(name, self.rows)
+            if exact is not None:
+                report["distinct"] = int(_hashable(exact.iloc[:, i]).nunique(dropna=True))
+                report["distinct_estimated"] = False
+            # Valeurs fréquentes, sauf pour les colonnes quasi uniques ; sur un
+            # échantillon, seules les valeurs vues assez souvent sont significatives
+            if top and source is not None and report["distinct"] < 0.9 * max(report["non_null"], 1):
+                counts = _hashable(source.iloc[:, i]).value_counts(dropna=True).head(top)
+                if exact is None:
+                    counts = counts[counts >= 5]
+                report["top_values"] = [
+                    {"value": _json_scalar(value), "count": int(round(count * scale))}
+                    for value, count in counts.items()
+                ]
+            columns.append(report)
+        return {
+            "rows": self.rows,
+            "columns": len(columns),
+            "mode": "exact" if exact is not None else "sampled",
+            "sample_rows": None if exact is not None else (0 if source is None else len(source)),
+            "profile": columns
+        }
+
+def profile_dataframe(df: pd.DataFrame, top: int) -> Dict[str, Any]:
+    """Profil exact d'une feuille déjà en mémoire"""
+    profiler = SheetProfiler(sample_rows=0)
+    profiler.update(df)
+    return profiler.finish(top, exact=df)
+
+def profile_file(file_path: str, sheet_name: Any, top: int, sample_rows: int) -> Dict[str, Any]:
+    """Profil d'un fichier lu par blocs en flux (mémoire bornée)"""
+    profiler = SheetProfiler(sample_rows=sample_rows)
+    reader = PageReader(file_path, sheet_name)
+    try:
+        while True:
+            chunk = reader.read_page(DESCRIBE_CHUNK_ROWS)
+            if not len(chunk):
+                break
+            profiler.update(chunk)
+    finally:
+        reader.close()
+    return profiler.finish(top)
+
+# Métriques par outil : latence, taille des arguments et des réponses,
+# taille des stockages en mémoire. Exposées par l'outil server_stats et,
+# si METRICS_FILE est défini, écrites périodiquement dans un fichier
+# (format JSON si l'extension est .json, texte Prometheus sinon).
+METRICS_FILE = os.environ.get("AI_SHEETS_METRICS_FILE")
+METRICS_INTERVAL_SECONDS = float(os.environ.get("AI_SHEETS_METRICS_INTERVAL", "60"))
+METRICS_PREFIX = "ai_sheets"
+
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864]
+STORE_BUCKETS = [1048576, 16777216, 67108864, 268435456, 536870912, 1073741824, 2147483648, 4294967296]
+
+class Histogram:
+    """Histogramme à seaux fixes (cumulables au format Prometheus)"""
+    
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q: float) -> float:
+        """Quantile approché par interpolation linéaire dans le seau"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+    
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6)
+        }
+
+class ToolMetrics:
+    """Métriques agrégées par outil"""
+    
+    def __init__(self, gauges: Callable[[], Dict[str, float]], store_bytes: Callable[[], float]):
+        self.started = time.time()
+        self.gauges = gauges
+        self.store_bytes = store_bytes
+        # Taille du stockage en mémoire observée après chaque appel
+        self.store = Histogram(STORE_BUCKETS)
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.latency: Dict[str, Histogram] = {}
+        self.request_bytes: Dict[str, Histogram] = {}
+        self.response_bytes: Dict[str, Histogram] = {}
+    
+    def record(self, tool: str, seconds: float, request_bytes: int, response_bytes: int, error: bool) -> None:
+        self.calls[tool] = self.calls.get(tool, 0) + 1
+        if error:
+            self.errors[tool] = self.errors.get(tool, 0) + 1
+        self.latency.setdefault(tool, Histogram(LATENCY_BUCKETS)).observe(seconds)
+        self.request_bytes.setdefault(tool, Histogram(SIZE_BUCKETS)).observe(request_bytes)
+        self.response_bytes.setdefault(tool, Histogram(SIZE_BUCKETS)).observe(response_bytes)
+        self.store.observe(self.store_bytes())
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "gauges": self.gauges(),
+            "store_bytes": self.store.summary(),
+            "tools": {
+                tool: {
+                    "calls": count,
+                    "errors": self.errors.get(tool, 0),
+                    "latency_seconds": self.latency[tool].summary(),
+                    "request_bytes": self.request_bytes[tool].summary(),
+                    "response_bytes": self.response_bytes[tool].summary()
+                }
+                for tool, count in sorted(self.calls.items())
+            }
+        }
+    
+    def to_prometheus(self, prefix: str) -> str:
+        """Export au format texte Prometheus"""
+        lines = []
+        for metric, histograms in (
+            ("tool_latency_seconds", self.latency),
+            ("tool_request_bytes", self.request_bytes),
+            ("tool_response_bytes", self.response_bytes)
+        ):
+            lines.append(f"# TYPE {prefix}_{metric} histogram")
+            for tool, hist in sorted(histograms.items()):
+                cumulative = 0
+                for bound, n in zip(hist.buckets + ["+Inf"], hist.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_{metric}_bucket{{tool="{tool}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_{metric}_sum{{tool="{tool}"}} {hist.sum}')
+                lines.append(f'{prefix}_{metric}_count{{tool="{tool}"}} {hist.count}')
+        lines.append(f"# TYPE {prefix}_store_bytes histogram")
+        cumulative = 0
+        for bound, n in zip(self.store.buckets + ["+Inf"], self.store.counts):
+            cumulative += n
+            lines.append(f'{prefix}_store_bytes_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{prefix}_store_bytes_sum {self.store.sum}")
+        lines.append(f"{prefix}_store_bytes_count {self.store.count}")
+        lines.append(f"# TYPE {prefix}_tool_errors_total counter")
+        for tool in sorted(self.calls):
+            lines.append(f'{prefix}_tool_errors_total{{tool="{tool}"}} {self.errors.get(tool, 0)}')
+        for gauge, value in sorted(self.gauges().items()):
+            lines.append(f"# TYPE {prefix}_{gauge} gauge")
+            lines.append(f"{prefix}_{gauge} {value}")
+        return "\n".join(lines) + "\n"
+    
+    def dump(self, path: str, prefix: str) -> None:
+        """Écrit les métriques dans un fichier (remplacement atomique)"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.suffix.lower() == ".json":
+            content = json.dumps(self.snapshot(), indent=2, ensure_ascii=False)
+        else:
+            content = self.to_prometheus(prefix)
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, target)
+
+def payload_size(value: Any) -> int:
+    """Taille approximative en octets d'un argument ou d'une réponse JSON"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+def response_size(contents: List[Any]) -> int:
+    """Taille du contenu renvoyé (texte ou données encodées)"""
+    total = 0
+    for content in contents:
+        text = getattr(content, "text", None)
+        if text is None:
+            text = getattr(content, "data", None)
+        if text is None:
+            # Ressource intégrée : contenu base64 ou texte
+            resource = getattr(content, "resource", None)
+            text = getattr(resource, "blob", None) or getattr(resource, "text", None) or ""
+        total += len(text.encode("utf-8")) if isinstance(text, str) else len(text)
+    return total
+
+# Retour en mémoire des fichiers produits (destination="resource") : le
+# contenu est renvoyé en EmbeddedResource base64, éventuellement découpé en
+# parties de chunk_size octets (uri ...?part=i&parts=n), sans passer par le disque.
+RESOURCE_CHUNK_BYTES = int(os.environ.get("AI_SHEETS_RESOURCE_CHUNK_BYTES", str(8 * 1024 * 1024)))
+
+# Paramètres communs des outils de sauvegarde
+DESTINATION_SCHEMA = {
+    "type": "string",
+    "enum": ["file", "resource"],
+    "description": "file : écrire sur disque (défaut) ; resource : renvoyer le fichier en mémoire (EmbeddedResource base64)"
+}
+CHUNK_SIZE_SCHEMA = {
+    "type": "integer",
+    "description": "Taille maximale en octets de chaque partie renvoyée avec destination=resource"
+}
+
+def resource_contents(uri: str, mime_type: str, data: bytes, chunk_size: Optional[int] = None) -> List[EmbeddedResource]:
+    """Découpe un fichier sérialisé en ressources intégrées base64"""
+    chunk_size = max(1, chunk_size or RESOURCE_CHUNK_BYTES)
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)] or [b""]
+    if len(chunks) == 1:
+        uris = [uri]
+    else:
+        uris = [f"{uri}?part={i}&parts={len(chunks)}" for i in range(1, len(chunks) + 1)]
+    return [
+        EmbeddedResource(
+            type="resource",
+            resource=BlobResourceContents(
+                uri=part_uri,
+                mimeType=mime_type,
+                blob=base64.b64encode(chunk).decode("ascii")
+            )
+        )
+        for part_uri, chunk in zip(uris, chunks)
+    ]
+
+async def dump_metrics_periodically() -> None:
+    """Écrit METRICS_FILE toutes les METRICS_INTERVAL_SECONDS secondes"""
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL_SECONDS)
+        try:
+            metrics.dump(METRICS_FILE, METRICS_PREFIX)
+        except OSError as e:
+            logger.error("Erreur export des métriques: %s", e)
+
+def store_gauges() -> Dict[str, float]:
+    """Tailles courantes des stockages en mémoire"""
+    return {
+        "workbooks": len(workbooks),
+        "sessions": sum(session_counts.values()),
+        "workbooks_spilled": workbooks.spilled_count,
+        "workbooks_resident_bytes": workbooks.resident_bytes,
+        "workbooks_compacted_bytes_saved": workbooks.compacted_bytes_saved,
+        "read_cache_bytes": read_cache.current_bytes,
+        "page_readers_open": len(page_readers)
+    }
+
+metrics = ToolMetrics(store_gauges, lambda: workbooks.resident_bytes)
 
 @server.list_tools()
 async def handle_list_tools() -> List[Tool]:
@@ -85,18 +2584,69 @@ async def handle_list_tools() -> List[Tool]:
                         "type": "string",
                         "description": "Nom de la feuille"
                     },
-                    "data": {
-                        "type": "array",
-                        "description": "Tableau d'objets JSON représentant les données",
-                        "items": {
-                            "type": "object",
-                            "description": "Un objet JSON avec propriétés = colonnes"
-                        }
+                    "data": DATA_SCHEMA,
+                    "compact": {
+                        "type": "boolean",
+                        "description": "Compacter les types en mémoire : entiers/flottants réduits, chaînes répétitives en catégories (optionnel)"
                     }
                 },
                 "required": ["filename", "sheet_name", "data"]
             }
         ),
+        Tool(
+            name="append_rows",
+            description="Ajouter des lignes à la fin d'une feuille existante (sans réécrire la feuille)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "Nom du classeur"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "Nom de la feuille"
+                    },
+                    "data": DATA_SCHEMA
+                },
+                "required": ["filename", "sheet_name", "data"]
+            }
+        ),
+        Tool(
+            name="update_range",
+            description="Modifier en place un bloc de cellules d'une feuille existante",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "Nom du classeur"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "Nom de la feuille"
+                    },
+                    "cell": {
+                        "type": "string",
+                        "description": "Cellule de départ en notation A1 (ligne 1 = en-têtes, données à partir de la ligne 2)"
+                    },
+                    "row": {
+                        "type": "integer",
+                        "description": "Ligne de données de départ, base 0 (alternative à 'cell')"
+                    },
+                    "column": {
+                        "type": ["string", "integer"],
+                        "description": "Colonne de départ : nom ou position base 0 (alternative à 'cell')"
+                    },
+                    "values": {
+                        "type": "array",
+                        "items": {"type": "array"},
+                        "description": "Valeurs à écrire, une liste par ligne"
+                    }
+                },
+                "required": ["filename", "sheet_name", "values"]
+            }
+        ),
         Tool(
             name="save_workbook",
             description="Sauvegarder manuellement le classeur Excel",
@@ -110,57 +2660,262 @@ async def handle_list_tools() -> List[Tool]:
                     "output_path": {
                         "type": "string",
                         "description": "Chemin de sortie (optionnel)"
+                    },
+                    "engine": ENGINE_SCHEMA,
+                    "destination": DESTINATION_SCHEMA,
+                    "chunk_size": CHUNK_SIZE_SCHEMA
+                },
+                "required": ["filename"]
+            }
+        ),
+        Tool(
+            name="write_excel",
+            description="Créer un fichier Excel, CSV ou colonnaire (Parquet, Feather, Arrow) avec des données",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Chemin complet vers le fichier à créer (.xlsx, .csv, .parquet, .feather, .arrow)"
+                    },
+                    "data": DATA_SCHEMA,
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "Nom de la feuille Excel (optionnel)"
+                    },
+                    "engine": ENGINE_SCHEMA
+                },
+                "required": ["file_path", "data"]
+            }
+        ),
+        Tool(
+            name="read_excel",
+            description="Lire un fichier Excel et retourner son contenu",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Chemin vers le fichier (.xlsx, .xls, .csv, .parquet, .feather, .arrow)"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "Nom de la feuille (optionnel, première feuille par défaut)"
+                    },
+                    "max_rows": {
+                        "type": "integer",
+                        "description": "Nombre maximum de lignes à lire (défaut: 100)"
+                    },
+                    "columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Colonnes à retourner (optionnel) ; seules ces colonnes sont analysées"
+                    },
+                    "filters": {
+                        **FILTERS_SCHEMA,
+                        "description": "Conditions combinées par ET, appliquées pendant la lecture ; max_rows compte alors les lignes retenues"
+                    }
+                },
+                "required": ["file_path"]
+            }
+        ),
+        Tool(
+            name="read_excel_page",
+            description="Lire un fichier Excel/CSV page par page avec un curseur (mémoire constante)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Chemin vers le fichier (.xlsx, .xls, .csv, .parquet, .feather, .arrow), requis pour la première page"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "Nom de la feuille (optionnel, première feuille par défaut)"
+                    },
+                    "page_size": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": PAGE_SIZE_MAX,
+                        "description": f"Nombre de lignes par page (défaut: 100, maximum: {PAGE_SIZE_MAX})"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Curseur renvoyé par la page précédente (optionnel)"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="describe_sheet",
+            description="Profil d'une feuille en un appel : type, valeurs manquantes, min/max, cardinalité et valeurs fréquentes par colonne",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "Classeur en mémoire (ou utiliser file_path)"
+                    },
+                    "file_path": {
+                        "type": "string",
+                        "description": "Fichier sur disque (.xlsx, .xls, .csv, .parquet, .feather, .arrow) (ou utiliser filename)"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "Nom de la feuille (optionnel, première feuille par défaut)"
+                    },
+                    "top": {
+                        "type": "integer",
+                        "description": "Nombre de valeurs fréquentes par colonne (défaut: 5, 0 pour aucune)"
+                    },
+                    "sample_rows": {
+                        "type": "integer",
+                        "description": f"Taille de l'échantillon pour les gros fichiers lus en flux (défaut: {DESCRIBE_SAMPLE_ROWS})"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="merge_files",
+            description="Fusionner plusieurs fichiers (.xlsx, .xls, .csv, .parquet, .feather, .arrow) lus en parallèle : colonnes alignées par nom, lignes concaténées dans une feuille en mémoire ou un fichier",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "pattern": {
+                        "type": "string",
+                        "description": "Motif glob des fichiers à fusionner, ex: '/data/ventes/**/*.xlsx' (ou utiliser paths)"
+                    },
+                    "paths": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Liste explicite de fichiers (ou utiliser pattern)"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "Feuille lue dans chaque fichier (optionnel, première feuille par défaut)"
+                    },
+                    "join": {
+                        "type": "string",
+                        "enum": ["outer", "inner"],
+                        "description": "outer : union des colonnes (défaut) ; inner : colonnes communes à tous les fichiers"
+                    },
+                    "source_column": {
+                        "type": "string",
+                        "description": "Nom d'une colonne ajoutée avec le nom du fichier d'origine (optionnel)"
+                    },
+                    "filename": {
+                        "type": "string",
+                        "description": "Classeur en mémoire qui reçoit le résultat (ou utiliser output_path)"
+                    },
+                    "target_sheet": {
+                        "type": "string",
+                        "description": "Feuille de destination (défaut: 'Fusion')"
+                    },
+                    "output_path": {
+                        "type": "string",
+                        "description": "Fichier de sortie .xlsx, .csv, .parquet, .feather ou .arrow (ou utiliser filename)"
+                    },
+                    "engine": {
+                        "type": "string",
+                        "enum": ["auto", "openpyxl", "xlsxwriter"],
+                        "description": "Moteur d'écriture pour output_path (défaut: auto)"
+                    },
+                    "compact": {
+                        "type": "boolean",
+                        "description": "Réduire les types des colonnes du résultat en mémoire (défaut: AI_SHEETS_COMPACT)"
                     }
-                },
-                "required": ["filename"]
+                }
             }
         ),
         Tool(
-            name="write_excel",
-            description="Créer un fichier Excel avec des données",
+            name="query_sheet",
+            description="Filtrer, regrouper, agréger et trier une feuille côté serveur ; retourne uniquement le résultat",
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "Classeur en mémoire (ou utiliser file_path)"
+                    },
                     "file_path": {
                         "type": "string",
-                        "description": "Chemin complet vers le fichier Excel à créer"
+                        "description": "Fichier sur disque (.xlsx, .xls, .csv, .parquet, .feather, .arrow) (ou utiliser filename)"
+                    },
+                    "sheet_name": {
+                        "type": "string",
+                        "description": "Nom de la feuille (optionnel, première feuille par défaut)"
+                    },
+                    "filters": FILTERS_SCHEMA,
+                    "group_by": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Colonnes de regroupement"
                     },
-                    "data": {
+                    "aggregations": {
                         "type": "array",
-                        "description": "Tableau d'objets JSON représentant les données",
+                        "description": "Agrégats à calculer",
                         "items": {
                             "type": "object",
-                            "description": "Un objet JSON avec propriétés = colonnes"
+                            "properties": {
+                                "column": {"type": "string"},
+                                "func": {
+                                    "type": "string",
+                                    "enum": _AGG_FUNCS
+                                },
+                                "as": {
+                                    "type": "string",
+                                    "description": "Nom de la colonne résultat (optionnel)"
+                                }
+                            },
+                            "required": ["func"]
                         }
                     },
-                    "sheet_name": {
-                        "type": "string",
-                        "description": "Nom de la feuille Excel (optionnel)"
+                    "columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Colonnes à retourner (sans agrégation)"
+                    },
+                    "sort_by": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Colonnes de tri, préfixe '-' pour un tri décroissant"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": f"Nombre maximum de lignes retournées (défaut: 100, max: {QUERY_MAX_ROWS})"
                     }
-                },
-                "required": ["file_path", "data"]
+                }
             }
         ),
         Tool(
-            name="read_excel",
-            description="Lire un fichier Excel et retourner son contenu",
+            name="server_stats",
+            description="Métriques du serveur : latence, taille des requêtes/réponses par outil et taille des stockages",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "file_path": {
-                        "type": "string",
-                        "description": "Chemin vers le fichier Excel (.xlsx, .xls, .csv)"
-                    },
-                    "sheet_name": {
+                    "format": {
                         "type": "string",
-                        "description": "Nom de la feuille (optionnel, première feuille par défaut)"
-                    },
-                    "max_rows": {
-                        "type": "integer",
-                        "description": "Nombre maximum de lignes à lire (défaut: 100)"
+                        "enum": ["json", "prometheus"],
+                        "description": "Format de sortie (défaut: json)"
                     }
-                },
-                "required": ["file_path"]
+                }
+            }
+        ),
+        Tool(
+            name="workbook_stats",
+            description="Mémoire utilisée par chaque classeur en mémoire (résident ou déversé sur disque)",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
+        ),
+        Tool(
+            name="cache_stats",
+            description="Statistiques du cache de lecture (entrées, octets, hits, évictions)",
+            inputSchema={
+                "type": "object",
+                "properties": {}
             }
         ),
         Tool(
@@ -181,25 +2936,44 @@ async def handle_list_tools() -> List[Tool]:
 
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+    """Point d'entrée des appels d'outils : mesure l'appel puis délègue à dispatch_tool"""
+    token = request_id_var.set(uuid.uuid4().hex[:8])
+    started = time.perf_counter()
+    contents: List[Any] = []
+    error = True
+    logger.debug("Outil appelé = %s, arguments = %s", name, PayloadSummary(arguments))
+    try:
+        contents = await dispatch_tool(name, arguments)
+        error = any(getattr(c, "text", "").startswith("❌") for c in contents)
+        return contents
+    except Exception:
+        logger.exception("Erreur non gérée dans l'outil %s", name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.record(name, elapsed, payload_size(arguments), response_size(contents), error)
+        logger.info("%s terminé en %.1f ms%s", name, elapsed * 1000, " (erreur)" if error else "")
+        request_id_var.reset(token)
+
+async def dispatch_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
     """Gestionnaire d'appels d'outils"""
     
-    # Debug : afficher tous les appels d'outils
-    print(f"DEBUG AI-Sheets: Outil appelé = {name}, Arguments = {arguments}")
-    
     if name == "create_workbook":
         filename = arguments["filename"]
+        key = scoped(filename)
         output_path = arguments.get("output_path")
         
         # Créer un nouveau classeur en mémoire
-        workbooks[filename] = {}
+        workbooks[key] = {}
+        save_scheduler.forget(key)
         
-        # Définir le chemin de sauvegarde
+        # Définir le chemin de sauvegarde (sous-dossier de la session par défaut)
         if output_path:
             file_path = f"{output_path}/{filename}.xlsx"
         else:
-            file_path = f"/Users/usuario1/Documents/{filename}.xlsx"
+            file_path = f"/Users/usuario1/Documents/{key}.xlsx"
         
-        workbook_paths[filename] = file_path
+        workbook_paths[key] = file_path
         
         return [TextContent(
             type="text",
@@ -210,8 +2984,9 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         filename = arguments["filename"]
         sheet_name = arguments["sheet_name"]
         data = arguments["data"]
+        key = scoped(filename)
         
-        if filename not in workbooks:
+        if key not in workbooks:
             return [TextContent(
                 type="text",
                 text=f"❌ Erreur: Classeur '{filename}' non trouvé. Créez d'abord un classeur."
@@ -219,11 +2994,19 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         
         try:
             # Convertir les données en DataFrame
-            df = pd.DataFrame(data)
-            workbooks[filename][sheet_name] = df
+            await workbooks.ensure_loaded(key)
+            check_sheet_name(sheet_name, workbooks.sheet_names(key))
+            df = await run_blocking(build_dataframe, data)
+            compaction = None
+            if arguments.get("compact", COMPACT_DEFAULT):
+                df, compaction = await run_blocking(compact_dataframe, df)
+                workbooks.compacted_bytes_saved += compaction["bytes_saved"]
+            await workbooks.ensure_loaded(key)
+            workbooks.set_sheet(key, sheet_name, df)
+            await workbooks.enforce_budget(keep=key)
             
             # Sauvegarde automatique
-            auto_save_msg = auto_save_workbook(filename)
+            auto_save_msg = auto_save_workbook(key, sheet_name)
             
             result = {
                 "filename": filename,
@@ -232,6 +3015,8 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
                 "columns_added": len(df.columns),
                 "column_names": list(df.columns)
             }
+            if compaction is not None:
+                result["compaction"] = compaction
             
             return [TextContent(
                 type="text",
@@ -247,39 +3032,144 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
                 text=f"❌ Erreur lors de l'ajout de la feuille : {str(e)}"
             )]
     
+    elif name == "append_rows":
+        filename = arguments["filename"]
+        sheet_name = arguments["sheet_name"]
+        key = scoped(filename)
+        
+        if key not in workbooks:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur: Classeur '{filename}' non trouvé. Créez d'abord un classeur."
+            )]
+        
+        try:
+            check_sheet_name(sheet_name)
+            rows = await run_blocking(build_dataframe, arguments["data"])
+            await workbooks.ensure_loaded(key)
+            if not workbooks.has_sheet(key, sheet_name):
+                return [TextContent(
+                    type="text",
+                    text=f"❌ Erreur: Feuille '{sheet_name}' non trouvée dans '{filename}'. Utilisez add_sheet pour la créer."
+                )]
+            total_rows = workbooks.append_rows(key, sheet_name, rows)
+            await workbooks.enforce_budget(keep=key)
+            auto_save_msg = auto_save_workbook(key, sheet_name, appended=True)
+            
+            result = {
+                "filename": filename,
+                "sheet_name": sheet_name,
+                "rows_added": len(rows),
+                "total_rows": total_rows
+            }
+            
+            return [TextContent(
+                type="text",
+                text=f"✅ {len(rows)} lignes ajoutées à '{sheet_name}' ({total_rows} lignes au total)\n"
+                     f"{auto_save_msg}\n\n"
+                     f"{json.dumps(result, indent=2, ensure_ascii=False)}"
+            )]
+            
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur lors de l'ajout des lignes : {str(e)}"
+            )]
+    
+    elif name == "update_range":
+        filename = arguments["filename"]
+        sheet_name = arguments["sheet_name"]
+        values = arguments["values"]
+        key = scoped(filename)
+        
+        if key not in workbooks:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur: Classeur '{filename}' non trouvé."
+            )]
+        
+        try:
+            await workbooks.ensure_loaded(key)
+            sheets = workbooks[key]
+            if sheet_name not in sheets:
+                return [TextContent(
+                    type="text",
+                    text=f"❌ Erreur: Feuille '{sheet_name}' non trouvée dans '{filename}'."
+                )]
+            df = sheets[sheet_name]
+            
+            if arguments.get("cell"):
+                row, column = parse_cell(arguments["cell"])
+            else:
+                row = int(arguments.get("row", 0))
+                column = arguments.get("column", 0)
+                if not isinstance(column, int):
+                    _check_columns(df, [column])
+                    column = df.columns.get_loc(column)
+            
+            # Copie sur écriture : la feuille est remplacée d'un bloc dans le
+            # stockage, un rendu en cours garde l'ancienne version cohérente
+            workbooks.set_sheet(key, sheet_name, update_cells(df, row, column, values))
+            auto_save_msg = auto_save_workbook(key, sheet_name)
+            
+            first = f"{_column_letter(column)}{row + 2}"
+            last = f"{_column_letter(column + len(values[0]) - 1)}{row + len(values) + 1}"
+            return [TextContent(
+                type="text",
+                text=f"✅ Plage {first}:{last} de '{sheet_name}' mise à jour ({len(values) * len(values[0])} cellules)\n"
+                     f"{auto_save_msg}"
+            )]
+            
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur lors de la mise à jour : {str(e)}"
+            )]
+    
     elif name == "save_workbook":
         filename = arguments["filename"]
         output_path = arguments.get("output_path")
+        key = scoped(filename)
         
-        if filename not in workbooks:
+        if key not in workbooks:
             return [TextContent(
                 type="text",
                 text=f"❌ Erreur: Classeur '{filename}' non trouvé."
             )]
         
+        if arguments.get("destination") == "resource":
+            try:
+                data, engine = await save_scheduler.serialize(key, arguments.get("engine"))
+            except Exception as e:
+                return [TextContent(
+                    type="text",
+                    text=f"❌ Erreur lors de la sérialisation: {str(e)}"
+                )]
+            resources = resource_contents(f"workbook://{filename}.xlsx", XLSX_MIME_TYPE, data, arguments.get("chunk_size"))
+            return [TextContent(
+                type="text",
+                text=f"✅ Classeur sérialisé en mémoire: {filename}.xlsx "
+                     f"({len(data)} octets, {len(resources)} partie(s), moteur: {engine})"
+            )] + resources
+        
         try:
             # Utiliser le chemin fourni ou celui par défaut
             if output_path:
                 file_path = f"{output_path}/{filename}.xlsx"
-                workbook_paths[filename] = file_path
+                workbook_paths[key] = file_path
             else:
-                file_path = workbook_paths.get(filename, f"/Users/usuario1/Documents/{filename}.xlsx")
+                file_path = workbook_paths.get(key, f"/Users/usuario1/Documents/{key}.xlsx")
             
-            # Créer le répertoire si nécessaire
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+            # Vider la file de sauvegarde (seules les feuilles modifiées sont re-rendues)
+            _, engine = await save_scheduler.flush(key, arguments.get("engine"))
             
-            # Sauvegarder toutes les feuilles du classeur
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                for sheet_name, df in workbooks[filename].items():
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-            
-            sheet_count = len(workbooks[filename])
-            total_rows = sum(len(df) for df in workbooks[filename].values())
+            sheet_count = len(workbooks[key])
+            total_rows = sum(len(df) for df in workbooks[key].values())
             
             return [TextContent(
                 type="text",
                 text=f"✅ Classeur sauvegardé: {file_path}\n"
-                     f"📊 {sheet_count} feuilles, {total_rows} lignes au total"
+                     f"📊 {sheet_count} feuilles, {total_rows} lignes au total (moteur: {engine})"
             )]
             
         except Exception as e:
@@ -306,35 +3196,32 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         data = arguments["data"]
         sheet_name = arguments.get("sheet_name", "Sheet1")
         
-        # Debug : afficher les paramètres reçus
-        print(f"DEBUG write_excel: file_path={file_path}, data type={type(data)}, data={data}")
+        logger.debug("write_excel: file_path=%s, data type=%s, data=%s",
+                     file_path, type(data).__name__, PayloadSummary(data))
         
         try:
-            # Vérifier que data est une liste
-            if not isinstance(data, list):
+            # Vérifier que data est une liste ou un objet colonnaire
+            if not isinstance(data, (list, dict)):
                 return [TextContent(
                     type="text",
-                    text=f"❌ Erreur : 'data' doit être une liste d'objets, reçu: {type(data)}"
+                    text=f"❌ Erreur : 'data' doit être une liste d'objets ou un objet colonnaire, reçu: {type(data)}"
                 )]
             
             # Convertir les données en DataFrame
-            df = pd.DataFrame(data)
+            df = await run_blocking(build_dataframe, data)
             
             # Utiliser le dossier Documents si pas de chemin complet
             if not file_path.startswith('/'):
                 file_path = f"/Users/usuario1/Documents/{file_path}"
             
-            # Créer le répertoire si nécessaire
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-            
             # Écrire le fichier
-            if Path(file_path).suffix.lower() in ['.xlsx', '.xls']:
-                df.to_excel(file_path, sheet_name=sheet_name, index=False)
-            elif Path(file_path).suffix.lower() == '.csv':
-                df.to_csv(file_path, index=False)
+            engine = table_writer_engine(file_path, arguments.get("engine"), df, sheet_name)
+            await run_blocking(write_table_file, file_path, df, sheet_name, engine)
+            read_cache.invalidate(file_path)
             
             result = {
                 "file_path": file_path,
+                "engine": engine,
                 "rows_written": len(df),
                 "columns_written": len(df.columns),
                 "column_names": list(df.columns)
@@ -366,26 +3253,39 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
             # Lire le fichier selon son extension
             file_ext = Path(file_path).suffix.lower()
             
-            if file_ext in ['.xlsx', '.xls']:
-                df = pd.read_excel(file_path, sheet_name=sheet_name, nrows=max_rows)
-            elif file_ext == '.csv':
-                df = pd.read_csv(file_path, nrows=max_rows)
-            else:
+            if file_ext not in TABLE_EXTENSIONS:
                 return [TextContent(
                     type="text",
                     text="❌ Erreur : Format de fichier non supporté"
                 )]
             
+            columns = arguments.get("columns")
+            filters = normalize_filters(arguments.get("filters", arguments.get("filter")))
+            scanned = None
+            if filters:
+                # Feuille complète déjà en cache : filtrage en mémoire
+                full = read_cache.get(file_path, sheet_name, None)
+                cached = full is not None
+                if cached:
+                    df, scanned = await run_blocking(collect_matches, iter([full]), filters, columns, max_rows)
+                else:
+                    df, scanned = await run_blocking(read_table_filtered, file_path, sheet_name, max_rows, columns, filters)
+            else:
+                df, cached = await read_table_cached(file_path, sheet_name, max_rows, columns)
+            
             result = {
                 "rows": len(df),
                 "columns": len(df.columns),
                 "column_names": list(df.columns),
-                "data": df.head(10).to_dict("records")
+                "data": df.head(10).to_dict("records"),
+                "cache": "hit" if cached else "miss"
             }
+            if scanned is not None:
+                result["rows_scanned"] = scanned
             
             return [TextContent(
                 type="text",
-                text=f"✅ Fichier Excel lu avec succès :\n\n{json.dumps(result, indent=2, ensure_ascii=False)}"
+                text=f"✅ Fichier Excel lu avec succès :\n\n{json.dumps(result, indent=2, ensure_ascii=False, default=str)}"
             )]
             
         except Exception as e:
@@ -394,6 +3294,369 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
                 text=f"❌ Erreur lors de la lecture : {str(e)}"
             )]
     
+    elif name == "read_excel_page":
+        file_path = arguments.get("file_path")
+        sheet_name = arguments.get("sheet_name", 0)
+        page_size = arguments.get("page_size", 100)
+        cursor = arguments.get("cursor")
+        
+        if not cursor and not file_path:
+            return [TextContent(
+                type="text",
+                text="❌ Erreur : 'file_path' ou 'cursor' est requis"
+            )]
+        # Une page vide non terminée renverrait un curseur sur la même position
+        if isinstance(page_size, bool) or not isinstance(page_size, int) or page_size < 1:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur : 'page_size' doit être un entier ≥ 1 (reçu: {page_size!r})"
+            )]
+        page_size = min(page_size, PAGE_SIZE_MAX)
+        
+        try:
+            if not cursor and not Path(file_path).exists():
+                return [TextContent(
+                    type="text",
+                    text=f"❌ Erreur : Le fichier '{file_path}' n'existe pas."
+                )]
+            
+            reader_id, reader = await page_readers.acquire(file_path, sheet_name, cursor)
+            async with reader.lock:
+                offset = reader.offset
+                df = await asyncio.to_thread(reader.read_page, page_size)
+                done = len(df) < page_size
+                next_cursor = None if done else page_readers.encode_cursor(reader_id, reader)
+            if done:
+                page_readers.close(reader_id)
+            
+            result = {
+                "offset": offset,
+                "page_size": page_size,
+                "rows": len(df),
+                "column_names": reader.columns,
+                "data": _json_safe_records(df),
+                "next_cursor": next_cursor,
+                "done": done
+            }
+            
+            return [TextContent(
+                type="text",
+                text=f"✅ Page lue ({len(df)} lignes à partir de la ligne {offset}) :\n\n"
+                     f"{json.dumps(result, indent=2, ensure_ascii=False, default=str)}"
+            )]
+            
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur lors de la lecture paginée : {str(e)}"
+            )]
+    
+    elif name == "describe_sheet":
+        filename = arguments.get("filename")
+        file_path = arguments.get("file_path")
+        sheet_name = arguments.get("sheet_name")
+        top = int(arguments.get("top", 5))
+        sample_rows = int(arguments.get("sample_rows") or DESCRIBE_SAMPLE_ROWS)
+        
+        try:
+            started = time.perf_counter()
+            cache = None
+            if filename:
+                key = scoped(filename)
+                if key not in workbooks:
+                    return [TextContent(
+                        type="text",
+                        text=f"❌ Erreur: Classeur '{filename}' non trouvé."
+                    )]
+                await workbooks.ensure_loaded(key)
+                sheets = workbooks[key]
+                if sheet_name is None and sheets:
+                    sheet_name = next(iter(sheets))
+                if sheet_name not in sheets:
+                    return [TextContent(
+                        type="text",
+                        text=f"❌ Erreur: Feuille '{sheet_name}' non trouvée dans '{filename}'."
+                    )]
+                profile = await run_blocking(profile_dataframe, sheets[sheet_name], top)
+            elif file_path:
+                if not Path(file_path).exists():
+                    return [TextContent(
+                        type="text",
+                        text=f"❌ Erreur : Le fichier '{file_path}' n'existe pas."
+                    )]
+                file_ext = Path(file_path).suffix.lower()
+                if file_ext not in TABLE_EXTENSIONS:
+                    return [TextContent(
+                        type="text",
+                        text="❌ Erreur : Format de fichier non supporté"
+                    )]
+                sheet = 0 if sheet_name is None else sheet_name
+                params = (top, sample_rows)
+                
+                profile = read_cache.get_profile(file_path, sheet, params)
+                cache = "hit" if profile is not None else "miss"
+                if profile is None:
+                    # Feuille déjà analysée ou fichier raisonnable : profil exact ;
+                    # sinon lecture en flux par blocs
+                    df = read_cache.get(file_path, sheet, None)
+                    if df is None and (os.path.getsize(file_path) <= DESCRIBE_STREAM_BYTES or file_ext == '.xls'):
+                        df, _ = await read_table_cached(file_path, sheet, None)
+                    if df is not None:
+                        profile = await run_blocking(profile_dataframe, df, top)
+                    else:
+                        profile = await run_blocking(profile_file, file_path, sheet, top, sample_rows)
+                    read_cache.put_profile(file_path, sheet, params, profile)
+            else:
+                return [TextContent(
+                    type="text",
+                    text="❌ Erreur : 'filename' ou 'file_path' est requis"
+                )]
+            
+            result = {
+                "source": filename or file_path,
+                "sheet_name": sheet_name,
+                **profile,
+                "cache": cache,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+            
+            return [TextContent(
+                type="text",
+                text=f"✅ Profil de la feuille :\n\n{json.dumps(result, indent=2, ensure_ascii=False, default=str)}"
+            )]
+            
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur lors du profilage : {str(e)}"
+            )]
+    
+    elif name == "merge_files":
+        filename = arguments.get("filename")
+        output_path = arguments.get("output_path")
+        target_sheet = arguments.get("target_sheet") or "Fusion"
+        sheet_name = arguments.get("sheet_name")
+        source_column = arguments.get("source_column")
+        join = arguments.get("join", "outer")
+        
+        if join not in ("outer", "inner"):
+            return [TextContent(
+                type="text",
+                text="❌ Erreur : 'join' doit valoir 'outer' ou 'inner'"
+            )]
+        if not filename and not output_path:
+            return [TextContent(
+                type="text",
+                text="❌ Erreur : 'filename' ou 'output_path' est requis"
+            )]
+        key = scoped(filename) if filename else None
+        if key is not None and key not in workbooks:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur: Classeur '{filename}' non trouvé. Créez d'abord un classeur."
+            )]
+        
+        try:
+            started = time.perf_counter()
+            if key is not None:
+                await workbooks.ensure_loaded(key)
+                check_sheet_name(target_sheet, workbooks.sheet_names(key))
+            else:
+                check_xlsx_output(output_path)
+            files = resolve_merge_paths(arguments.get("paths"), arguments.get("pattern"))
+            if not files:
+                return [TextContent(
+                    type="text",
+                    text="❌ Erreur : aucun fichier à fusionner ('pattern' ou 'paths')"
+                )]
+            if len(files) > MERGE_MAX_FILES:
+                return [TextContent(
+                    type="text",
+                    text=f"❌ Erreur : {len(files)} fichiers, limite de {MERGE_MAX_FILES} (AI_SHEETS_MERGE_MAX_FILES)"
+                )]
+            
+            # Un fichier par tâche : les fichiers sont analysés en parallèle
+            sheet = 0 if sheet_name is None else sheet_name
+            loop = asyncio.get_running_loop()
+            executor = get_ingest_executor()
+            outcomes = await asyncio.gather(*(
+                loop.run_in_executor(executor, ingest_file, path, sheet) for path in files
+            ))
+            parse_seconds = time.perf_counter() - started
+            
+            frames = []
+            report = []
+            for path, (df, seconds, error) in zip(files, outcomes):
+                entry: Dict[str, Any] = {"file": path, "ms": round(seconds * 1000, 1)}
+                if df is None:
+                    entry["error"] = error
+                else:
+                    entry["rows"] = len(df)
+                    entry["columns"] = len(df.columns)
+                    frames.append((path, df))
+                report.append(entry)
+            failed = len(files) - len(frames)
+            if not frames:
+                return [TextContent(
+                    type="text",
+                    text=f"❌ Erreur : aucun fichier lisible\n\n{json.dumps(report, indent=2, ensure_ascii=False)}"
+                )]
+            
+            # Colonnes absentes d'une partie des fichiers (valeurs manquantes en outer)
+            presence: Dict[str, int] = {}
+            for _, df in frames:
+                for column in dict.fromkeys(df.columns):
+                    presence[column] = presence.get(column, 0) + 1
+            partial = {column: count for column, count in presence.items() if count < len(frames)}
+            
+            merged = await run_blocking(merge_frames, frames, join, source_column)
+            del frames
+            
+            if key is not None:
+                compaction = None
+                if arguments.get("compact", COMPACT_DEFAULT):
+                    merged, compaction = await run_blocking(compact_dataframe, merged)
+                    workbooks.compacted_bytes_saved += compaction["bytes_saved"]
+                await workbooks.ensure_loaded(key)
+                workbooks.set_sheet(key, target_sheet, merged)
+                await workbooks.enforce_budget(keep=key)
+                destination_msg = auto_save_workbook(key, target_sheet)
+                destination = {"filename": filename, "sheet_name": target_sheet}
+                if compaction is not None:
+                    destination["compaction"] = compaction
+            else:
+                if not output_path.startswith('/'):
+                    output_path = f"/Users/usuario1/Documents/{output_path}"
+                engine = table_writer_engine(output_path, arguments.get("engine"), merged, target_sheet)
+                await run_blocking(write_table_file, output_path, merged, target_sheet, engine)
+                read_cache.invalidate(output_path)
+                destination_msg = f"💾 Écrit dans {output_path}"
+                destination = {"file_path": output_path, "sheet_name": target_sheet, "engine": engine}
+            
+            result = {
+                **destination,
+                "files_total": len(files),
+                "files_merged": len(files) - failed,
+                "files_failed": failed,
+                "rows": len(merged),
+                "columns": len(merged.columns),
+                "column_names": [str(c) for c in merged.columns],
+                "partial_columns": partial,
+                "join": join,
+                "parse_ms": round(parse_seconds * 1000, 1),
+                "parse_ms_sum": round(sum(seconds for _, seconds, _ in outcomes) * 1000, 1),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                "files": report
+            }
+            
+            return [TextContent(
+                type="text",
+                text=f"✅ {len(files) - failed}/{len(files)} fichiers fusionnés\n"
+                     f"📊 {len(merged)} lignes, {len(merged.columns)} colonnes\n"
+                     f"{destination_msg}\n\n"
+                     f"{json.dumps(result, indent=2, ensure_ascii=False, default=str)}"
+            )]
+            
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur lors de la fusion : {str(e)}"
+            )]
+    
+    elif name == "query_sheet":
+        filename = arguments.get("filename")
+        file_path = arguments.get("file_path")
+        sheet_name = arguments.get("sheet_name")
+        
+        try:
+            started = time.perf_counter()
+            if filename:
+                key = scoped(filename)
+                if key not in workbooks:
+                    return [TextContent(
+                        type="text",
+                        text=f"❌ Erreur: Classeur '{filename}' non trouvé."
+                    )]
+                await workbooks.ensure_loaded(key)
+                sheets = workbooks[key]
+                if not sheets:
+                    return [TextContent(
+                        type="text",
+                        text=f"❌ Erreur: Le classeur '{filename}' ne contient aucune feuille."
+                    )]
+                if sheet_name is None:
+                    sheet_name = next(iter(sheets))
+                if sheet_name not in sheets:
+                    return [TextContent(
+                        type="text",
+                        text=f"❌ Erreur: Feuille '{sheet_name}' non trouvée dans '{filename}'."
+                    )]
+                df = sheets[sheet_name]
+            elif file_path:
+                if not Path(file_path).exists():
+                    return [TextContent(
+                        type="text",
+                        text=f"❌ Erreur : Le fichier '{file_path}' n'existe pas."
+                    )]
+                df, _ = await read_table_cached(file_path, 0 if sheet_name is None else sheet_name, None)
+            else:
+                return [TextContent(
+                    type="text",
+                    text="❌ Erreur : 'filename' ou 'file_path' est requis"
+                )]
+            
+            result_df, matched = await run_blocking(run_query, df, arguments)
+            
+            result = {
+                "rows_scanned": len(df),
+                "rows_matched": matched,
+                "rows_returned": len(result_df),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                "column_names": [str(c) for c in result_df.columns],
+                "data": _json_safe_records(result_df)
+            }
+            
+            return [TextContent(
+                type="text",
+                text=f"✅ Requête exécutée :\n\n{json.dumps(result, indent=2, ensure_ascii=False, default=str)}"
+            )]
+            
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur lors de la requête : {str(e)}"
+            )]
+    
+    elif name == "server_stats":
+        if arguments.get("format") == "prometheus":
+            return [TextContent(type="text", text=metrics.to_prometheus(METRICS_PREFIX))]
+        
+        stats = metrics.snapshot()
+        stats["read_cache"] = read_cache.stats()
+        return [TextContent(
+            type="text",
+            text=f"📊 Statistiques du serveur AI-Sheets :\n\n{json.dumps(stats, indent=2, ensure_ascii=False)}"
+        )]
+    
+    elif name == "workbook_stats":
+        usage = workbooks.usage()
+        # Une session ne voit que ses propres classeurs
+        usage["workbooks"] = {
+            unscoped(key): report
+            for key, report in usage["workbooks"].items()
+            if unscoped(key) is not None
+        }
+        return [TextContent(
+            type="text",
+            text=f"📊 Classeurs en mémoire :\n\n{json.dumps(usage, indent=2, ensure_ascii=False)}"
+        )]
+    
+    elif name == "cache_stats":
+        return [TextContent(
+            type="text",
+            text=f"📊 Cache de lecture :\n\n{json.dumps(read_cache.stats(), indent=2)}"
+        )]
+    
     elif name == "test_simple":
         message = arguments.get("message", "Test par défaut")
         
@@ -408,6 +3671,73 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
             text=f"❌ Outil inconnu: {name}"
         )]
 
+# Mode serveur persistant : un seul processus (bibliothèques déjà chargées,
+# stockage partagé) sert toutes les sessions. Chaque connexion SSE reçoit
+# un espace de noms aléatoire libéré à la déconnexion ; un client peut
+# imposer le sien (en-tête X-MCP-Namespace ou ?namespace=) pour retrouver
+# ses classeurs d'une connexion à l'autre.
+session_counts: Dict[str, int] = {}
+
+async def release_namespace(namespace: str) -> None:
+    """Écrit les modifications en attente puis oublie les classeurs d'un espace"""
+    prefix = f"{namespace}/"
+    for key in [k for k in workbooks if k.startswith(prefix)]:
+        if save_scheduler.is_dirty(key):
+            try:
+                await save_scheduler.flush(key)
+            except Exception as e:
+                logger.error("Erreur sauvegarde de '%s': %s", key, e)
+        save_scheduler.forget(key)
+        workbook_paths.pop(key, None)
+        del workbooks[key]
+
+async def serve_sse(options: InitializationOptions) -> None:
+    """Sert le protocole MCP en HTTP/SSE (TCP ou socket Unix)"""
+    import uvicorn
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+    
+    sse = SseServerTransport("/messages/")
+    
+    async def handle_sse(request: Any) -> Any:
+        requested = request.headers.get("x-mcp-namespace") or request.query_params.get("namespace")
+        if requested and not NAMESPACE_PATTERN.fullmatch(requested):
+            return Response("Espace de noms invalide", status_code=400)
+        namespace = requested or uuid.uuid4().hex[:12]
+        
+        session_counts[namespace] = session_counts.get(namespace, 0) + 1
+        token = namespace_var.set(namespace)
+        logger.info("Session ouverte (espace %s)", namespace)
+        try:
+            async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, options)
+        finally:
+            session_counts[namespace] -= 1
+            if not session_counts[namespace]:
+                del session_counts[namespace]
+                if not requested:
+                    await release_namespace(namespace)
+            namespace_var.reset(token)
+            logger.info("Session fermée (espace %s)", namespace)
+        return Response()
+    
+    app = Starlette(routes=[
+        Route("/sse", endpoint=handle_sse),
+        Mount("/messages/", app=sse.handle_post_message)
+    ])
+    config = uvicorn.Config(app, host=SSE_HOST, port=SSE_PORT, uds=SSE_SOCKET, log_level=LOG_LEVEL.lower())
+    logger.warning("Serveur AI-Sheets en écoute sur %s", SSE_SOCKET or f"http://{SSE_HOST}:{SSE_PORT}/sse")
+    await uvicorn.Server(config).serve()
+
+async def preload_in_background() -> None:
+    """Importe les bibliothèques lourdes hors de la boucle asyncio"""
+    try:
+        await asyncio.to_thread(preload_modules)
+    except Exception as e:
+        logger.error("Erreur préchargement des modules: %s", e)
+
 async def main():
     """Fonction principale"""
     # Configuration des options du serveur
@@ -420,12 +3750,34 @@ async def main():
         )
     )
     
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            options
-        )
+    dump_task = asyncio.create_task(dump_metrics_periodically()) if METRICS_FILE else None
+    
+    preload_task = None
+    if PRELOAD_MODE == "eager":
+        preload_modules()
+    elif PRELOAD_MODE == "background":
+        preload_task = asyncio.create_task(preload_in_background())
+    
+    try:
+        if TRANSPORT == "sse":
+            await serve_sse(options)
+        else:
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(
+                    read_stream,
+                    write_stream,
+                    options
+                )
+    finally:
+        if dump_task is not None:
+            dump_task.cancel()
+            metrics.dump(METRICS_FILE, METRICS_PREFIX)
+        if preload_task is not None:
+            preload_task.cancel()
+        await save_scheduler.flush_all()
+        page_readers.close_all()
+        shutdown_executor()
+        workbooks.cleanup()
 
 if __name__ == "__main__":
     asyncio.run(main())
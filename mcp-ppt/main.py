@@ -4,28 +4,175 @@ PowerPoint Creator MCP Server
 Serveur MCP pour créer des présentations PowerPoint avec python-pptx
 """
 
+from __future__ import annotations
+
 import asyncio
+import base64
+import bisect
+import copy
+import functools
+import hashlib
+import importlib
+import io
 import json
+import logging
+import os
+import re
 import sys
-from typing import Any, Dict, List, Optional
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
 # MCP SDK imports
 from mcp.server.models import InitializationOptions
 from mcp.server import NotificationOptions, Server
 from mcp.server.stdio import stdio_server
-from mcp.types import Resource, Tool, TextContent, ImageContent, EmbeddedResource
+from mcp.types import Resource, Tool, TextContent, ImageContent, EmbeddedResource, BlobResourceContents
 
-# PowerPoint imports
-from pptx import Presentation
-from pptx.util import Inches
-from pptx.enum.shapes import MSO_SHAPE
-from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
+# PowerPoint : chargé à la première utilisation (voir LazyModule)
+if TYPE_CHECKING:
+    from pptx.presentation import Presentation
 
 # Initialisation du serveur MCP
 server = Server("PowerPoint-Creator")
 
+# Transport : "stdio" (défaut, un processus par client) ou "sse" (serveur
+# persistant HTTP/SSE multi-sessions, sur PPT_CREATOR_HOST:PPT_CREATOR_PORT
+# ou sur le socket Unix PPT_CREATOR_SOCKET s'il est défini).
+TRANSPORT = os.environ.get("PPT_CREATOR_TRANSPORT", "stdio").lower()
+SSE_HOST = os.environ.get("PPT_CREATOR_HOST", "127.0.0.1")
+SSE_PORT = int(os.environ.get("PPT_CREATOR_PORT", "8766"))
+SSE_SOCKET = os.environ.get("PPT_CREATOR_SOCKET")
+
+# Imports différés : python-pptx et Pillow ne sont chargés qu'au premier
+# outil qui en a besoin, pour que la poignée de main stdio et list_tools
+# répondent sans attendre. PPT_CREATOR_PRELOAD = "none" (défaut en stdio),
+# "background" (chargement en tâche de fond après le démarrage, défaut en
+# sse) ou "eager" (chargement avant de servir).
+PRELOAD_MODE = os.environ.get("PPT_CREATOR_PRELOAD", "background" if TRANSPORT == "sse" else "none").lower()
+
+class LazyModule:
+    """Module importé au premier accès à l'un de ses attributs"""
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+    
+    def load(self) -> Any:
+        """Importe le module (une seule fois) et le retourne"""
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            logger.info("Module %s chargé en %.1f ms", self._name, (time.perf_counter() - started) * 1000)
+        return self._module
+    
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self.load(), attr)
+        # Les accès suivants ne repassent plus par __getattr__
+        setattr(self, attr, value)
+        return value
+
+pptx = LazyModule("pptx")
+pptx_util = LazyModule("pptx.util")
+pptx_shapes = LazyModule("pptx.enum.shapes")
+pptx_package = LazyModule("pptx.opc.package")
+pptx_chart_data = LazyModule("pptx.chart.data")
+pptx_chart_enum = LazyModule("pptx.enum.chart")
+PILImage = LazyModule("PIL.Image")
+ImageOps = LazyModule("PIL.ImageOps")
+# pandas (+ openpyxl pour .xlsx) : seulement pour les diapositives graphiques
+pd = LazyModule("pandas")
+
+# Unités python-pptx (EMU), utilisables sans importer pptx.util
+EMU_PER_INCH = 914400
+
+def Inches(value: float) -> Any:
+    """pptx.util.Inches, importé au premier appel"""
+    return pptx_util.Inches(value)
+
+def preload_modules() -> None:
+    """Importe les bibliothèques lourdes (mode préchargement)"""
+    for module in (pptx, pptx_util, pptx_shapes, pptx_package, pptx_chart_data, pptx_chart_enum, PILImage, ImageOps):
+        module.load()
+
+# Journalisation sur stderr (stdout est réservé au canal MCP stdio).
+# Niveau réglable par PPT_CREATOR_LOG_LEVEL ; les arguments volumineux ne
+# sont résumés que si le message est effectivement émis.
+LOG_LEVEL = os.environ.get("PPT_CREATOR_LOG_LEVEL", "WARNING").upper()
+LOG_PAYLOAD_CHARS = int(os.environ.get("PPT_CREATOR_LOG_PAYLOAD_CHARS", "200"))
+
+# Identifiant de corrélation de l'appel d'outil en cours
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Espace de noms de la session en cours (mode sse) : les présentations d'une
+# session sont stockées sous "<espace>/<nom>" et invisibles des autres.
+# None en stdio, où les noms restent inchangés.
+namespace_var: ContextVar[Optional[str]] = ContextVar("namespace", default=None)
+NAMESPACE_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+def scoped(name: str) -> str:
+    """Clé interne d'une présentation pour la session en cours"""
+    namespace = namespace_var.get()
+    return name if namespace is None else f"{namespace}/{name}"
+
+def session_dir(base: str) -> str:
+    """Dossier de sortie par défaut : sous-dossier de la session en mode sse"""
+    namespace = namespace_var.get()
+    return base if namespace is None else os.path.join(base, namespace)
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+def _setup_logger() -> logging.Logger:
+    log = logging.getLogger("ppt_creator")
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(message)s"))
+        handler.addFilter(_RequestIdFilter())
+        log.addHandler(handler)
+        log.propagate = False
+    log.setLevel(LOG_LEVEL)
+    return log
+
+logger = _setup_logger()
+
+class PayloadSummary:
+    """Résumé tronqué d'un argument, calculé seulement à l'émission du log"""
+    
+    def __init__(self, value: Any, limit: int = LOG_PAYLOAD_CHARS):
+        self.value = value
+        self.limit = limit
+    
+    @classmethod
+    def _summarize(cls, value: Any, depth: int = 0) -> str:
+        if isinstance(value, dict):
+            if depth >= 2:
+                return f"{{…{len(value)} clés}}"
+            items = list(value.items())
+            inner = ", ".join(f"{k!r}: {cls._summarize(v, depth + 1)}" for k, v in items[:8])
+            more = f", …+{len(items) - 8}" if len(items) > 8 else ""
+            return f"{{{inner}{more}}}"
+        if isinstance(value, list):
+            if not value:
+                return "[]"
+            first = cls._summarize(value[0], depth + 1) if depth < 2 else "…"
+            return f"[{first}, …] (len={len(value)})" if len(value) > 1 else f"[{first}]"
+        text = repr(value)
+        return text if len(text) <= 60 else f"{text[:57]}…"
+    
+    def __str__(self) -> str:
+        text = self._summarize(self.value)
+        return text if len(text) <= self.limit else f"{text[:self.limit]}…"
+
 @server.list_tools()
 async def handle_list_tools() -> List[Tool]:
     """Liste tous les outils disponibles pour PowerPoint"""
@@ -43,6 +190,10 @@ async def handle_list_tools() -> List[Tool]:
                     "filename": {
                         "type": "string", 
                         "description": "Nom du fichier (sans extension .pptx)"
+                    },
+                    "template": {
+                        "type": "string",
+                        "description": "Modèle à utiliser : nom (voir list_templates) ou chemin d'un .pptx (défaut: default)"
                     }
                 },
                 "required": ["title", "filename"]
@@ -119,6 +270,25 @@ async def handle_list_tools() -> List[Tool]:
                 "required": ["filename", "title", "image_path"]
             }
         ),
+        Tool(
+            name="add_chart_slide",
+            description="Ajouter une diapositive avec un graphique natif construit à partir d'un fichier Excel/CSV ou de données colonnaires (agrégation côté serveur)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "Nom du fichier de présentation"
+                    },
+                    "title": {
+                        "type": "string",
+                        "description": "Titre de la diapositive"
+                    },
+                    **CHART_PROPERTIES
+                },
+                "required": ["filename", "title"]
+            }
+        ),
         Tool(
             name="save_presentation",
             description="Sauvegarder la présentation PowerPoint",
@@ -132,31 +302,1067 @@ async def handle_list_tools() -> List[Tool]:
                     "output_path": {
                         "type": "string",
                         "description": "Chemin de sortie (optionnel, par défaut dossier actuel)"
-                    }
+                    },
+                    "destination": DESTINATION_SCHEMA,
+                    "chunk_size": CHUNK_SIZE_SCHEMA
                 },
                 "required": ["filename"]
             }
+        ),
+        Tool(
+            name="build_presentation",
+            description="Construire une présentation complète en un seul appel à partir d'une liste de diapositives",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "Nom du fichier (sans extension .pptx)"
+                    },
+                    "title": {
+                        "type": "string",
+                        "description": "Titre de la présentation (optionnel)"
+                    },
+                    "slides": {
+                        "type": "array",
+                        "description": "Diapositives dans l'ordre",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "type": {
+                                    "type": "string",
+                                    "enum": ["title", "content", "image", "chart"],
+                                    "description": "Type de diapositive"
+                                },
+                                "title": {
+                                    "type": "string",
+                                    "description": "Titre de la diapositive"
+                                },
+                                "subtitle": {
+                                    "type": "string",
+                                    "description": "Sous-titre (type title)"
+                                },
+                                "content": {
+                                    "type": "array",
+                                    "items": {"type": "string"},
+                                    "description": "Points de contenu (type content)"
+                                },
+                                "image_path": {
+                                    "type": "string",
+                                    "description": "Chemin de l'image (type image)"
+                                },
+                                "caption": {
+                                    "type": "string",
+                                    "description": "Légende (type image)"
+                                },
+                                **CHART_PROPERTIES
+                            },
+                            "required": ["type", "title"]
+                        }
+                    },
+                    "template": {
+                        "type": "string",
+                        "description": "Modèle à utiliser pour une nouvelle présentation (défaut: default)"
+                    },
+                    "append": {
+                        "type": "boolean",
+                        "description": "Ajouter à la présentation existante au lieu d'en créer une nouvelle (défaut: false)"
+                    },
+                    "output_path": {
+                        "type": "string",
+                        "description": "Si fourni, sauvegarder la présentation dans ce dossier"
+                    }
+                },
+                "required": ["filename", "slides"]
+            }
+        ),
+        Tool(
+            name="list_templates",
+            description="Lister les modèles de présentation disponibles et leurs layouts",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
+        ),
+        Tool(
+            name="server_stats",
+            description="Métriques du serveur : latence, taille des requêtes/réponses par outil et taille des présentations",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "enum": ["json", "prometheus"],
+                        "description": "Format de sortie (défaut: json)"
+                    }
+                }
+            }
         )
     ]
 
 # Stockage des présentations en mémoire
 presentations: Dict[str, Presentation] = {}
 
+# Une présentation n'est modifiée que sous son verrou : les modifications
+# d'un même deck restent ordonnées, les decks distincts avancent en parallèle.
+presentation_locks: Dict[str, asyncio.Lock] = {}
+
+def presentation_lock(filename: str) -> asyncio.Lock:
+    """Verrou asyncio d'une présentation (créé à la première utilisation)"""
+    return presentation_locks.setdefault(filename, asyncio.Lock())
+
+# Octets des médias de chaque présentation, mesurés par le worker qui vient
+# de la modifier (les métriques ne parcourent pas un deck en cours d'édition)
+presentation_sizes: Dict[str, int] = {}
+
+# Exécution hors de la boucle asyncio : construction des diapositives,
+# copie des modèles, traitement des images et sauvegardes passent par ce
+# pool de threads (les objets python-pptx ne sont pas sérialisables).
+EXECUTOR_WORKERS = int(os.environ.get("PPT_CREATOR_WORKERS", "0")) or None
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_executor() -> ThreadPoolExecutor:
+    """Retourne le pool d'exécution (créé à la première utilisation)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=EXECUTOR_WORKERS,
+            thread_name_prefix="ppt-creator"
+        )
+    return _executor
+
+def shutdown_executor() -> None:
+    """Arrête le pool d'exécution en attendant les tâches en cours"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Exécute une fonction bloquante dans le pool sans bloquer la boucle asyncio"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+# Métriques par outil : latence, taille des arguments et des réponses,
+# taille des stockages en mémoire. Exposées par l'outil server_stats et,
+# si METRICS_FILE est défini, écrites périodiquement dans un fichier
+# (format JSON si l'extension est .json, texte Prometheus sinon).
+METRICS_FILE = os.environ.get("PPT_CREATOR_METRICS_FILE")
+METRICS_INTERVAL_SECONDS = float(os.environ.get("PPT_CREATOR_METRICS_INTERVAL", "60"))
+METRICS_PREFIX = "ppt_creator"
+
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864]
+STORE_BUCKETS = [1048576, 16777216, 67108864, 268435456, 536870912, 1073741824, 2147483648, 4294967296]
+
+class Histogram:
+    """Histogramme à seaux fixes (cumulables au format Prometheus)"""
+    
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q: float) -> float:
+        """Quantile approché par interpolation linéaire dans le seau"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+    
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6)
+        }
+
+class ToolMetrics:
+    """Métriques agrégées par outil"""
+    
+    def __init__(self, gauges: Callable[[], Dict[str, float]], store_bytes: Callable[[], float]):
+        self.started = time.time()
+        self.gauges = gauges
+        self.store_bytes = store_bytes
+        # Taille du stockage en mémoire observée après chaque appel
+        self.store = Histogram(STORE_BUCKETS)
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.latency: Dict[str, Histogram] = {}
+        self.request_bytes: Dict[str, Histogram] = {}
+        self.response_bytes: Dict[str, Histogram] = {}
+    
+    def record(self, tool: str, seconds: float, request_bytes: int, response_bytes: int, error: bool) -> None:
+        self.calls[tool] = self.calls.get(tool, 0) + 1
+        if error:
+            self.errors[tool] = self.errors.get(tool, 0) + 1
+        self.latency.setdefault(tool, Histogram(LATENCY_BUCKETS)).observe(seconds)
+        self.request_bytes.setdefault(tool, Histogram(SIZE_BUCKETS)).observe(request_bytes)
+        self.response_bytes.setdefault(tool, Histogram(SIZE_BUCKETS)).observe(response_bytes)
+        self.store.observe(self.store_bytes())
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "gauges": self.gauges(),
+            "store_bytes": self.store.summary(),
+            "tools": {
+                tool: {
+                    "calls": count,
+                    "errors": self.errors.get(tool, 0),
+                    "latency_seconds": self.latency[tool].summary(),
+                    "request_bytes": self.request_bytes[tool].summary(),
+                    "response_bytes": self.response_bytes[tool].summary()
+                }
+                for tool, count in sorted(self.calls.items())
+            }
+        }
+    
+    def to_prometheus(self, prefix: str) -> str:
+        """Export au format texte Prometheus"""
+        lines = []
+        for metric, histograms in (
+            ("tool_latency_seconds", self.latency),
+            ("tool_request_bytes", self.request_bytes),
+            ("tool_response_bytes", self.response_bytes)
+        ):
+            lines.append(f"# TYPE {prefix}_{metric} histogram")
+            for tool, hist in sorted(histograms.items()):
+                cumulative = 0
+                for bound, n in zip(hist.buckets + ["+Inf"], hist.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_{metric}_bucket{{tool="{tool}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_{metric}_sum{{tool="{tool}"}} {hist.sum}')
+                lines.append(f'{prefix}_{metric}_count{{tool="{tool}"}} {hist.count}')
+        lines.append(f"# TYPE {prefix}_store_bytes histogram")
+        cumulative = 0
+        for bound, n in zip(self.store.buckets + ["+Inf"], self.store.counts):
+            cumulative += n
+            lines.append(f'{prefix}_store_bytes_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{prefix}_store_bytes_sum {self.store.sum}")
+        lines.append(f"{prefix}_store_bytes_count {self.store.count}")
+        lines.append(f"# TYPE {prefix}_tool_errors_total counter")
+        for tool in sorted(self.calls):
+            lines.append(f'{prefix}_tool_errors_total{{tool="{tool}"}} {self.errors.get(tool, 0)}')
+        for gauge, value in sorted(self.gauges().items()):
+            lines.append(f"# TYPE {prefix}_{gauge} gauge")
+            lines.append(f"{prefix}_{gauge} {value}")
+        return "\n".join(lines) + "\n"
+    
+    def dump(self, path: str, prefix: str) -> None:
+        """Écrit les métriques dans un fichier (remplacement atomique)"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.suffix.lower() == ".json":
+            content = json.dumps(self.snapshot(), indent=2, ensure_ascii=False)
+        else:
+            content = self.to_prometheus(prefix)
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, target)
+
+def payload_size(value: Any) -> int:
+    """Taille approximative en octets d'un argument ou d'une réponse JSON"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+def response_size(contents: List[Any]) -> int:
+    """Taille du contenu renvoyé (texte ou données encodées)"""
+    total = 0
+    for content in contents:
+        text = getattr(content, "text", None)
+        if text is None:
+            text = getattr(content, "data", None)
+        if text is None:
+            # Ressource intégrée : contenu base64 ou texte
+            resource = getattr(content, "resource", None)
+            text = getattr(resource, "blob", None) or getattr(resource, "text", None) or ""
+        total += len(text.encode("utf-8")) if isinstance(text, str) else len(text)
+    return total
+
+# Retour en mémoire des fichiers produits (destination="resource") : le
+# contenu est renvoyé en EmbeddedResource base64, éventuellement découpé en
+# parties de chunk_size octets (uri ...?part=i&parts=n), sans passer par le disque.
+RESOURCE_CHUNK_BYTES = int(os.environ.get("PPT_CREATOR_RESOURCE_CHUNK_BYTES", str(8 * 1024 * 1024)))
+
+# Paramètres communs des outils de sauvegarde
+DESTINATION_SCHEMA = {
+    "type": "string",
+    "enum": ["file", "resource"],
+    "description": "file : écrire sur disque (défaut) ; resource : renvoyer le fichier en mémoire (EmbeddedResource base64)"
+}
+CHUNK_SIZE_SCHEMA = {
+    "type": "integer",
+    "description": "Taille maximale en octets de chaque partie renvoyée avec destination=resource"
+}
+
+def resource_contents(uri: str, mime_type: str, data: bytes, chunk_size: Optional[int] = None) -> List[EmbeddedResource]:
+    """Découpe un fichier sérialisé en ressources intégrées base64"""
+    chunk_size = max(1, chunk_size or RESOURCE_CHUNK_BYTES)
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)] or [b""]
+    if len(chunks) == 1:
+        uris = [uri]
+    else:
+        uris = [f"{uri}?part={i}&parts={len(chunks)}" for i in range(1, len(chunks) + 1)]
+    return [
+        EmbeddedResource(
+            type="resource",
+            resource=BlobResourceContents(
+                uri=part_uri,
+                mimeType=mime_type,
+                blob=base64.b64encode(chunk).decode("ascii")
+            )
+        )
+        for part_uri, chunk in zip(uris, chunks)
+    ]
+
+async def dump_metrics_periodically() -> None:
+    """Écrit METRICS_FILE toutes les METRICS_INTERVAL_SECONDS secondes"""
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL_SECONDS)
+        try:
+            metrics.dump(METRICS_FILE, METRICS_PREFIX)
+        except OSError as e:
+            logger.error("Erreur export des métriques: %s", e)
+
+def presentation_media_bytes(prs: Presentation) -> int:
+    """Octets des parties binaires (images, médias) d'une présentation"""
+    return sum(
+        len(part.blob)
+        for part in prs.part.package.iter_parts()
+        if not isinstance(part, pptx_package.XmlPart)
+    )
+
+def store_gauges() -> Dict[str, float]:
+    """Tailles courantes des présentations en mémoire"""
+    return {
+        "presentations": len(presentations),
+        "sessions": sum(session_counts.values()),
+        "slides": sum(len(prs.slides) for prs in presentations.values()),
+        "media_bytes": sum(presentation_sizes.values()),
+        "templates_loaded": len(templates.stats()["loaded"]),
+        "image_cache_bytes": images.cache_bytes(),
+        "image_bytes_saved": images.source_bytes - images.output_bytes
+    }
+
+metrics = ToolMetrics(
+    store_gauges,
+    lambda: sum(presentation_sizes.values())
+)
+
+# Registre des modèles : chaque .pptx (modèle par défaut de python-pptx ou
+# modèle d'entreprise du dossier TEMPLATE_DIR) est analysé une seule fois.
+# Les nouvelles présentations sont des copies profondes du prototype en
+# mémoire, avec les layouts déjà résolus par rôle (title, content, blank).
+TEMPLATE_DIR = os.environ.get("PPT_CREATOR_TEMPLATE_DIR")
+DEFAULT_TEMPLATE = "default"
+
+# Index des layouts du modèle par défaut, utilisés si un rôle est introuvable
+DEFAULT_LAYOUT_INDEXES = {"title": 0, "content": 1, "blank": 6}
+
+# Layouts pré-résolus de chaque présentation, indexés par sa partie principale
+presentation_layouts: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+def resolve_layouts(prs: Presentation) -> Dict[str, Any]:
+    """Associe chaque rôle de diapositive au layout le plus adapté du modèle"""
+    PP_PLACEHOLDER = pptx_shapes.PP_PLACEHOLDER
+    # Espaces réservés ignorés pour reconnaître un layout vide
+    decorations = {PP_PLACEHOLDER.DATE, PP_PLACEHOLDER.FOOTER, PP_PLACEHOLDER.SLIDE_NUMBER}
+    layouts = list(prs.slide_layouts)
+    roles: Dict[str, Any] = {}
+    for layout in layouts:
+        types = {
+            ph.placeholder_format.type
+            for ph in layout.placeholders
+            if ph.placeholder_format.type not in decorations
+        }
+        if "title" not in roles and PP_PLACEHOLDER.CENTER_TITLE in types:
+            roles["title"] = layout
+        elif "content" not in roles and PP_PLACEHOLDER.TITLE in types and types & {PP_PLACEHOLDER.OBJECT, PP_PLACEHOLDER.BODY}:
+            roles["content"] = layout
+        elif "blank" not in roles and not types:
+            roles["blank"] = layout
+
+    # Modèles atypiques : on retombe sur les index du modèle par défaut
+    for role, index in DEFAULT_LAYOUT_INDEXES.items():
+        if role not in roles:
+            roles[role] = layouts[min(index, len(layouts) - 1)]
+    return roles
+
+class TemplateRegistry:
+    """Prototypes de présentations chargés une fois par modèle"""
+
+    def __init__(self, template_dir: Optional[str]):
+        self.template_dir = Path(template_dir) if template_dir else None
+        self.loads = 0
+        self.clones = 0
+        # nom -> (identité du fichier, prototype, layouts par rôle)
+        self._prototypes: Dict[str, Tuple[Any, Presentation, Dict[str, Any]]] = {}
+        # Appelé depuis le pool : chargement et copie des prototypes sérialisés
+        self._lock = threading.Lock()
+
+    def available(self) -> List[str]:
+        """Modèles utilisables : le modèle par défaut et ceux de TEMPLATE_DIR"""
+        names = [DEFAULT_TEMPLATE]
+        if self.template_dir is not None and self.template_dir.is_dir():
+            names.extend(sorted(p.stem for p in self.template_dir.glob("*.pptx") if not p.name.startswith("~$")))
+        return names
+
+    def template_path(self, template: str) -> Optional[Path]:
+        """Chemin du fichier d'un modèle (None pour le modèle par défaut)"""
+        if template == DEFAULT_TEMPLATE:
+            return None
+        path = Path(template)
+        if path.suffix.lower() != ".pptx" and self.template_dir is not None:
+            path = self.template_dir / f"{template}.pptx"
+        if not path.is_file():
+            raise FileNotFoundError(f"Modèle non trouvé: {template} (disponibles: {', '.join(self.available())})")
+        return path
+
+    def prototype(self, template: str) -> Tuple[Presentation, Dict[str, Any]]:
+        """Prototype du modèle, rechargé seulement si le fichier a changé"""
+        path = self.template_path(template)
+        if path is None:
+            identity = None
+        else:
+            st = path.stat()
+            identity = (os.path.realpath(path), st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entry = self._prototypes.get(template)
+            if entry is None or entry[0] != identity:
+                prs = pptx.Presentation(str(path)) if path is not None else pptx.Presentation()
+                entry = (identity, prs, resolve_layouts(prs))
+                self._prototypes[template] = entry
+                self.loads += 1
+                logger.info("Modèle '%s' chargé (%d layouts)", template, len(prs.slide_layouts))
+            return entry[1], entry[2]
+
+    def new_presentation(self, template: str = DEFAULT_TEMPLATE) -> Presentation:
+        """Nouvelle présentation copiée du prototype, layouts déjà résolus"""
+        prototype, roles = self.prototype(template)
+        with self._lock:
+            # Copier ensemble le prototype et ses layouts garde les références
+            # des layouts cohérentes avec les parties de la copie
+            prs, clone_roles = copy.deepcopy((prototype, roles))
+            presentation_layouts[prs.part] = clone_roles
+            self.clones += 1
+        return prs
+
+    def layout_for(self, prs: Presentation, role: str) -> Any:
+        """Layout pré-résolu d'une présentation pour un rôle (title, content, blank)"""
+        with self._lock:
+            roles = presentation_layouts.get(prs.part)
+        if roles is None:
+            # Présentation ouverte depuis un fichier : résolue une fois
+            roles = resolve_layouts(prs)
+            with self._lock:
+                roles = presentation_layouts.setdefault(prs.part, roles)
+        return roles[role]
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du registre"""
+        return {
+            "template_dir": str(self.template_dir) if self.template_dir else None,
+            "loaded": sorted(self._prototypes),
+            "loads": self.loads,
+            "clones": self.clones
+        }
+
+templates = TemplateRegistry(TEMPLATE_DIR)
+
+# Pipeline d'images : chaque image est réduite à sa taille d'affichage sur
+# la diapositive (IMAGE_DPI) puis réencodée. Les variantes traitées sont
+# indexées par empreinte du contenu dans un cache disque borné (LRU), ce
+# qui les partage entre diapositives et présentations.
+IMAGE_DPI = int(os.environ.get("PPT_CREATOR_IMAGE_DPI", "150"))
+IMAGE_JPEG_QUALITY = int(os.environ.get("PPT_CREATOR_IMAGE_QUALITY", "85"))
+IMAGE_CACHE_DIR = os.environ.get("PPT_CREATOR_IMAGE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "ppt_creator_images")
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("PPT_CREATOR_IMAGE_CACHE_BYTES", str(512 * 1024 * 1024)))
+
+# Largeur d'affichage des images dans build_image_slide
+IMAGE_DISPLAY_WIDTH = 8 * EMU_PER_INCH
+
+# Tag EXIF Orientation (1 : image droite)
+_EXIF_ORIENTATION = 0x0112
+
+class ImagePipeline:
+    """Réduction, réencodage et déduplication des images insérées"""
+
+    def __init__(self, cache_dir: str, max_bytes: int, dpi: int, quality: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.dpi = dpi
+        self.quality = quality
+        self.processed = 0
+        self.hits = 0
+        self.passthrough = 0
+        self.evictions = 0
+        self.source_bytes = 0
+        self.output_bytes = 0
+        # (chemin réel, mtime, taille, largeur max) -> variante traitée ou
+        # original, pour ne pas relire ni rehacher un fichier inchangé
+        self._known: "OrderedDict[Tuple[str, int, int, int], Path]" = OrderedDict()
+        # Appelé depuis le pool : protège _known et les compteurs
+        self._lock = threading.Lock()
+        # Un verrou par variante en cours de calcul, pour qu'une même image
+        # insérée par plusieurs decks à la fois ne soit traitée qu'une fois
+        self._inflight: Dict[str, threading.Lock] = {}
+
+    def max_pixels(self, display_width: int) -> int:
+        """Largeur maximale en pixels pour une largeur d'affichage en EMU"""
+        return max(1, round(display_width / EMU_PER_INCH * self.dpi))
+
+    def prepare(self, image_path: str, display_width: int = IMAGE_DISPLAY_WIDTH) -> str:
+        """Chemin de la variante à insérer pour une image affichée sur display_width"""
+        max_px = self.max_pixels(display_width)
+        real_path = os.path.realpath(image_path)
+        st = os.stat(real_path)
+        known_key = (real_path, st.st_mtime_ns, st.st_size, max_px)
+        with self._lock:
+            self.source_bytes += st.st_size
+            variant = self._known.get(known_key)
+            if variant is not None and variant.exists():
+                self._known.move_to_end(known_key)
+                self.hits += 1
+                self.output_bytes += variant.stat().st_size
+                if variant.parent == self.cache_dir:
+                    os.utime(variant)
+                return str(variant)
+
+        with open(real_path, "rb") as f:
+            blob = f.read()
+        digest = hashlib.sha256(blob).hexdigest()
+        stem = f"{digest}-{max_px}-{self.quality}"
+        with self._lock:
+            inflight = self._inflight.setdefault(stem, threading.Lock())
+        with inflight:
+            candidates = sorted(self.cache_dir.glob(f"{stem}.*")) if self.cache_dir.is_dir() else []
+            processed = None
+            if candidates:
+                variant = candidates[0]
+                os.utime(variant)
+            else:
+                processed = self._process(blob, digest, max_px)
+                # Format non géré ou déjà optimal : on garde l'original
+                variant = processed or Path(real_path)
+                if processed is not None:
+                    self._evict(keep=processed)
+        with self._lock:
+            self._inflight.pop(stem, None)
+
+        with self._lock:
+            if candidates:
+                self.hits += 1
+            elif processed is not None:
+                self.processed += 1
+            else:
+                self.passthrough += 1
+            self.output_bytes += variant.stat().st_size
+            self._known[known_key] = variant
+            while len(self._known) > 1024:
+                self._known.popitem(last=False)
+        return str(variant)
+
+    def _process(self, blob: bytes, digest: str, max_px: int) -> Optional[Path]:
+        """Réduit et réencode une image ; None si l'original convient mieux"""
+        try:
+            with PILImage.open(io.BytesIO(blob)) as im:
+                source_format = im.format
+                # Photo de téléphone : pixels stockés tournés, orientation dans l'EXIF.
+                # PowerPoint ignore ce tag, l'image doit être redressée et réencodée
+                rotated = im.getexif().get(_EXIF_ORIENTATION, 1) not in (0, 1)
+                im = ImageOps.exif_transpose(im)
+                has_alpha = im.mode in ("RGBA", "LA", "PA") or (im.mode == "P" and "transparency" in im.info)
+                resized = im.width > max_px
+                if resized:
+                    im = im.resize((max_px, max(1, round(im.height * max_px / im.width))), PILImage.LANCZOS)
+                if not resized and not rotated and source_format in ("JPEG", "PNG"):
+                    return None
+
+                out = io.BytesIO()
+                if has_alpha or (source_format in ("PNG", "GIF", "BMP") and im.mode in ("1", "L", "P")):
+                    ext = "png"
+                    im.save(out, format="PNG", optimize=True)
+                else:
+                    ext = "jpg"
+                    im.convert("RGB").save(out, format="JPEG", quality=self.quality, optimize=True, progressive=True)
+        except (OSError, ValueError, PILImage.DecompressionBombError) as e:
+            logger.warning("Image non traitée, insérée telle quelle: %s", e)
+            return None
+
+        data = out.getvalue()
+        if len(data) >= len(blob) and source_format in ("JPEG", "PNG") and not rotated:
+            return None
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        variant = self.cache_dir / f"{digest}-{max_px}-{self.quality}.{ext}"
+        tmp_path = variant.with_name(f".{variant.name}.{uuid.uuid4().hex[:8]}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, variant)
+        logger.info("Image réduite: %d → %d octets (%s)", len(blob), len(data), variant.name)
+        return variant
+
+    def _evict(self, keep: Path) -> None:
+        """Supprime les variantes les moins récemment utilisées au-delà du budget (sauf keep)"""
+        entries = []
+        for path in self.cache_dir.glob("*-*-*.*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def cache_bytes(self) -> int:
+        """Taille courante du cache disque"""
+        total = 0
+        if self.cache_dir.is_dir():
+            for path in self.cache_dir.glob("*-*-*.*"):
+                try:
+                    total += path.stat().st_size
+                except FileNotFoundError:
+                    continue
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du pipeline"""
+        return {
+            "cache_dir": str(self.cache_dir),
+            "cache_bytes": self.cache_bytes(),
+            "max_bytes": self.max_bytes,
+            "processed": self.processed,
+            "hits": self.hits,
+            "passthrough": self.passthrough,
+            "evictions": self.evictions,
+            "source_bytes": self.source_bytes,
+            "output_bytes": self.output_bytes
+        }
+
+images = ImagePipeline(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, IMAGE_DPI, IMAGE_JPEG_QUALITY)
+
+# Construction des diapositives, partagée entre les outils unitaires
+# (add_*_slide) et build_presentation
+
+def build_title_slide(prs: Presentation, title: str, subtitle: str = "") -> str:
+    """Ajoute une diapositive de titre ; retourne le message de résultat"""
+    # Layout de diapositive titre (index 0 du modèle par défaut)
+    title_slide_layout = templates.layout_for(prs, "title")
+    slide = prs.slides.add_slide(title_slide_layout)
+    
+    # Ajouter le titre
+    slide.shapes.title.text = title
+    
+    # Ajouter le sous-titre si fourni
+    if subtitle and len(slide.placeholders) > 1:
+        slide.placeholders[1].text = subtitle
+    
+    return f"✅ Diapositive de titre ajoutée: '{title}'"
+
+def build_content_slide(prs: Presentation, title: str, content: List[str]) -> str:
+    """Ajoute une diapositive titre + liste à puces"""
+    # Layout avec titre et contenu (index 1 du modèle par défaut)
+    bullet_slide_layout = templates.layout_for(prs, "content")
+    slide = prs.slides.add_slide(bullet_slide_layout)
+    
+    # Ajouter le titre
+    slide.shapes.title.text = title
+    
+    # Ajouter le contenu
+    if len(slide.placeholders) > 1:
+        body_shape = slide.placeholders[1]
+        tf = body_shape.text_frame
+        tf.clear()
+        
+        for i, point in enumerate(content):
+            if i == 0:
+                tf.text = point
+            else:
+                p = tf.add_paragraph()
+                p.text = point
+                p.level = 0
+    
+    return f"✅ Diapositive de contenu ajoutée: '{title}' avec {len(content)} points"
+
+def build_image_slide(prs: Presentation, title: str, image_path: str, caption: str = "") -> str:
+    """Ajoute une diapositive avec une image (lève une exception si l'image échoue)"""
+    # Layout vide (index 6 du modèle par défaut) pour plus de contrôle
+    blank_slide_layout = templates.layout_for(prs, "blank")
+    slide = prs.slides.add_slide(blank_slide_layout)
+    
+    # Ajouter le titre manuellement
+    title_shape = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1))
+    title_frame = title_shape.text_frame
+    title_frame.text = title
+    title_frame.paragraphs[0].font.size = Inches(0.4)
+    title_frame.paragraphs[0].font.bold = True
+    
+    # Ajouter l'image, réduite à sa taille d'affichage
+    slide.shapes.add_picture(images.prepare(image_path, IMAGE_DISPLAY_WIDTH), Inches(1), Inches(1.5), width=IMAGE_DISPLAY_WIDTH)
+    
+    result_text = f"✅ Diapositive avec image ajoutée: '{title}'"
+    if caption:
+        # Ajouter une légende
+        caption_shape = slide.shapes.add_textbox(Inches(1), Inches(6.5), Inches(8), Inches(1))
+        caption_frame = caption_shape.text_frame
+        caption_frame.text = caption
+        result_text += f" (avec légende)"
+    
+    return result_text
+
+# Graphiques natifs (modifiables dans PowerPoint) construits côté serveur à
+# partir d'un fichier (.xlsx, .csv, .parquet) ou de données colonnaires :
+# seules les colonnes utiles sont lues, l'agrégation est faite par pandas et
+# aucune ligne de données ne repasse par l'agent.
+CHART_TYPES = {
+    "column": "COLUMN_CLUSTERED",
+    "stacked_column": "COLUMN_STACKED",
+    "bar": "BAR_CLUSTERED",
+    "line": "LINE_MARKERS",
+    "area": "AREA",
+    "pie": "PIE",
+    "scatter": "XY_SCATTER"
+}
+CHART_AGGREGATES = ["sum", "mean", "median", "min", "max", "count", "none"]
+CHART_MAX_CATEGORIES = int(os.environ.get("PPT_CREATOR_CHART_MAX_CATEGORIES", "100"))
+CHART_MAX_POINTS = int(os.environ.get("PPT_CREATOR_CHART_MAX_POINTS", "2000"))
+
+# Paramètres communs à add_chart_slide et aux diapositives "chart" de build_presentation
+CHART_PROPERTIES = {
+    "chart_type": {
+        "type": "string",
+        "enum": list(CHART_TYPES),
+        "description": "Type de graphique (défaut: column)"
+    },
+    "file_path": {
+        "type": "string",
+        "description": "Fichier source .xlsx, .csv ou .parquet (alternative à 'data')"
+    },
+    "sheet_name": {
+        "type": ["string", "integer"],
+        "description": "Feuille à lire pour un .xlsx (défaut: la première)"
+    },
+    "data": {
+        "type": "object",
+        "description": "Données colonnaires {\"columns\": [...], \"values\": [[...], ...]} (alternative à 'file_path')"
+    },
+    "x": {
+        "type": "string",
+        "description": "Colonne des catégories (axe X) ; défaut: la première colonne"
+    },
+    "y": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Colonnes de valeurs, une série chacune ; défaut: toutes les colonnes numériques"
+    },
+    "aggregate": {
+        "type": "string",
+        "enum": CHART_AGGREGATES,
+        "description": "Agrégation des valeurs par catégorie (défaut: sum ; none = une catégorie par ligne)"
+    },
+    "sort": {
+        "type": "string",
+        "enum": ["none", "value", "category"],
+        "description": "Ordre des catégories : ordre d'apparition, valeur décroissante de la première série, ou catégorie"
+    },
+    "top": {
+        "type": "integer",
+        "description": "Nombre maximal de catégories conservées"
+    }
+}
+
+def load_chart_frame(spec: Dict[str, Any], columns: Optional[List[str]]) -> Any:
+    """Charge les données d'un graphique (seulement les colonnes utiles si connues)"""
+    data = spec.get("data")
+    file_path = spec.get("file_path")
+    if data is not None:
+        if isinstance(data, dict):
+            names, values = data.get("columns"), data.get("values")
+            if not isinstance(names, list) or not isinstance(values, list) or len(names) != len(values):
+                raise ValueError("'data' requiert 'columns' et 'values' (une liste de valeurs par colonne)")
+            return pd.DataFrame(dict(zip(names, values)), columns=names)
+        return pd.DataFrame(data)
+    if not file_path:
+        raise ValueError("'file_path' ou 'data' est requis")
+    
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Fichier non trouvé: {file_path}")
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return pd.read_csv(path, usecols=columns)
+    if suffix in (".xlsx", ".xlsm", ".xls"):
+        return pd.read_excel(path, sheet_name=spec.get("sheet_name", 0), usecols=columns)
+    if suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    raise ValueError(f"Format non supporté pour un graphique: {suffix} (.xlsx, .csv, .parquet)")
+
+def _chart_values(series: Any) -> List[Optional[float]]:
+    return [None if pd.isna(v) else float(v) for v in series.tolist()]
+
+def prepare_chart(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Lit et agrège les données d'un graphique ; retourne catégories et séries"""
+    chart_type = spec.get("chart_type", "column")
+    if chart_type not in CHART_TYPES:
+        raise ValueError(f"Type de graphique inconnu: {chart_type} ({', '.join(CHART_TYPES)})")
+    aggregate = spec.get("aggregate", "sum")
+    if aggregate not in CHART_AGGREGATES:
+        raise ValueError(f"Agrégation inconnue: {aggregate} ({', '.join(CHART_AGGREGATES)})")
+    x = spec.get("x")
+    y = spec.get("y") or []
+    if isinstance(y, str):
+        y = [y]
+    
+    df = load_chart_frame(spec, [x, *y] if x and y else None)
+    if x is None:
+        x = df.columns[0]
+    if not y:
+        y = [c for c in df.columns if c != x and pd.api.types.is_numeric_dtype(df[c])]
+        if not y:
+            raise ValueError("aucune colonne numérique à représenter ; précisez 'y'")
+    missing = [c for c in [x, *y] if c not in df.columns]
+    if missing:
+        raise ValueError(f"colonnes inconnues {missing} (disponibles: {[str(c) for c in df.columns]})")
+    values = df[y].apply(pd.to_numeric, errors="coerce")
+    rows = len(df)
+    
+    if chart_type == "scatter":
+        frame = values.assign(**{"__x": pd.to_numeric(df[x], errors="coerce")}).dropna(subset=["__x"])
+        # Au-delà de CHART_MAX_POINTS, échantillonnage régulier
+        step = -(-len(frame) // CHART_MAX_POINTS)
+        frame = frame.iloc[::max(step, 1)]
+        return {
+            "chart_type": chart_type,
+            "rows": rows,
+            "categories": frame["__x"].tolist(),
+            "series": [(str(c), _chart_values(frame[c])) for c in y],
+            "truncated": 0
+        }
+    
+    if aggregate == "none":
+        frame = values.set_axis(df[x])
+    else:
+        frame = values.groupby(df[x], sort=False, dropna=True).agg(aggregate)
+    
+    top = int(spec.get("top") or CHART_MAX_CATEGORIES)
+    sort = spec.get("sort") or ("category" if chart_type in ("line", "area") else "none")
+    if sort == "none" and len(frame) > top and chart_type not in ("line", "area"):
+        # Trop de catégories : on garde les plus grandes plutôt que les premières
+        sort = "value"
+    if sort == "value":
+        frame = frame.sort_values(frame.columns[0], ascending=False, kind="stable")
+    elif sort == "category":
+        frame = frame.sort_index(kind="stable")
+    truncated = max(0, len(frame) - top)
+    frame = frame.head(top)
+    if chart_type == "pie":
+        frame = frame.iloc[:, :1]
+    
+    return {
+        "chart_type": chart_type,
+        "rows": rows,
+        "categories": frame.index.astype(str).tolist(),
+        "series": [(str(c), _chart_values(frame[c])) for c in frame.columns],
+        "truncated": truncated
+    }
+
+def build_chart_slide(prs: Presentation, title: str, chart: Dict[str, Any]) -> str:
+    """Ajoute une diapositive avec un graphique natif préparé par prepare_chart"""
+    slide = prs.slides.add_slide(templates.layout_for(prs, "blank"))
+    
+    title_shape = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1))
+    title_frame = title_shape.text_frame
+    title_frame.text = title
+    title_frame.paragraphs[0].font.size = Inches(0.4)
+    title_frame.paragraphs[0].font.bold = True
+    
+    chart_type = chart["chart_type"]
+    if chart_type == "scatter":
+        chart_data = pptx_chart_data.XyChartData()
+        for name, values in chart["series"]:
+            series = chart_data.add_series(name)
+            for x_value, y_value in zip(chart["categories"], values):
+                if y_value is not None:
+                    series.add_data_point(x_value, y_value)
+    else:
+        chart_data = pptx_chart_data.CategoryChartData()
+        chart_data.categories = chart["categories"]
+        for name, values in chart["series"]:
+            chart_data.add_series(name, values)
+    
+    graphic = slide.shapes.add_chart(
+        getattr(pptx_chart_enum.XL_CHART_TYPE, CHART_TYPES[chart_type]),
+        Inches(0.5), Inches(1.5), Inches(9), Inches(5.5),
+        chart_data
+    )
+    plot_chart = graphic.chart
+    plot_chart.has_legend = len(chart["series"]) > 1 or chart_type == "pie"
+    if plot_chart.has_legend:
+        plot_chart.legend.position = pptx_chart_enum.XL_LEGEND_POSITION.BOTTOM
+        plot_chart.legend.include_in_layout = False
+    if chart_type == "pie":
+        plot = plot_chart.plots[0]
+        plot.has_data_labels = True
+        plot.data_labels.show_percentage = True
+        plot.data_labels.show_value = False
+    
+    result_text = (
+        f"✅ Diapositive graphique ajoutée: '{title}' ({chart_type}, "
+        f"{len(chart['categories'])} points, {len(chart['series'])} série(s), {chart['rows']} lignes source)"
+    )
+    if chart["truncated"]:
+        result_text += f"\n⚠️ {chart['truncated']} catégories au-delà de la limite non affichées (paramètre 'top')"
+    return result_text
+
+def build_slide(prs: Presentation, spec: Dict[str, Any]) -> str:
+    """Ajoute une diapositive décrite par une spécification déclarative"""
+    slide_type = spec.get("type")
+    title = spec.get("title", "")
+    
+    if slide_type == "title":
+        return build_title_slide(prs, title, spec.get("subtitle", ""))
+    elif slide_type == "content":
+        return build_content_slide(prs, title, spec.get("content", []))
+    elif slide_type == "image":
+        image_path = spec.get("image_path", "")
+        if not Path(image_path).exists():
+            raise FileNotFoundError(f"Image non trouvée: {image_path}")
+        return build_image_slide(prs, title, image_path, spec.get("caption", ""))
+    elif slide_type == "chart":
+        return build_chart_slide(prs, title, prepare_chart(spec))
+    raise ValueError(f"Type de diapositive inconnu: {slide_type} (title, content, image, chart)")
+
+def save_presentation_file(prs: Presentation, filename: str, output_path: str) -> Path:
+    """Sauvegarde une présentation dans output_path/filename.pptx"""
+    # Construire le chemin de sortie
+    output_dir = Path(output_path)
+    if not output_dir.exists():
+        output_dir.mkdir(parents=True, exist_ok=True)
+    
+    output_file = output_dir / f"{filename}.pptx"
+    prs.save(str(output_file))
+    return output_file
+
+PPTX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+def serialize_presentation(prs: Presentation) -> bytes:
+    """Sérialise une présentation .pptx en mémoire"""
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+def build_slides(prs: Presentation, slides: List[Dict[str, Any]]) -> List[str]:
+    """Ajoute une liste de diapositives ; retourne les erreurs (une par diapositive en échec)"""
+    # Une diapositive en échec n'interrompt pas la construction du reste
+    errors = []
+    for index, spec in enumerate(slides, start=1):
+        try:
+            build_slide(prs, spec)
+        except Exception as e:
+            errors.append(f"  - diapositive {index} ({spec.get('type')}): {str(e)}")
+    return errors
+
+def edit_presentation(key: str, prs: Presentation, func: Callable[..., Any], *args: Any) -> Any:
+    """Applique func(prs, *args) dans le worker puis remesure les médias du deck"""
+    try:
+        return func(prs, *args)
+    finally:
+        presentation_sizes[key] = presentation_media_bytes(prs)
+
+async def add_slide_with(filename: str, func: Callable[..., str], *args: Any) -> List[TextContent]:
+    """Ajoute une diapositive à une présentation existante, sous son verrou"""
+    key = scoped(filename)
+    async with presentation_lock(key):
+        prs = presentations.get(key)
+        if prs is None:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur: Présentation '{filename}' non trouvée. Créez d'abord une présentation."
+            )]
+        
+        return [TextContent(
+            type="text",
+            text=await run_blocking(edit_presentation, key, prs, func, *args)
+        )]
+
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+    """Point d'entrée des appels d'outils : mesure l'appel puis délègue à dispatch_tool"""
+    token = request_id_var.set(uuid.uuid4().hex[:8])
+    started = time.perf_counter()
+    contents: List[Any] = []
+    error = True
+    logger.debug("Outil appelé = %s, arguments = %s", name, PayloadSummary(arguments))
+    try:
+        contents = await dispatch_tool(name, arguments)
+        error = any(getattr(c, "text", "").startswith("❌") for c in contents)
+        return contents
+    except Exception:
+        logger.exception("Erreur non gérée dans l'outil %s", name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.record(name, elapsed, payload_size(arguments), response_size(contents), error)
+        logger.info("%s terminé en %.1f ms%s", name, elapsed * 1000, " (erreur)" if error else "")
+        request_id_var.reset(token)
+
+async def dispatch_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
     """Gestionnaire d'appels d'outils"""
     
     if name == "create_presentation":
         filename = arguments["filename"]
         title = arguments["title"]
         
-        # Créer une nouvelle présentation
-        prs = Presentation()
-        presentations[filename] = prs
+        template = arguments.get("template", DEFAULT_TEMPLATE)
+        
+        # Créer une nouvelle présentation à partir du prototype du modèle
+        try:
+            prs = await run_blocking(templates.new_presentation, template)
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ Erreur lors du chargement du modèle: {str(e)}"
+            )]
+        # Remplacer le deck attend la fin des modifications en cours
+        key = scoped(filename)
+        async with presentation_lock(key):
+            presentations[key] = prs
+            presentation_sizes[key] = await run_blocking(presentation_media_bytes, prs)
         
         return [TextContent(
             type="text",
-            text=f"✅ Présentation '{title}' créée avec succès (fichier: {filename})"
+            text=f"✅ Présentation '{title}' créée avec succès (fichier: {filename}, modèle: {template})"
         )]
     
     elif name == "add_title_slide":
@@ -164,68 +1370,14 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         title = arguments["title"]
         subtitle = arguments.get("subtitle", "")
         
-        if filename not in presentations:
-            return [TextContent(
-                type="text", 
-                text=f"❌ Erreur: Présentation '{filename}' non trouvée. Créez d'abord une présentation."
-            )]
-        
-        prs = presentations[filename]
-        
-        # Layout de diapositive titre (index 0)
-        title_slide_layout = prs.slide_layouts[0]
-        slide = prs.slides.add_slide(title_slide_layout)
-        
-        # Ajouter le titre
-        slide.shapes.title.text = title
-        
-        # Ajouter le sous-titre si fourni
-        if subtitle and len(slide.placeholders) > 1:
-            slide.placeholders[1].text = subtitle
-        
-        return [TextContent(
-            type="text",
-            text=f"✅ Diapositive de titre ajoutée: '{title}'"
-        )]
+        return await add_slide_with(filename, build_title_slide, title, subtitle)
     
     elif name == "add_content_slide":
         filename = arguments["filename"]
         title = arguments["title"]
         content = arguments["content"]
         
-        if filename not in presentations:
-            return [TextContent(
-                type="text",
-                text=f"❌ Erreur: Présentation '{filename}' non trouvée. Créez d'abord une présentation."
-            )]
-        
-        prs = presentations[filename]
-        
-        # Layout avec titre et contenu (index 1)
-        bullet_slide_layout = prs.slide_layouts[1]
-        slide = prs.slides.add_slide(bullet_slide_layout)
-        
-        # Ajouter le titre
-        slide.shapes.title.text = title
-        
-        # Ajouter le contenu
-        if len(slide.placeholders) > 1:
-            body_shape = slide.placeholders[1]
-            tf = body_shape.text_frame
-            tf.clear()
-            
-            for i, point in enumerate(content):
-                if i == 0:
-                    tf.text = point
-                else:
-                    p = tf.add_paragraph()
-                    p.text = point
-                    p.level = 0
-        
-        return [TextContent(
-            type="text",
-            text=f"✅ Diapositive de contenu ajoutée: '{title}' avec {len(content)} points"
-        )]
+        return await add_slide_with(filename, build_content_slide, title, content)
     
     elif name == "add_image_slide":
         filename = arguments["filename"]
@@ -233,7 +1385,7 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         image_path = arguments["image_path"]
         caption = arguments.get("caption", "")
         
-        if filename not in presentations:
+        if scoped(filename) not in presentations:
             return [TextContent(
                 type="text",
                 text=f"❌ Erreur: Présentation '{filename}' non trouvée. Créez d'abord une présentation."
@@ -246,32 +1398,8 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
                 text=f"❌ Erreur: Image non trouvée: {image_path}"
             )]
         
-        prs = presentations[filename]
-        
-        # Layout vide (index 6) pour plus de contrôle
-        blank_slide_layout = prs.slide_layouts[6]
-        slide = prs.slides.add_slide(blank_slide_layout)
-        
-        # Ajouter le titre manuellement
-        title_shape = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1))
-        title_frame = title_shape.text_frame
-        title_frame.text = title
-        title_frame.paragraphs[0].font.size = Inches(0.4)
-        title_frame.paragraphs[0].font.bold = True
-        
-        # Ajouter l'image
         try:
-            slide.shapes.add_picture(image_path, Inches(1), Inches(1.5), width=Inches(8))
-            
-            result_text = f"✅ Diapositive avec image ajoutée: '{title}'"
-            if caption:
-                # Ajouter une légende
-                caption_shape = slide.shapes.add_textbox(Inches(1), Inches(6.5), Inches(8), Inches(1))
-                caption_frame = caption_shape.text_frame
-                caption_frame.text = caption
-                result_text += f" (avec légende)"
-            
-            return [TextContent(type="text", text=result_text)]
+            return await add_slide_with(filename, build_image_slide, title, image_path, caption)
             
         except Exception as e:
             return [TextContent(
@@ -279,43 +1407,202 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
                 text=f"❌ Erreur lors de l'ajout de l'image: {str(e)}"
             )]
     
-    elif name == "save_presentation":
+    elif name == "add_chart_slide":
         filename = arguments["filename"]
-        output_path = arguments.get("output_path", ".")
+        title = arguments["title"]
         
-        if filename not in presentations:
+        if scoped(filename) not in presentations:
             return [TextContent(
                 type="text",
                 text=f"❌ Erreur: Présentation '{filename}' non trouvée. Créez d'abord une présentation."
             )]
         
-        prs = presentations[filename]
-        
-        # Construire le chemin de sortie
-        output_dir = Path(output_path)
-        if not output_dir.exists():
-            output_dir.mkdir(parents=True, exist_ok=True)
-        
-        output_file = output_dir / f"{filename}.pptx"
-        
         try:
-            prs.save(str(output_file))
-            return [TextContent(
-                type="text",
-                text=f"✅ Présentation sauvegardée: {output_file}"
-            )]
+            # Lecture et agrégation hors verrou : seul l'ajout de la diapositive le prend
+            chart = await run_blocking(prepare_chart, arguments)
+            return await add_slide_with(filename, build_chart_slide, title, chart)
+            
         except Exception as e:
             return [TextContent(
                 type="text",
-                text=f"❌ Erreur lors de la sauvegarde: {str(e)}"
+                text=f"❌ Erreur lors de l'ajout du graphique: {str(e)}"
             )]
     
+    elif name == "save_presentation":
+        filename = arguments["filename"]
+        output_path = arguments.get("output_path") or session_dir(".")
+        key = scoped(filename)
+        
+        async with presentation_lock(key):
+            prs = presentations.get(key)
+            if prs is None:
+                return [TextContent(
+                    type="text",
+                    text=f"❌ Erreur: Présentation '{filename}' non trouvée. Créez d'abord une présentation."
+                )]
+            
+            if arguments.get("destination") == "resource":
+                try:
+                    data = await run_blocking(serialize_presentation, prs)
+                except Exception as e:
+                    return [TextContent(
+                        type="text",
+                        text=f"❌ Erreur lors de la sérialisation: {str(e)}"
+                    )]
+                resources = resource_contents(f"presentation://{filename}.pptx", PPTX_MIME_TYPE, data, arguments.get("chunk_size"))
+                return [TextContent(
+                    type="text",
+                    text=f"✅ Présentation sérialisée en mémoire: {filename}.pptx ({len(data)} octets, {len(resources)} partie(s))"
+                )] + resources
+            
+            try:
+                output_file = await run_blocking(save_presentation_file, prs, filename, output_path)
+                return [TextContent(
+                    type="text",
+                    text=f"✅ Présentation sauvegardée: {output_file}"
+                )]
+            except Exception as e:
+                return [TextContent(
+                    type="text",
+                    text=f"❌ Erreur lors de la sauvegarde: {str(e)}"
+                )]
+    
+    elif name == "build_presentation":
+        filename = arguments["filename"]
+        title = arguments.get("title", filename)
+        slides = arguments["slides"]
+        output_path = arguments.get("output_path")
+        key = scoped(filename)
+        
+        # Construction et sauvegarde sous le verrou du deck : un autre appel
+        # sur la même présentation attend la fin de l'ensemble
+        async with presentation_lock(key):
+            if arguments.get("append") and key in presentations:
+                prs = presentations[key]
+            else:
+                try:
+                    prs = await run_blocking(templates.new_presentation, arguments.get("template", DEFAULT_TEMPLATE))
+                except Exception as e:
+                    return [TextContent(
+                        type="text",
+                        text=f"❌ Erreur lors du chargement du modèle: {str(e)}"
+                    )]
+                presentations[key] = prs
+            
+            errors = await run_blocking(edit_presentation, key, prs, build_slides, slides)
+            
+            lines = [
+                f"✅ Présentation '{title}' construite: {len(slides) - len(errors)}/{len(slides)} "
+                f"diapositives ajoutées ({len(prs.slides)} au total)"
+            ]
+            if errors:
+                lines.append("⚠️ Diapositives en erreur:")
+                lines.extend(errors)
+            
+            if output_path:
+                try:
+                    output_file = await run_blocking(save_presentation_file, prs, filename, output_path)
+                    lines.append(f"💾 Présentation sauvegardée: {output_file}")
+                except Exception as e:
+                    lines.append(f"❌ Erreur lors de la sauvegarde: {str(e)}")
+        
+        return [TextContent(type="text", text="\n".join(lines))]
+    
+    elif name == "list_templates":
+        lines = []
+        for template in templates.available():
+            try:
+                prototype, roles = await run_blocking(templates.prototype, template)
+            except Exception as e:
+                lines.append(f"- {template}: ❌ {str(e)}")
+                continue
+            layouts = ", ".join(f"{role}={layout.name}" for role, layout in roles.items())
+            lines.append(f"- {template}: {len(prototype.slide_layouts)} layouts ({layouts})")
+        
+        return [TextContent(
+            type="text",
+            text="📐 Modèles disponibles :\n" + "\n".join(lines)
+        )]
+    
+    elif name == "server_stats":
+        if arguments.get("format") == "prometheus":
+            return [TextContent(type="text", text=metrics.to_prometheus(METRICS_PREFIX))]
+        
+        return [TextContent(
+            type="text",
+            text=f"📊 Statistiques du serveur PowerPoint-Creator :\n\n"
+                 f"{json.dumps(metrics.snapshot(), indent=2, ensure_ascii=False)}"
+        )]
+    
     else:
         return [TextContent(
             type="text",
             text=f"❌ Outil inconnu: {name}"
         )]
 
+# Mode serveur persistant : un seul processus (bibliothèques et modèles déjà
+# chargés) sert toutes les sessions. Chaque connexion SSE reçoit un espace
+# de noms aléatoire libéré à la déconnexion ; un client peut imposer le sien
+# (en-tête X-MCP-Namespace ou ?namespace=) pour retrouver ses présentations
+# d'une connexion à l'autre.
+session_counts: Dict[str, int] = {}
+
+async def release_namespace(namespace: str) -> None:
+    """Oublie les présentations d'un espace de noms"""
+    prefix = f"{namespace}/"
+    for key in [k for k in presentations if k.startswith(prefix)]:
+        async with presentation_lock(key):
+            presentations.pop(key, None)
+            presentation_sizes.pop(key, None)
+        presentation_locks.pop(key, None)
+
+async def serve_sse(options: InitializationOptions) -> None:
+    """Sert le protocole MCP en HTTP/SSE (TCP ou socket Unix)"""
+    import uvicorn
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+    
+    sse = SseServerTransport("/messages/")
+    
+    async def handle_sse(request: Any) -> Any:
+        requested = request.headers.get("x-mcp-namespace") or request.query_params.get("namespace")
+        if requested and not NAMESPACE_PATTERN.fullmatch(requested):
+            return Response("Espace de noms invalide", status_code=400)
+        namespace = requested or uuid.uuid4().hex[:12]
+        
+        session_counts[namespace] = session_counts.get(namespace, 0) + 1
+        token = namespace_var.set(namespace)
+        logger.info("Session ouverte (espace %s)", namespace)
+        try:
+            async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, options)
+        finally:
+            session_counts[namespace] -= 1
+            if not session_counts[namespace]:
+                del session_counts[namespace]
+                if not requested:
+                    await release_namespace(namespace)
+            namespace_var.reset(token)
+            logger.info("Session fermée (espace %s)", namespace)
+        return Response()
+    
+    app = Starlette(routes=[
+        Route("/sse", endpoint=handle_sse),
+        Mount("/messages/", app=sse.handle_post_message)
+    ])
+    config = uvicorn.Config(app, host=SSE_HOST, port=SSE_PORT, uds=SSE_SOCKET, log_level=LOG_LEVEL.lower())
+    logger.warning("Serveur PowerPoint-Creator en écoute sur %s", SSE_SOCKET or f"http://{SSE_HOST}:{SSE_PORT}/sse")
+    await uvicorn.Server(config).serve()
+
+async def preload_in_background() -> None:
+    """Importe les bibliothèques lourdes hors de la boucle asyncio"""
+    try:
+        await asyncio.to_thread(preload_modules)
+    except Exception as e:
+        logger.error("Erreur préchargement des modules: %s", e)
+
 async def main():
     """Fonction principale"""
     # Configuration des options du serveur
@@ -328,12 +1615,31 @@ async def main():
         )
     )
     
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            options
-        )
+    dump_task = asyncio.create_task(dump_metrics_periodically()) if METRICS_FILE else None
+    
+    preload_task = None
+    if PRELOAD_MODE == "eager":
+        preload_modules()
+    elif PRELOAD_MODE == "background":
+        preload_task = asyncio.create_task(preload_in_background())
+    
+    try:
+        if TRANSPORT == "sse":
+            await serve_sse(options)
+        else:
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(
+                    read_stream,
+                    write_stream,
+                    options
+                )
+    finally:
+        if dump_task is not None:
+            dump_task.cancel()
+            metrics.dump(METRICS_FILE, METRICS_PREFIX)
+        if preload_task is not None:
+            preload_task.cancel()
+        shutdown_executor()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file